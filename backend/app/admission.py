@@ -0,0 +1,202 @@
+"""
+Control de admisión y descarte de carga
+
+Cuando la base de datos se ralentiza, las peticiones se acumulan en la
+cola del pool hasta que todas agotan el tiempo a la vez. El controlador
+mide tres señales y, por encima de su umbral, rechaza al momento con 503
+el trabajo prescindible para que el resto siga respondiendo:
+
+    - Retraso del bucle de eventos: una tarea duerme ADMISSION_LAG_INTERVAL
+      y mide cuánto tarda de más en despertar
+    - Espera por una conexión del pool (database.pool_wait)
+    - Peticiones en curso en este proceso
+
+La carga es el mayor cociente señal/umbral. Prioridades:
+
+    - Alta (nunca se descarta): autenticación y escrituras
+    - Baja (se descarta con carga >= 1): estadísticas, exportaciones y
+      páginas de listados más allá de la primera (skip > 0)
+    - Normal (se descarta con carga >= ADMISSION_CRITICAL_LOAD): el
+      resto de lecturas
+
+Las respuestas 503 llevan Retry-After y no tocan la base de datos.
+"""
+from urllib.parse import parse_qsl
+import asyncio
+import json
+import logging
+import os
+import time
+
+from database import DecayingAverage, pool_wait
+
+logger = logging.getLogger(__name__)
+
+# Activar el control de admisión
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Umbral del retraso del bucle de eventos (segundos)
+ADMISSION_MAX_LOOP_LAG = float(os.getenv("ADMISSION_MAX_LOOP_LAG", 0.1))
+# Umbral de la espera media por una conexión del pool (segundos)
+ADMISSION_MAX_POOL_WAIT = float(os.getenv("ADMISSION_MAX_POOL_WAIT", 0.25))
+# Umbral de peticiones en curso por proceso
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 100))
+# Carga a partir de la cual también se descartan las lecturas normales
+ADMISSION_CRITICAL_LOAD = float(os.getenv("ADMISSION_CRITICAL_LOAD", 2.0))
+# Segundos entre mediciones del retraso del bucle
+ADMISSION_LAG_INTERVAL = float(os.getenv("ADMISSION_LAG_INTERVAL", 0.1))
+# Retry-After de las respuestas 503 (segundos)
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 2))
+
+# Prefijos de ruta de baja prioridad
+LOW_PRIORITY_PREFIXES = ("/tasks/stats/",)
+# Rutas que nunca se descartan aunque sean lecturas
+HIGH_PRIORITY_PREFIXES = ("/auth/", "/health")
+
+HIGH, NORMAL, LOW = "high", "normal", "low"
+
+
+def priority(scope) -> str:
+    """
+    Prioridad de una petición según su método, ruta y paginación
+
+    Returns:
+        str: high, normal o low
+    """
+    path = scope["path"]
+    if scope["method"] not in ("GET", "HEAD") or path.startswith(HIGH_PRIORITY_PREFIXES):
+        return HIGH
+    if path.startswith(LOW_PRIORITY_PREFIXES) or "/export" in path:
+        return LOW
+    query = scope.get("query_string", b"")
+    if b"skip=" in query:
+        for name, value in parse_qsl(query.decode("latin-1")):
+            if name == "skip" and value not in ("", "0"):
+                return LOW
+    return NORMAL
+
+
+class AdmissionController:
+    """
+    Señales de carga del proceso y decisión de admitir o descartar
+
+    Args:
+        max_loop_lag: Umbral del retraso del bucle (segundos)
+        max_pool_wait: Umbral de la espera por conexión (segundos)
+        max_in_flight: Umbral de peticiones en curso
+        critical_load: Carga a partir de la cual se descartan las lecturas normales
+    """
+
+    def __init__(self, max_loop_lag: float = ADMISSION_MAX_LOOP_LAG,
+                 max_pool_wait: float = ADMISSION_MAX_POOL_WAIT,
+                 max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+                 critical_load: float = ADMISSION_CRITICAL_LOAD):
+        self.max_loop_lag = max_loop_lag
+        self.max_pool_wait = max_pool_wait
+        self.max_in_flight = max_in_flight
+        self.critical_load = critical_load
+        self.loop_lag = DecayingAverage(half_life=1.0)
+        self.in_flight = 0
+        self.shed = 0
+        self._monitor = None
+
+    def load(self) -> float:
+        """Mayor cociente señal/umbral (1 = en el umbral)"""
+        return max(
+            self.loop_lag.value / self.max_loop_lag,
+            pool_wait.value / self.max_pool_wait,
+            self.in_flight / self.max_in_flight,
+        )
+
+    def admits(self, level: str) -> bool:
+        """Indica si se atiende una petición de esa prioridad con la carga actual"""
+        if level == HIGH:
+            return True
+        load = self.load()
+        if level == LOW:
+            return load < 1
+        return load < self.critical_load
+
+    def status(self) -> dict:
+        """Señales actuales (para /health)"""
+        return {
+            "load": round(self.load(), 3),
+            "loop_lag_ms": round(self.loop_lag.value * 1000, 1),
+            "pool_wait_ms": round(pool_wait.value * 1000, 1),
+            "in_flight": self.in_flight,
+            "shed": self.shed,
+        }
+
+    async def _measure_loop_lag(self, interval: float) -> None:
+        """Mide de forma continua cuánto se retrasa el bucle de eventos"""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.record(max(time.perf_counter() - start - interval, 0.0))
+
+    def start(self, interval: float = ADMISSION_LAG_INTERVAL) -> None:
+        """Arranca la medición del retraso del bucle (en el ciclo de vida de la app)"""
+        if ADMISSION_ENABLED and self._monitor is None:
+            self._monitor = asyncio.get_running_loop().create_task(self._measure_loop_lag(interval))
+
+    async def stop(self) -> None:
+        """Detiene la medición del retraso del bucle"""
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+
+
+# Controlador del proceso
+admission_controller = AdmissionController()
+
+
+async def _send_overloaded(send) -> None:
+    """Responde 503 con Retry-After"""
+    body = json.dumps({"detail": "Servicio sobrecargado; inténtalo más tarde"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(ADMISSION_RETRY_AFTER).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI que cuenta las peticiones en curso y descarta las
+    prescindibles cuando el proceso está sobrecargado
+
+    Args:
+        app: Aplicación ASGI
+        controller: Controlador de admisión (por defecto el del proceso)
+    """
+
+    def __init__(self, app, controller: AdmissionController = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if not ADMISSION_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        level = priority(scope)
+        if not self.controller.admits(level):
+            self.controller.shed += 1
+            if self.controller.shed % 100 == 1:
+                logger.warning(f"⚠️ Sobrecarga: descartando peticiones de prioridad {level} ({self.controller.status()})")
+            await _send_overloaded(send)
+            return
+
+        self.controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.in_flight -= 1
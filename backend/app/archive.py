@@ -0,0 +1,180 @@
+"""
+Archivado de tareas completadas
+
+Mueve las tareas completadas hace más de ARCHIVE_AFTER_DAYS días de la
+tabla tasks a tasks_archive, en lotes pequeños con pausas entre ellos.
+Así la tabla caliente (la que recorren el listado, las estadísticas y
+los vencimientos) se mantiene pequeña y cabe en memoria.
+
+Se ejecuta en cada shard. Puede lanzarse a mano:
+    python archive.py [--older-than-days 30]
+"""
+from sqlalchemy import delete, exists, insert, literal, select
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import argparse
+import logging
+import os
+import time
+
+from database import SessionLocal
+from models.task import Task
+from models.archived_task import ArchivedTask
+from sharding import shard_router
+from jobs import job_runner
+
+logger = logging.getLogger(__name__)
+
+# Días desde la finalización a partir de los cuales se archiva una tarea
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 30))
+# Tareas movidas por lote (cada lote es una transacción corta)
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 1000))
+# Pausa entre lotes para no saturar la base de datos
+ARCHIVE_PAUSE_SECONDS = float(os.getenv("ARCHIVE_PAUSE_SECONDS", 0.1))
+# Segundos entre pasadas del archivado en segundo plano (0 = desactivado)
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", 3600))
+
+# Columnas comunes de tasks y tasks_archive
+_TASK_COLUMNS = [column.name for column in Task.__table__.columns]
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE, skip_users: set = frozenset()) -> int:
+    """
+    Mueve un lote de tareas completadas antes de cutoff al archivo
+
+    En MySQL las filas se seleccionan con FOR UPDATE SKIP LOCKED, de modo
+    que varios procesos pueden archivar a la vez sin pisarse.
+
+    Args:
+        db: Sesión del shard
+        cutoff: Fecha de finalización límite
+        batch_size: Máximo de tareas a mover
+        skip_users: Usuarios cuyas tareas no se tocan (en migración de shard)
+
+    Returns:
+        int: Tareas movidas
+    """
+    # Las tareas con subtareas se quedan: sus hijas siguen colgando de ellas
+    child = aliased(Task)
+    query = db.query(Task.id).filter(
+        Task.is_completed == True,
+        Task.completed_at < cutoff,
+        ~exists().where(child.user_id == Task.user_id, child.parent_id == Task.id)
+    )
+    if skip_users:
+        query = query.filter(Task.user_id.notin_(skip_users))
+    query = query.order_by(Task.completed_at).limit(batch_size)
+    if db.get_bind().dialect.name == "mysql":
+        query = query.with_for_update(skip_locked=True)
+
+    ids = [task_id for (task_id,) in query]
+    if not ids:
+        db.rollback()
+        return 0
+
+    tasks = Task.__table__
+    db.execute(
+        insert(ArchivedTask.__table__).from_select(
+            _TASK_COLUMNS + ["archived_at"],
+            select(*[tasks.c[name] for name in _TASK_COLUMNS], literal(datetime.utcnow()))
+            .where(tasks.c.id.in_(ids))
+        )
+    )
+    db.execute(delete(tasks).where(tasks.c.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
+def restore_task(db: Session, task_id: int, user_id: int) -> bool:
+    """
+    Devuelve una tarea archivada a la tabla activa, sin confirmar
+
+    Las escrituras sobre una tarea archivada (editarla, marcarla como
+    pendiente, moverla) la restauran antes de aplicarse. Si sigue
+    completada, una pasada posterior la vuelve a archivar.
+
+    Args:
+        db: Sesión del shard
+        task_id: ID de la tarea
+        user_id: ID del propietario
+
+    Returns:
+        bool: True si estaba archivada y se ha restaurado
+    """
+    archive = ArchivedTask.__table__
+    owned = (archive.c.id == task_id, archive.c.user_id == user_id)
+    restored = db.execute(
+        insert(Task.__table__).from_select(
+            _TASK_COLUMNS,
+            select(*[archive.c[name] for name in _TASK_COLUMNS]).where(*owned)
+        )
+    ).rowcount
+    if not restored:
+        return False
+    db.execute(delete(archive).where(*owned))
+    return True
+
+
+def archive_completed_tasks(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause: float = ARCHIVE_PAUSE_SECONDS,
+    max_batches: int = None,
+) -> int:
+    """
+    Archiva las tareas completadas antiguas de todos los shards
+
+    Args:
+        older_than_days: Antigüedad mínima de la finalización
+        batch_size: Tareas por lote
+        pause: Segundos de espera entre lotes
+        max_batches: Límite de lotes por shard (None = hasta terminar)
+
+    Returns:
+        int: Total de tareas archivadas
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total = 0
+    directory = SessionLocal()
+    for shard in shard_router.engines:
+        db = shard_router.session_for(shard)
+        try:
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                # Se consulta en cada lote: una migración puede empezar a mitad de pasada
+                skip_users = shard_router.migrating_users(directory)
+                directory.rollback()
+                moved = archive_batch(db, cutoff, batch_size, skip_users)
+                if not moved:
+                    break
+                total += moved
+                batches += 1
+                logger.info(f"🗃️ {shard}: {moved} tareas archivadas (total {total})")
+                if pause:
+                    time.sleep(pause)
+        finally:
+            db.close()
+    directory.close()
+    return total
+
+
+@job_runner.register("archive_completed_tasks")
+def archive_job(payload: dict) -> None:
+    """Trabajo periódico de archivado"""
+    archive_completed_tasks(**payload)
+
+
+job_runner.schedule_every("archive_completed_tasks", ARCHIVE_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Archivar tareas completadas antiguas")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=ARCHIVE_PAUSE_SECONDS)
+    args = parser.parse_args()
+
+    print(f"Tareas archivadas: {archive_completed_tasks(args.older_than_days, args.batch_size, args.pause)}")
@@ -0,0 +1,306 @@
+"""
+Compresión de las respuestas (gzip y, si están instaladas, brotli o zstd)
+
+La codificación se negocia con Accept-Encoding: entre las que acepta el
+cliente con el mismo peso se prefiere zstd, después br y después gzip.
+brotli y zstandard son opcionales; sin ellas solo se usa gzip.
+
+    - Solo se comprimen tipos de texto (JSON, NDJSON, text/*, XML, JavaScript)
+      que no vengan ya codificados ni marcados con no-transform
+    - Nunca las respuestas 304, 204 ni las que no llevan cuerpo
+    - Solo por encima de COMPRESSION_MIN_SIZE bytes: el cuerpo se retiene
+      hasta alcanzar el umbral o terminar, así que las respuestas
+      pequeñas (también las de StreamingResponse) salen tal cual
+    - Los cuerpos en streaming se comprimen trozo a trozo, vaciando el
+      compresor tras cada uno para que el cliente los reciba sin esperar
+      al final
+    - El nivel de cada codificación está acotado (COMPRESSION_*_LEVEL, con
+      un máximo fijo) para limitar la CPU por respuesta
+
+El ETag se conserva: identifica la versión de la fila (ver etags.py), no
+los bytes, y devolverlo débil impediría usarlo en If-Match.
+
+Benchmark de bytes ahorrados frente a CPU por endpoint:
+    python benchmarks/bench_compression.py
+"""
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependencia opcional
+    zstandard = None
+
+# Activar la compresión de respuestas
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Bytes a partir de los cuales se comprime
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+# Niveles de cada codificación (se acotan a LEVEL_LIMITS)
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 5))
+COMPRESSION_BROTLI_LEVEL = int(os.getenv("COMPRESSION_BROTLI_LEVEL", 4))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+
+# Nivel mínimo y máximo permitido: por encima la CPU crece mucho más que el ahorro
+LEVEL_LIMITS = {"gzip": (1, 6), "br": (0, 6), "zstd": (1, 9)}
+
+# Tipos de contenido que merece la pena comprimir
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/xml", "application/javascript")
+
+
+def bounded_level(encoding: str, level: int) -> int:
+    """Nivel de compresión dentro de los límites de la codificación"""
+    low, high = LEVEL_LIMITS[encoding]
+    return min(max(level, low), high)
+
+
+def available_encodings() -> list:
+    """Codificaciones disponibles en este proceso, de la preferida a la menos"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+# ====================
+# COMPRESORES
+# ====================
+
+class GzipCompressor:
+    """Compresor gzip incremental"""
+
+    def __init__(self, level: int = COMPRESSION_GZIP_LEVEL):
+        self._compressor = zlib.compressobj(bounded_level("gzip", level), zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        """Comprime un trozo (puede quedar parte retenida en el compresor)"""
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Vacía lo retenido sin cerrar el flujo (streaming)"""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Cierra el flujo comprimido"""
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    """Compresor brotli incremental"""
+
+    def __init__(self, level: int = COMPRESSION_BROTLI_LEVEL):
+        self._compressor = brotli.Compressor(quality=bounded_level("br", level))
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    """Compresor zstd incremental"""
+
+    def __init__(self, level: int = COMPRESSION_ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=bounded_level("zstd", level)).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+COMPRESSORS = {"gzip": GzipCompressor, "br": BrotliCompressor, "zstd": ZstdCompressor}
+
+
+def negotiate(accept_encoding: str, encodings: list) -> str:
+    """
+    Elige la codificación según Accept-Encoding
+
+    Args:
+        accept_encoding: Valor de la cabecera (ej: "gzip, br;q=0.8")
+        encodings: Codificaciones disponibles, de la preferida a la menos
+
+    Returns:
+        str: Codificación elegida, o None si el cliente no acepta ninguna
+    """
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+# ====================
+# MIDDLEWARE
+# ====================
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime las respuestas grandes
+
+    Args:
+        app: Aplicación ASGI
+        min_size: Bytes a partir de los cuales se comprime
+        encodings: Codificaciones ofrecidas (por defecto las disponibles)
+    """
+
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_SIZE, encodings: list = None):
+        self.app = app
+        self.min_size = min_size
+        self.encodings = encodings or available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if not COMPRESSION_ENABLED or scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await CompressedResponse(send, encoding, self.min_size)(self.app, scope, receive)
+
+
+class CompressedResponse:
+    """
+    Estado de una respuesta que puede acabar comprimida
+
+    Retiene el inicio y el cuerpo hasta saber si supera el umbral; a
+    partir de ahí comprime cada trozo según llega.
+    """
+
+    def __init__(self, send, encoding: str, min_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.min_size = min_size
+        self.start = None
+        self.pending = []
+        self.pending_size = 0
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, app, scope, receive):
+        await app(scope, receive, self.handle)
+
+    def _compressible(self, message) -> bool:
+        """Decide por el estado y las cabeceras si la respuesta se puede comprimir"""
+        if message["status"] < 200 or message["status"] in (204, 304):
+            return False
+        content_type = content_encoding = cache_control = ""
+        for name, value in message.get("headers", []):
+            if name == b"content-type":
+                content_type = value.decode("latin-1").lower()
+            elif name == b"content-encoding":
+                content_encoding = value.decode("latin-1").lower()
+            elif name == b"cache-control":
+                cache_control = value.decode("latin-1").lower()
+        return (
+            content_type.startswith(COMPRESSIBLE_TYPES)
+            and content_encoding in ("", "identity")
+            and "no-transform" not in cache_control
+        )
+
+    async def handle(self, message) -> None:
+        if message["type"] == "http.response.start":
+            if self._compressible(message):
+                self.start = message
+            else:
+                self.passthrough = True
+                await self.send(message)
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            self.pending.append(body)
+            self.pending_size += len(body)
+            if self.pending_size < self.min_size:
+                if more_body:
+                    return
+                # Respuesta pequeña: sale sin comprimir
+                await self._send_start(compressed=False)
+                await self.send({"type": "http.response.body", "body": b"".join(self.pending)})
+                return
+            body = b"".join(self.pending)
+            self.pending = []
+            self.compressor = COMPRESSORS[self.encoding]()
+            if not more_body:
+                # Cuerpo completo: se comprime de una vez y lleva Content-Length
+                data = self.compressor.compress(body) + self.compressor.finish()
+                await self._send_start(compressed=True, length=len(data))
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            await self._send_start(compressed=True)
+
+        if more_body:
+            data = self.compressor.compress(body) + self.compressor.flush()
+        else:
+            data = self.compressor.compress(body) + self.compressor.finish()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _send_start(self, compressed: bool, length: int = None) -> None:
+        """
+        Envía el inicio retenido con las cabeceras de la codificación
+
+        Args:
+            compressed: El cuerpo irá comprimido
+            length: Tamaño del cuerpo comprimido (None en streaming)
+        """
+        headers, vary = [], []
+        for name, value in self.start.get("headers", []):
+            if name == b"vary":
+                vary.append(value.decode("latin-1"))
+            elif not (compressed and name == b"content-length"):
+                headers.append((name, value))
+        # La respuesta depende de Accept-Encoding aunque esta vez no se comprima
+        if not any("accept-encoding" in value.lower() for value in vary):
+            vary.append("Accept-Encoding")
+        headers.append((b"vary", ", ".join(vary).encode("latin-1")))
+        if compressed:
+            headers.append((b"content-encoding", self.encoding.encode()))
+            if length is not None:
+                headers.append((b"content-length", str(length).encode()))
+        await self.send({**self.start, "headers": headers})
@@ -1,36 +1,357 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from fastapi import Request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import threading
+import time
 import os
 from dotenv import load_dotenv
 
 # Cargar variables de entorno desde .env
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Obtener la URL de conexión a la base de datos
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Réplica de solo lectura (opcional); si no se define, todo va al primario
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+
+# Segundos durante los que un cliente lee del primario después de escribir
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+
+# ==========================
+# CONFIGURACIÓN DEL POOL
+# ==========================
+
+# Conexiones permanentes que mantiene el pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+# Conexiones extra que se pueden abrir en picos de carga
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+# Segundos máximos de espera por una conexión libre
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# Reciclar conexiones cada hora (antes del wait_timeout de MySQL)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 3600))
+# LIFO reutiliza las conexiones más recientes y deja cerrar las ociosas
+DB_POOL_USE_LIFO = os.getenv("DB_POOL_USE_LIFO", "true").lower() == "true"
+# El pre-ping añade un round trip por checkout; por defecto se reconecta ante errores
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+# Conexiones que se abren al arrancar (0 = pool_size, negativo = desactivado)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", 0))
+# Proporción de uso del pool a partir de la cual se considera saturado
+DB_POOL_SATURATION_WARNING = float(os.getenv("DB_POOL_SATURATION_WARNING", 0.9))
+# Segundos en que la media de la espera por conexión pierde la mitad de su valor
+DB_POOL_WAIT_HALF_LIFE = float(os.getenv("DB_POOL_WAIT_HALF_LIFE", 5))
+
+
+class DecayingAverage:
+    """
+    Media móvil exponencial de una latencia que decae con el tiempo
+
+    Cada muestra pesa alpha; además el valor se reduce a la mitad cada
+    half_life segundos sin muestras, de modo que una señal deja de
+    indicar carga cuando ya no llegan mediciones lentas.
+    """
+
+    def __init__(self, half_life: float, alpha: float = 0.2):
+        self.half_life = half_life
+        self.alpha = alpha
+        self._value = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now: float) -> float:
+        return self._value * 0.5 ** ((now - self._updated) / self.half_life)
+
+    def record(self, sample: float) -> None:
+        """Añade una medición (en segundos)"""
+        now = time.monotonic()
+        with self._lock:
+            current = self._decayed(now)
+            self._value = current + self.alpha * (sample - current)
+            self._updated = now
+
+    @property
+    def value(self) -> float:
+        """Media actual (en segundos)"""
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+
+# Espera media por una conexión del pool (todos los engines del proceso)
+pool_wait = DecayingAverage(DB_POOL_WAIT_HALF_LIFE)
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada checkout por una conexión
+    libre (o por abrirla), para el control de admisión (admission.py)
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.record(time.perf_counter() - start)
+
+
+def build_engine_options(url: str) -> dict:
+    """
+    Construye los argumentos de create_engine según el tipo de base de datos
+
+    Args:
+        url: URL de conexión
+
+    Returns:
+        dict: Argumentos para create_engine
+    """
+    # SQLite no usa un pool de red; se deja su configuración por defecto
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_use_lifo": DB_POOL_USE_LIFO,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# Desconexiones detectadas por engine (SQLAlchemy ya invalida el pool en cada una)
+_disconnects = {}
+
+
+def _on_engine_error(context):
+    """
+    Registra las desconexiones que reporta el driver: SQLAlchemy invalida
+    el pool y los siguientes checkouts abren conexiones nuevas; aquí se
+    dejan en el log y se cuentan para /health
+    """
+    if context.is_disconnect:
+        _disconnects[context.engine] = _disconnects.get(context.engine, 0) + 1
+        logger.warning("⚠️ Conexión a la base de datos perdida, se reconectará en el próximo uso")
+
+
+# Engines creados por la aplicación (primario, réplica y shards)
+_engines = []
+
+
+def create_db_engine(url: str):
+    """
+    Crea un engine de SQLAlchemy con la configuración del pool
+
+    Args:
+        url: URL de conexión
+
+    Returns:
+        Engine: Engine configurado
+    """
+    db_engine = create_engine(url, **build_engine_options(url))
+    event.listen(db_engine, "handle_error", _on_engine_error)
+    _engines.append(db_engine)
+    return db_engine
+
+
+def dispose_engines(close: bool = True) -> None:
+    """
+    Descarta los pools de todos los engines de la aplicación
+
+    Args:
+        close: True para cerrar las conexiones (apagado); False tras un fork,
+            para que el proceso hijo abandone las conexiones heredadas sin
+            cerrar los sockets que sigue usando el proceso padre
+    """
+    for db_engine in _engines:
+        db_engine.dispose(close=close)
+
+
 # Crear el engine de SQLAlchemy (motor de conexión)
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Verificar conexión antes de usar
-    pool_recycle=3600    # Reciclar conexiones cada hora
-)
+engine = create_db_engine(DATABASE_URL)
+
+# Engine de lectura: la réplica si está configurada, si no el primario
+replica_engine = create_db_engine(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else engine
 
 # Crear una clase SessionLocal para manejar sesiones de base de datos
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sesiones de solo lectura contra la réplica
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
 # Base para los modelos de SQLAlchemy
 Base = declarative_base()
 
+
+def warmup_pool(db_engine=None, connections: int = None) -> int:
+    """
+    Abre el número mínimo de conexiones al arrancar para que las primeras
+    peticiones no paguen el coste del handshake con la base de datos
+
+    Args:
+        db_engine: Engine a calentar (por defecto el principal)
+        connections: Número de conexiones a abrir (por defecto DB_POOL_WARMUP o pool_size)
+
+    Returns:
+        int: Número de conexiones abiertas
+    """
+    db_engine = db_engine or engine
+    pool_size = getattr(db_engine.pool, "size", None)
+    if not callable(pool_size) or DB_POOL_WARMUP < 0:
+        return 0
+
+    connections = connections or DB_POOL_WARMUP or pool_size()
+    connections = min(connections, pool_size())
+
+    # Abrir las conexiones en paralelo y mantenerlas todas a la vez;
+    # si se devolvieran una a una, el pool reutilizaría siempre la misma
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        opened = list(executor.map(lambda _: db_engine.connect(), range(connections)))
+    for connection in opened:
+        connection.close()
+
+    logger.info(f"🔥 Pool de conexiones precalentado con {len(opened)} conexiones")
+    return len(opened)
+
+
+def get_pool_status(db_engine=None) -> dict:
+    """
+    Informa del estado del pool de conexiones y de su saturación
+
+    Args:
+        db_engine: Engine a inspeccionar (por defecto el principal)
+
+    Returns:
+        dict: Tamaño, conexiones en uso, libres, overflow, saturación y
+            desconexiones detectadas
+    """
+    db_engine = db_engine or engine
+    pool = db_engine.pool
+    if not callable(getattr(pool, "size", None)):
+        return {"pool": type(pool).__name__, "disconnects": _disconnects.get(db_engine, 0)}
+
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", DB_MAX_OVERFLOW), 0)
+    checked_out = pool.checkedout()
+    saturation = checked_out / capacity if capacity else 0.0
+
+    if saturation >= DB_POOL_SATURATION_WARNING:
+        logger.warning(f"⚠️ Pool de conexiones saturado: {checked_out}/{capacity} en uso")
+
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "saturation": round(saturation, 3),
+        "saturated": saturation >= DB_POOL_SATURATION_WARNING,
+        "wait_ms": round(pool_wait.value * 1000, 1),
+        "disconnects": _disconnects.get(db_engine, 0),
+    }
+
+
+class ReadYourWritesTracker:
+    """
+    Recuerda qué clientes han escrito recientemente para que sus lecturas
+    vayan al primario mientras la réplica se pone al día
+
+    La memoria está acotada: al superar max_entries se descartan
+    las entradas más antiguas
+    """
+
+    def __init__(self, window_seconds: float, max_entries: int = 100_000):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._expires = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark_write(self, key: str) -> None:
+        """Registra una escritura del cliente"""
+        with self._lock:
+            self._expires[key] = time.monotonic() + self.window_seconds
+            self._expires.move_to_end(key)
+            while len(self._expires) > self.max_entries:
+                self._expires.popitem(last=False)
+
+    def is_sticky(self, key: str) -> bool:
+        """Indica si el cliente escribió dentro de la ventana"""
+        with self._lock:
+            expires_at = self._expires.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._expires[key]
+                return False
+            return True
+
+    def clear(self) -> None:
+        """Olvida todas las escrituras registradas"""
+        with self._lock:
+            self._expires.clear()
+
+
+# Seguimiento de escrituras recientes por cliente
+read_your_writes = ReadYourWritesTracker(READ_YOUR_WRITES_SECONDS)
+
+# Métodos HTTP que no modifican datos
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def client_key(request: Request) -> str:
+    """
+    Identifica al cliente por su token (o su IP si no está autenticado)
+    sin necesidad de consultar la base de datos
+    """
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.sha1(authorization.encode()).hexdigest()
+    return request.client.host if request.client else "anonymous"
+
+
+def use_replica(request: Request) -> bool:
+    """
+    Decide si la petición puede leerse desde la réplica
+
+    Args:
+        request: Petición HTTP actual
+
+    Returns:
+        bool: True para peticiones de lectura de clientes sin escrituras recientes
+    """
+    if replica_engine is engine or request.method not in READ_METHODS:
+        return False
+    return not read_your_writes.is_sticky(client_key(request))
+
+
 # Dependencia para obtener la sesión de base de datos
-def get_db():
+def get_db(request: Request = None):
     """
     Generador que proporciona una sesión de base de datos
     y la cierra automáticamente al terminar
+
+    Las peticiones GET usan la réplica; las mutaciones usan el primario
+    y hacen que el cliente lea del primario durante READ_YOUR_WRITES_SECONDS
     """
-    db = SessionLocal()
+    if request is not None and use_replica(request):
+        db = ReadSessionLocal()
+    else:
+        db = SessionLocal()
+        # Se marca antes y después: la respuesta puede enviarse antes
+        # de que termine este generador
+        if request is not None and request.method not in READ_METHODS:
+            read_your_writes.mark_write(client_key(request))
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        if request is not None and request.method not in READ_METHODS:
+            read_your_writes.mark_write(client_key(request))
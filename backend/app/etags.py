@@ -0,0 +1,65 @@
+"""
+ETag e If-Match a partir de la columna version
+
+Las tareas y categorías llevan una versión que se incrementa en cada
+escritura. Se expone como ETag fuerte ("<version>") y las peticiones
+PUT/PATCH pueden enviar If-Match con el ETag leído: la escritura se
+aplica con un UPDATE condicional (WHERE version = ?) y, si otro cliente
+la cambió entre medias, responde 412 en lugar de pisar sus cambios.
+Sin bloqueos: nadie espera a nadie.
+"""
+from fastapi import HTTPException, Response, status
+from typing import Optional
+
+
+def format_etag(version: int) -> str:
+    """ETag fuerte de una versión"""
+    return f'"{version}"'
+
+
+def set_etag(response: Response, row) -> None:
+    """Añade el ETag de una fila (con columna version) a la respuesta"""
+    version = getattr(row, "version", None)
+    if version is None and isinstance(row, dict):
+        version = row.get("version")
+    if version is not None:
+        response.headers["ETag"] = format_etag(version)
+
+
+def parse_if_match(value: Optional[str]) -> Optional[set]:
+    """
+    Versiones aceptadas por una cabecera If-Match
+
+    If-Match usa comparación fuerte, así que los ETag débiles (W/"...")
+    y los que no son una versión nunca coinciden.
+
+    Args:
+        value: Valor de la cabecera
+
+    Returns:
+        set: Versiones aceptadas, o None si no hay precondición (sin
+            cabecera o "*")
+    """
+    if value is None or value.strip() == "*":
+        return None
+    versions = set()
+    for tag in value.split(","):
+        tag = tag.strip()
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.add(int(tag[1:-1]))
+    return versions
+
+
+def precondition_failed(current_version: int = None) -> HTTPException:
+    """
+    Error 412 para un If-Match que no coincide
+
+    Args:
+        current_version: Versión actual (se devuelve como ETag para reintentar)
+    """
+    headers = {"ETag": format_etag(current_version)} if current_version is not None else None
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="El recurso cambió desde que se leyó (If-Match no coincide)",
+        headers=headers,
+    )
@@ -0,0 +1,50 @@
+"""
+Configuración de Gunicorn para producción
+
+Ejecuta varios workers de Uvicorn (uno por núcleo por defecto) sobre la
+aplicación precargada en el proceso maestro, de modo que cada worker
+arranca con el código ya importado.
+
+Uso:
+    gunicorn -c gunicorn_conf.py main:app
+"""
+import multiprocessing
+import os
+
+# Dirección de escucha
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# Workers asíncronos: uno por núcleo (cada uno atiende muchas conexiones)
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Importar la aplicación una sola vez antes de hacer fork
+preload_app = True
+
+# Segundos para terminar las peticiones en curso al apagar
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+# Worker bloqueado más de este tiempo se reinicia
+timeout = int(os.getenv("WORKER_TIMEOUT", 60))
+# Mantener conexiones HTTP abiertas entre peticiones (detrás de un proxy)
+keepalive = int(os.getenv("KEEPALIVE", 5))
+
+# Logs a la salida estándar
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    """
+    Tras el fork, el hijo abandona las conexiones heredadas del maestro
+    sin cerrarlas (siguen siendo del padre) y abre las suyas propias
+    """
+    from database import dispose_engines
+
+    dispose_engines(close=False)
+    server.log.info(f"Worker {worker.pid}: pools de conexiones reiniciados")
+
+
+def worker_int(worker):
+    """Registro de la señal de parada recibida por un worker"""
+    worker.log.info(f"Worker {worker.pid}: drenando peticiones antes de salir")
@@ -0,0 +1,392 @@
+"""
+Idempotency-Key para las peticiones POST
+
+Cuando el cliente reintenta un POST con la misma cabecera
+Idempotency-Key, se devuelve la respuesta guardada del primer intento
+sin volver a ejecutar el endpoint (ni tocar la tabla de tareas). Las
+peticiones simultáneas con la misma clave se agrupan: solo una se
+ejecuta y las demás esperan su resultado.
+
+La clave se guarda por cliente (hash del token, ver database.client_key),
+método y ruta, junto con un hash del cuerpo: reutilizar la clave con
+otro cuerpo devuelve 422. Solo se guardan las respuestas que no son
+errores del servidor (5xx), que se pueden reintentar.
+
+Backends (IDEMPOTENCY_BACKEND):
+    memory    LRU acotado en memoria de cada proceso (por defecto)
+    database  Tabla idempotency_keys de la base principal, compartida
+              por todos los procesos
+"""
+from collections import OrderedDict
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from database import SessionLocal, client_key
+from models.idempotency_key import IdempotencyKey
+from jobs import job_runner
+
+logger = logging.getLogger(__name__)
+
+# Backend de almacenamiento (memory o database)
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory")
+# Segundos que se recuerda la respuesta de una clave
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 3600))
+# Máximo de claves en memoria por proceso (backend memory)
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", 10_000))
+# Una ejecución sin terminar durante este tiempo se considera abandonada
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 60))
+# Segundos que una petición duplicada espera a que termine la original
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 10))
+# Respuestas más grandes que esto no se guardan
+IDEMPOTENCY_MAX_BODY_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BODY_BYTES", 64 * 1024))
+
+# Cabecera de la petición y métodos a los que se aplica
+IDEMPOTENCY_HEADER = "idempotency-key"
+IDEMPOTENT_METHODS = {"POST"}
+
+
+# ====================
+# BACKENDS
+# ====================
+
+class MemoryIdempotencyStore:
+    """
+    Claves en un LRU acotado en memoria del proceso
+
+    Cada entrada guarda fingerprint, status, response y expires_at.
+    """
+
+    def __init__(self, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, fingerprint: str):
+        """
+        Reclama la ejecución de una clave
+
+        Returns:
+            tuple: (True, None) si esta petición debe ejecutarse, o
+                (False, entrada) si la clave ya existe
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] > now:
+                self._entries.move_to_end(key)
+                return False, entry
+            self._entries[key] = {
+                "fingerprint": fingerprint,
+                "status": "processing",
+                "response": None,
+                "expires_at": now + IDEMPOTENCY_LOCK_SECONDS,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            return True, None
+
+    def get(self, key: str):
+        """Entrada vigente de una clave o None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires_at"] <= time.monotonic():
+                return None
+            return entry
+
+    def complete(self, key: str, response: dict) -> None:
+        """Guarda la respuesta de una clave reclamada"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.update(
+                    status="completed",
+                    response=response,
+                    expires_at=time.monotonic() + IDEMPOTENCY_TTL_SECONDS,
+                )
+
+    def release(self, key: str) -> None:
+        """Libera una clave cuya ejecución falló, para que se pueda reintentar"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Vacía el almacén"""
+        with self._lock:
+            self._entries.clear()
+
+
+class DatabaseIdempotencyStore:
+    """
+    Claves en la tabla idempotency_keys, compartidas entre procesos
+
+    La clave primaria decide qué petición se ejecuta: la inserción de las
+    demás falla y pasan a esperar la respuesta guardada.
+    """
+
+    def _entry(self, row) -> dict:
+        """Entrada en el mismo formato que el backend en memoria"""
+        response = None
+        if row.status == "completed":
+            response = {
+                "status": row.status_code,
+                "headers": json.loads(row.headers or "[]"),
+                "body": row.body or b"",
+            }
+        return {"fingerprint": row.fingerprint, "status": row.status, "response": response}
+
+    def claim(self, key: str, fingerprint: str):
+        now = datetime.utcnow()
+        session = SessionLocal()
+        try:
+            for _ in range(2):
+                try:
+                    session.add(IdempotencyKey(
+                        key=key,
+                        fingerprint=fingerprint,
+                        status="processing",
+                        expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                    ))
+                    session.commit()
+                    return True, None
+                except IntegrityError:
+                    session.rollback()
+                existing = session.get(IdempotencyKey, key)
+                if existing is not None and existing.expires_at > now:
+                    return False, self._entry(existing)
+                # Caducada (o borrada entre medias): se libera y se reintenta
+                session.execute(delete(IdempotencyKey.__table__).where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.expires_at <= now,
+                ))
+                session.commit()
+            return False, {"fingerprint": fingerprint, "status": "processing", "response": None}
+        finally:
+            session.close()
+
+    def get(self, key: str):
+        session = SessionLocal()
+        try:
+            row = session.execute(select(IdempotencyKey).where(
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at > datetime.utcnow(),
+            )).scalar_one_or_none()
+            return self._entry(row) if row is not None else None
+        finally:
+            session.close()
+
+    def complete(self, key: str, response: dict) -> None:
+        session = SessionLocal()
+        try:
+            session.execute(
+                update(IdempotencyKey.__table__)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    status="completed",
+                    status_code=response["status"],
+                    headers=json.dumps(response["headers"]),
+                    body=response["body"],
+                    expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+                )
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    def release(self, key: str) -> None:
+        session = SessionLocal()
+        try:
+            session.execute(delete(IdempotencyKey.__table__).where(IdempotencyKey.key == key))
+            session.commit()
+        finally:
+            session.close()
+
+    def clear(self) -> None:
+        """Las claves de la tabla caducan solas (ver prune_idempotency_keys)"""
+
+
+def build_store(backend: str):
+    """
+    Crea el almacén configurado
+
+    Args:
+        backend: memory o database
+
+    Returns:
+        Almacén de claves
+    """
+    if backend == "database":
+        return DatabaseIdempotencyStore()
+    if backend != "memory":
+        logger.warning(f"⚠️ Backend de idempotencia desconocido: {backend}; se usa memory")
+    return MemoryIdempotencyStore()
+
+
+# Almacén del proceso
+idempotency_store = build_store(IDEMPOTENCY_BACKEND)
+
+
+# ====================
+# MIDDLEWARE
+# ====================
+
+async def _send_json(send, status_code: int, detail: str) -> None:
+    """Envía una respuesta de error JSON"""
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send, response: dict) -> None:
+    """Reenvía una respuesta guardada"""
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response["headers"]]
+    headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": response["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": response["body"]})
+
+
+class IdempotencyMiddleware:
+    """
+    Middleware ASGI que aplica Idempotency-Key a los POST
+
+    Args:
+        app: Aplicación ASGI
+        store: Almacén de claves (por defecto el configurado)
+    """
+
+    def __init__(self, app, store=None):
+        self.app = app
+        self.store = store or idempotency_store
+        # Ejecuciones en curso en este proceso, para despertar a los duplicados
+        self._inflight = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        header = request.headers.get(IDEMPOTENCY_HEADER)
+        if header is None:
+            await self.app(scope, receive, send)
+            return
+        if not header or len(header) > 255:
+            await _send_json(send, 400, "Idempotency-Key debe tener entre 1 y 255 caracteres")
+            return
+
+        # Leer el cuerpo para calcular su huella y reenviarlo después a la app
+        body = await request.body()
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = hashlib.sha256(
+            "\n".join((client_key(request), scope["method"], scope["path"], header)).encode()
+        ).hexdigest()
+
+        claimed, entry = await run_in_threadpool(self.store.claim, key, fingerprint)
+        if not claimed:
+            await self._answer_duplicate(send, key, fingerprint, entry)
+            return
+
+        event = self._inflight[key] = asyncio.Event()
+        try:
+            await self._execute(scope, body, send, key)
+        finally:
+            event.set()
+            self._inflight.pop(key, None)
+
+    async def _execute(self, scope, body: bytes, send, key: str) -> None:
+        """Ejecuta la petición original y guarda su respuesta"""
+        sent_body = False
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        response = {"status": None, "headers": [], "body": b""}
+        storable = True
+
+        async def capture(message):
+            nonlocal storable
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body" and storable:
+                response["body"] += message.get("body", b"")
+                if len(response["body"]) > IDEMPOTENCY_MAX_BODY_BYTES:
+                    storable = False
+                    response["body"] = b""
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await run_in_threadpool(self.store.release, key)
+            raise
+
+        if storable and response["status"] is not None and response["status"] < 500:
+            await run_in_threadpool(self.store.complete, key, response)
+        else:
+            await run_in_threadpool(self.store.release, key)
+
+    async def _answer_duplicate(self, send, key: str, fingerprint: str, entry: dict) -> None:
+        """Responde a una petición con una clave ya usada o en curso"""
+        if entry["fingerprint"] != fingerprint:
+            await _send_json(send, 422, "Idempotency-Key reutilizada con una petición distinta")
+            return
+
+        # Esperar a que termine la ejecución original (en este u otro proceso)
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while entry is not None and entry["status"] != "completed" and time.monotonic() < deadline:
+            event = self._inflight.get(key)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(0.05)
+            entry = await run_in_threadpool(self.store.get, key)
+
+        if entry is None:
+            # La ejecución original falló y liberó la clave: el cliente puede reintentar
+            await _send_json(send, 409, "La petición original con esta Idempotency-Key falló; reinténtala")
+        elif entry["status"] != "completed":
+            await _send_json(send, 409, "Hay una petición en curso con esta Idempotency-Key")
+        else:
+            await _replay(send, entry["response"])
+
+
+@job_runner.register("prune_idempotency_keys")
+def prune_idempotency_keys(payload: dict) -> None:
+    """Borra las claves caducadas de la tabla (backend database)"""
+    session = SessionLocal()
+    try:
+        session.execute(delete(IdempotencyKey.__table__).where(
+            IdempotencyKey.expires_at < datetime.utcnow()
+        ))
+        session.commit()
+    finally:
+        session.close()
+
+
+if IDEMPOTENCY_BACKEND == "database":
+    job_runner.schedule_every("prune_idempotency_keys", 3600)
@@ -0,0 +1,358 @@
+"""
+Ejecutor de trabajos en segundo plano
+
+Los trabajos se guardan en la tabla jobs de la base principal, así que
+sobreviven a reinicios y los pueden ejecutar varios workers de la API a
+la vez. Cada proceso:
+
+    - Reclama trabajos listos con un UPDATE condicional (solo uno gana)
+      y un arrendamiento (locked_until) que se renueva cada
+      JOB_HEARTBEAT_SECONDS mientras el trabajo se ejecuta; si el proceso
+      muere, otro lo retoma al vencer el arrendamiento
+    - Registra el resultado solo si el arrendamiento sigue siendo suyo
+    - Los ejecuta en un pool de hilos acotado (JOB_WORKERS)
+    - Reintenta los fallos con espera exponencial hasta max_attempts
+    - Encola los trabajos periódicos con una dedupe_key por intervalo,
+      de modo que solo se crea uno aunque haya muchos procesos
+
+Uso:
+    @job_runner.register("nombre")
+    def handler(payload: dict): ...
+
+    job_runner.enqueue("nombre", {"arg": 1})
+    job_runner.schedule_every("nombre", 3600)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+
+from database import SessionLocal
+from models.job import Job
+
+logger = logging.getLogger(__name__)
+
+# Hilos que ejecutan trabajos en cada proceso
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Segundos entre consultas de trabajos pendientes
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))
+# Duración del arrendamiento de un trabajo en ejecución
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 600))
+# Segundos entre renovaciones del arrendamiento de un trabajo en ejecución
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", JOB_LEASE_SECONDS / 3))
+# Espera base y máxima entre reintentos
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", 5))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", 3600))
+# Días que se conservan los trabajos terminados
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", 7))
+# Desactiva el ejecutor en este proceso (ej: en procesos de solo API)
+JOB_RUNNER_ENABLED = os.getenv("JOB_RUNNER_ENABLED", "true").lower() == "true"
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Espera antes del siguiente intento: exponencial con jitter
+
+    Args:
+        attempts: Intentos ya realizados
+
+    Returns:
+        float: Segundos de espera
+    """
+    delay = min(JOB_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobRunner:
+    """
+    Ejecutor de trabajos persistentes con pool de hilos acotado
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.handlers = {}
+        self.periodic = {}
+        self._executor = None
+        self._poller = None
+        self._running = set()
+        self._last_slot = {}
+
+    def register(self, name: str):
+        """
+        Decorador para registrar el manejador de un tipo de trabajo
+
+        Args:
+            name: Nombre del trabajo
+        """
+        def decorator(func):
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    def schedule_every(self, name: str, interval: float, payload: dict = None) -> None:
+        """
+        Programa un trabajo periódico
+
+        Args:
+            name: Nombre del trabajo registrado
+            interval: Segundos entre ejecuciones (0 o negativo = desactivado)
+            payload: Argumentos del trabajo
+        """
+        if interval > 0:
+            self.periodic[name] = (interval, payload or {})
+
+    def enqueue(
+        self,
+        name: str,
+        payload: dict = None,
+        run_at: datetime = None,
+        max_attempts: int = 5,
+        dedupe_key: str = None,
+        db=None,
+    ):
+        """
+        Encola un trabajo
+
+        Args:
+            name: Nombre del trabajo registrado
+            payload: Argumentos (serializables a JSON)
+            run_at: Fecha de ejecución (por defecto, ahora)
+            max_attempts: Intentos máximos
+            dedupe_key: Clave única; si ya existe no se encola otro
+            db: Sesión a usar (para encolar en la misma transacción que otros cambios)
+
+        Returns:
+            Job: Trabajo encolado, o None si la dedupe_key ya existía
+        """
+        job = Job(
+            name=name,
+            payload=json.dumps(payload or {}),
+            status="queued",
+            max_attempts=max_attempts,
+            run_at=run_at or datetime.utcnow(),
+            dedupe_key=dedupe_key,
+        )
+        if db is not None:
+            db.add(job)
+            return job
+
+        session = SessionLocal()
+        try:
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            session.expunge(job)
+            return job
+        except IntegrityError:
+            session.rollback()
+            return None
+        finally:
+            session.close()
+
+    def _enqueue_periodic(self) -> None:
+        """Crea la ejecución del intervalo actual de cada trabajo periódico"""
+        now = time.time()
+        for name, (interval, payload) in self.periodic.items():
+            slot = int(now // interval)
+            # Solo se intenta una vez por intervalo en cada proceso
+            if self._last_slot.get(name) == slot:
+                continue
+            self._last_slot[name] = slot
+            self.enqueue(
+                name,
+                payload,
+                run_at=datetime.utcfromtimestamp(slot * interval),
+                dedupe_key=f"{name}:{slot}",
+            )
+
+    def _claim(self, limit: int) -> list:
+        """
+        Reclama hasta limit trabajos listos para este proceso
+
+        Returns:
+            list: IDs reclamados
+        """
+        now = datetime.utcnow()
+        ready = or_(
+            (Job.status == "queued") & (Job.run_at <= now),
+            (Job.status == "running") & (Job.locked_until < now),
+        )
+        session = SessionLocal()
+        try:
+            candidates = session.execute(
+                select(Job.id).where(ready).order_by(Job.run_at).limit(limit * 2)
+            ).scalars().all()
+
+            claimed = []
+            for job_id in candidates:
+                result = session.execute(
+                    update(Job.__table__)
+                    .where(Job.id == job_id, ready)
+                    .values(
+                        status="running",
+                        locked_by=self.worker_id,
+                        locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                        attempts=Job.attempts + 1,
+                        updated_at=now,
+                    )
+                )
+                session.commit()
+                if result.rowcount == 1:
+                    claimed.append(job_id)
+                if len(claimed) >= limit:
+                    break
+            return claimed
+        finally:
+            session.close()
+
+    def _owned(self, job_id: int, attempts: int):
+        """
+        Condición de que el trabajo sigue reclamado por este proceso
+
+        El número de intento distingue esta ejecución de una anterior del
+        mismo proceso cuyo arrendamiento venció.
+        """
+        return (
+            (Job.id == job_id)
+            & (Job.status == "running")
+            & (Job.locked_by == self.worker_id)
+            & (Job.attempts == attempts)
+        )
+
+    def _heartbeat(self, job_id: int, attempts: int, done: threading.Event) -> None:
+        """Renueva el arrendamiento hasta que el trabajo termina o deja de ser suyo"""
+        while not done.wait(JOB_HEARTBEAT_SECONDS):
+            session = SessionLocal()
+            try:
+                renewed = session.execute(
+                    update(Job.__table__)
+                    .where(self._owned(job_id, attempts))
+                    .values(locked_until=datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS))
+                ).rowcount
+                session.commit()
+            except Exception as exc:
+                logger.warning(f"⚠️ No se pudo renovar el arrendamiento del trabajo #{job_id}: {exc}")
+                continue
+            finally:
+                session.close()
+            if not renewed:
+                logger.warning(f"⚠️ El trabajo #{job_id} ya no pertenece a este proceso")
+                return
+
+    def _execute(self, job_id: int) -> None:
+        """Ejecuta un trabajo reclamado y registra su resultado"""
+        session = SessionLocal()
+        try:
+            job = session.get(Job, job_id)
+            name, payload = job.name, job.payload
+            attempts, max_attempts = job.attempts, job.max_attempts
+            session.commit()
+
+            done = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat, args=(job_id, attempts, done),
+                name=f"job-heartbeat-{job_id}", daemon=True,
+            )
+            heartbeat.start()
+            handler = self.handlers.get(name)
+            try:
+                if handler is None:
+                    raise LookupError(f"Trabajo sin manejador registrado: {name}")
+                handler(json.loads(payload))
+            except Exception as exc:
+                session.rollback()
+                if attempts >= max_attempts:
+                    values = {"status": "dead", "finished_at": datetime.utcnow()}
+                    logger.error(f"💀 Trabajo {name}#{job_id} agotó sus intentos: {exc}")
+                else:
+                    values = {
+                        "status": "queued",
+                        "run_at": datetime.utcnow() + timedelta(seconds=retry_delay(attempts)),
+                    }
+                    logger.warning(f"🔁 Trabajo {name}#{job_id} falló (intento {attempts}): {exc}")
+                values["last_error"] = str(exc)
+            else:
+                values = {"status": "succeeded", "finished_at": datetime.utcnow()}
+            finally:
+                done.set()
+                heartbeat.join()
+
+            # Si otro proceso lo retomó, el resultado que cuenta es el suyo
+            recorded = session.execute(
+                update(Job.__table__)
+                .where(self._owned(job_id, attempts))
+                .values(**values, locked_by=None, locked_until=None, updated_at=datetime.utcnow())
+            ).rowcount
+            session.commit()
+            if not recorded:
+                logger.warning(f"⚠️ Trabajo {name}#{job_id} terminado tras perder el arrendamiento; no se registra")
+        finally:
+            session.close()
+            self._running.discard(job_id)
+
+    async def _poll(self) -> None:
+        """Bucle que encola periódicos, reclama trabajos y los reparte al pool"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self._enqueue_periodic)
+                free = self.workers - len(self._running)
+                if free > 0:
+                    for job_id in await loop.run_in_executor(None, self._claim, free):
+                        self._running.add(job_id)
+                        self._executor.submit(self._execute, job_id)
+            except Exception as exc:
+                logger.warning(f"⚠️ Error en el ejecutor de trabajos: {exc}")
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+    async def start(self) -> None:
+        """Arranca el pool de hilos y el bucle de sondeo"""
+        if not JOB_RUNNER_ENABLED or self._poller is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._poller = asyncio.create_task(self._poll())
+        logger.info(f"⚙️ Ejecutor de trabajos iniciado con {self.workers} hilos")
+
+    async def stop(self) -> None:
+        """
+        Deja de reclamar trabajos y espera a que terminen los que están en curso
+        """
+        if self._poller is None:
+            return
+        self._poller.cancel()
+        self._poller = None
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown, True)
+        self._executor = None
+
+
+# Ejecutor global de la aplicación
+job_runner = JobRunner()
+
+
+@job_runner.register("prune_jobs")
+def prune_jobs(payload: dict) -> None:
+    """Borra los trabajos terminados hace más de JOB_RETENTION_DAYS días"""
+    cutoff = datetime.utcnow() - timedelta(days=JOB_RETENTION_DAYS)
+    session = SessionLocal()
+    try:
+        session.execute(
+            delete(Job.__table__).where(
+                Job.status.in_(["succeeded", "dead"]),
+                Job.finished_at < cutoff,
+            )
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+job_runner.schedule_every("prune_jobs", 24 * 3600)
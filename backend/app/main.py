@@ -1,16 +1,76 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import logging
 
-from database import engine, Base
-from routes import auth_router, users_router, categories_router, tasks_router
+from database import (
+    engine,
+    replica_engine,
+    warmup_pool,
+    get_pool_status,
+    dispose_engines,
+    read_your_writes,
+)
+from routes import auth_router, users_router, categories_router, tasks_router, tags_router, views_router
+from sharding import shard_router
+from jobs import job_runner
+from idempotency import IdempotencyMiddleware, idempotency_store
+from ratelimit import RateLimitMiddleware, rate_limit_store
+from admission import AdmissionMiddleware, admission_controller
+from compression import CompressionMiddleware
+import archive  # noqa: F401  (registra el trabajo de archivado)
+import purge  # noqa: F401  (registra los trabajos de purga de cuentas)
+import reminders  # noqa: F401  (registra el trabajo de recordatorios)
+import reconcile  # noqa: F401  (registra la reconciliación de contadores)
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Crear las tablas en la base de datos
-Base.metadata.create_all(bind=engine)
+# El esquema no se crea al importar: se gestiona con "python manage.py migrate"
+
+
+# ==================== 
+# CICLO DE VIDA 
+# ====================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida de la aplicación: es dueño de los engines y las cachés
+
+    Al arrancar precalienta los pools de conexiones; al cerrar (una vez
+    drenadas las peticiones en curso) vacía las cachés y cierra los pools
+    """
+    logger.info("🚀 Iniciando Task Manager API...")
+    logger.info("📊 Base de datos: MySQL")
+    logger.info("🔐 Autenticación: JWT")
+    logger.info("✨ CORS configurado para Angular")
+    
+    # Abrir las conexiones mínimas del pool antes de recibir tráfico
+    try:
+        warmup_pool()
+        if replica_engine is not engine:
+            warmup_pool(replica_engine)
+    except Exception as exc:
+        logger.warning(f"⚠️ No se pudo precalentar el pool de conexiones: {exc}")
+    
+    # Trabajos en segundo plano (archivado, purgas de cuentas...)
+    await job_runner.start()
+    
+    # Medición del retraso del bucle de eventos para el control de admisión
+    admission_controller.start()
+    
+    yield
+    
+    logger.info("👋 Cerrando Task Manager API...")
+    await admission_controller.stop()
+    await job_runner.stop()
+    read_your_writes.clear()
+    idempotency_store.clear()
+    rate_limit_store.clear()
+    shard_router.clear()
+    dispose_engines()
+
 
 # Crear la aplicación FastAPI
 app = FastAPI(
@@ -18,9 +78,46 @@ app = FastAPI(
     description="API REST para gestión de tareas con autenticación JWT",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# ============================ 
+# IDEMPOTENCIA DE LOS POST 
+# ============================
+
+# Los reintentos con la misma Idempotency-Key devuelven la respuesta guardada.
+# Se registra antes que CORS para quedar por dentro: las respuestas
+# repetidas también pasan por CORS
+app.add_middleware(IdempotencyMiddleware)
+
+# ============================ 
+# LÍMITE DE PETICIONES 
+# ============================
+
+# Cubos de fichas por IP, usuario y ruta (login más estricto). Queda por
+# fuera de la idempotencia, para rechazar antes de leer el cuerpo, y por
+# dentro de CORS, para que el navegador pueda leer los 429
+app.add_middleware(RateLimitMiddleware)
+
+# ============================ 
+# CONTROL DE ADMISIÓN 
+# ============================
+
+# Con el proceso sobrecargado (bucle de eventos lento, espera por el pool
+# o demasiadas peticiones en curso) descarta con 503 el trabajo de baja
+# prioridad antes que nada más; login y escrituras siempre pasan
+app.add_middleware(AdmissionMiddleware)
+
+# ============================ 
+# COMPRESIÓN DE RESPUESTAS 
+# ============================
+
+# gzip (o brotli/zstd si están instalados) por encima de un tamaño mínimo.
+# Queda por fuera de la idempotencia, que guarda las respuestas sin
+# comprimir y así cada reintento negocia su propia codificación
+app.add_middleware(CompressionMiddleware)
+
 # ======================= 
 # CONFIGURACIÓN DE CORS 
 # =======================
@@ -71,7 +168,10 @@ async def health_check():
     """
     return {
         "status": "healthy",
-        "database": "connected"
+        "database": "connected",
+        "pool": get_pool_status(),
+        "replica_pool": get_pool_status(replica_engine) if replica_engine is not engine else None,
+        "admission": admission_controller.status()
     }
 
 
@@ -84,32 +184,10 @@ app.include_router(auth_router)      # Rutas de autenticación
 app.include_router(users_router)     # Rutas de usuarios
 app.include_router(categories_router) # Rutas de categorías
 app.include_router(tasks_router)     # Rutas de tareas
+app.include_router(tags_router)      # Rutas de etiquetas
+app.include_router(views_router)     # Rutas de vistas guardadas
 
 logger.info("✅ Aplicación FastAPI iniciada correctamente")
 logger.info("📚 Documentación disponible en: http://localhost:8001/docs")
 logger.info("🔄 Redoc disponible en: http://localhost:8001/redoc")
 
-
-# ==================== 
-# EVENTO: STARTUP 
-# ====================
-@app.on_event("startup")
-async def startup_event():
-    """
-    Evento que se ejecuta al iniciar la aplicación
-    """
-    logger.info("🚀 Iniciando Task Manager API...")
-    logger.info("📊 Base de datos: MySQL")
-    logger.info("🔐 Autenticación: JWT")
-    logger.info("✨ CORS configurado para Angular")
-
-
-# ==================== 
-# EVENTO: SHUTDOWN 
-# ====================
-@app.on_event("shutdown")
-async def shutdown_event():
-    """
-    Evento que se ejecuta al cerrar la aplicación
-    """
-    logger.info("👋 Cerrando Task Manager API...")
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Comandos de administración de la base de datos
+
+La aplicación no toca la base de datos al importarse: el esquema se
+gestiona de forma explícita con este comando antes de arrancar los
+workers (por ejemplo, como paso de despliegue).
+
+Uso:
+    python manage.py migrate [--target 0002]
+    python manage.py migrate --status
+"""
+import argparse
+import logging
+
+from database import engine
+from sharding import shard_router
+from migrations import run_migrations, migration_status
+
+logger = logging.getLogger(__name__)
+
+
+def _databases() -> dict:
+    """Bases de datos a migrar: la principal y cada shard"""
+    databases = {"primary": engine}
+    if shard_router.enabled:
+        databases.update(shard_router.engines)
+    return databases
+
+
+def migrate(target: str = None) -> None:
+    """
+    Aplica las migraciones pendientes en la base principal y en cada shard
+
+    Args:
+        target: Última versión a aplicar (por defecto todas)
+    """
+    for name, db_engine in _databases().items():
+        applied = run_migrations(db_engine, target)
+        if applied:
+            logger.info(f"✅ {name}: migraciones aplicadas {', '.join(applied)}")
+        else:
+            logger.info(f"✅ {name}: esquema al día")
+
+
+def status() -> None:
+    """
+    Muestra el estado de las migraciones en cada base de datos
+    """
+    for name, db_engine in _databases().items():
+        print(f"[{name}]")
+        for migration in migration_status(db_engine):
+            progress = f" ({migration['progress']})" if migration["progress"] else ""
+            print(f"  {migration['version']} {migration['status']:8} {migration['description']}{progress}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Administración de la base de datos")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subcommands.add_parser("migrate", help="Aplicar las migraciones pendientes")
+    migrate_parser.add_argument("--target", help="Última versión a aplicar")
+    migrate_parser.add_argument("--status", action="store_true", help="Mostrar el estado sin migrar")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        if args.status:
+            status()
+        else:
+            migrate(args.target)
@@ -0,0 +1,17 @@
+"""
+Módulo de migraciones versionadas del esquema
+Cada versión vive en migrations/versions y se aplica una sola vez
+"""
+from .runner import MigrationContext, run_migrations, migration_status
+from .online import create_index_online, add_column_online, create_table, backfill
+
+# Exportar la API de migraciones
+__all__ = [
+    "MigrationContext",
+    "run_migrations",
+    "migration_status",
+    "create_index_online",
+    "add_column_online",
+    "create_table",
+    "backfill",
+]
@@ -0,0 +1,141 @@
+"""
+Operaciones de esquema en caliente
+
+En MySQL todas las operaciones DDL piden ALGORITHM=INPLACE, LOCK=NONE:
+si el servidor no puede hacerlas sin bloquear escrituras, falla de
+inmediato en lugar de bloquear la tabla durante horas. Los rellenos de
+datos se hacen en lotes pequeños por rangos de clave primaria, con
+pausas entre lotes y progreso reportado en schema_migrations.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+import time
+
+# Opciones de DDL en línea de MySQL
+ONLINE_DDL = "ALGORITHM=INPLACE, LOCK=NONE"
+
+
+def create_table(ctx, table) -> bool:
+    """
+    Crea una tabla si no existe
+
+    Args:
+        ctx: Contexto de la migración
+        table: Objeto Table de SQLAlchemy (ej: Model.__table__)
+
+    Returns:
+        bool: True si se creó
+    """
+    if inspect(ctx.engine).has_table(table.name):
+        return False
+    table.create(bind=ctx.engine)
+    ctx.report(f"tabla {table.name} creada")
+    return True
+
+
+def create_index_online(ctx, table: str, name: str, columns: list, unique: bool = False) -> bool:
+    """
+    Crea un índice sin bloquear las escrituras sobre la tabla
+
+    Args:
+        ctx: Contexto de la migración
+        table: Nombre de la tabla
+        name: Nombre del índice
+        columns: Columnas del índice, en orden
+        unique: Índice único
+
+    Returns:
+        bool: True si se creó (False si ya existía)
+    """
+    existing = {index["name"] for index in inspect(ctx.engine).get_indexes(table)}
+    if name in existing:
+        return False
+
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    column_list = ", ".join(columns)
+    if ctx.is_mysql:
+        statement = f"ALTER TABLE {table} ADD {kind} {name} ({column_list}), {ONLINE_DDL}"
+    else:
+        statement = f"CREATE {kind} {name} ON {table} ({column_list})"
+
+    ctx.report(f"creando índice {name} en {table}")
+    with ctx.engine.begin() as connection:
+        connection.execute(text(statement))
+    ctx.report(f"índice {name} creado")
+    return True
+
+
+def add_column_online(ctx, table: str, column) -> bool:
+    """
+    Añade una columna sin bloquear las escrituras
+
+    La columna debe ser NULL o tener un DEFAULT constante para que MySQL
+    pueda añadirla en línea; los valores se rellenan después con backfill().
+
+    Args:
+        ctx: Contexto de la migración
+        table: Nombre de la tabla
+        column: Objeto Column de SQLAlchemy
+
+    Returns:
+        bool: True si se añadió
+    """
+    existing = {col["name"] for col in inspect(ctx.engine).get_columns(table)}
+    if column.name in existing:
+        return False
+
+    definition = CreateColumn(column).compile(dialect=ctx.engine.dialect)
+    statement = f"ALTER TABLE {table} ADD COLUMN {definition}"
+    if ctx.is_mysql:
+        statement += f", {ONLINE_DDL}"
+
+    with ctx.engine.begin() as connection:
+        connection.execute(text(statement))
+    ctx.report(f"columna {table}.{column.name} añadida")
+    return True
+
+
+def backfill(ctx, table: str, set_clause: str, where: str = "1=1", batch_size: int = 5000, pause: float = 0.1, params: dict = None) -> int:
+    """
+    Actualiza filas en lotes acotados por rango de id
+
+    Cada lote es una transacción corta, así que los bloqueos de fila
+    duran milisegundos y la réplica no se retrasa.
+
+    Args:
+        ctx: Contexto de la migración
+        table: Nombre de la tabla (con clave primaria entera "id")
+        set_clause: Expresión SET (ej: "updated_at = created_at")
+        where: Condición adicional de las filas a actualizar
+        batch_size: Rango de ids por lote
+        pause: Segundos de espera entre lotes
+        params: Parámetros ligados para set_clause/where
+
+    Returns:
+        int: Filas actualizadas
+    """
+    params = dict(params or {})
+    with ctx.engine.connect() as connection:
+        bounds = connection.execute(text(f"SELECT MIN(id), MAX(id) FROM {table}")).one()
+    if bounds[0] is None:
+        return 0
+
+    first_id, last_id = bounds
+    updated = 0
+    start = first_id
+    statement = text(
+        f"UPDATE {table} SET {set_clause} "
+        f"WHERE id >= :_start AND id < :_end AND ({where})"
+    )
+    while start <= last_id:
+        end = start + batch_size
+        with ctx.engine.begin() as connection:
+            result = connection.execute(statement, {**params, "_start": start, "_end": end})
+        updated += result.rowcount
+        done = min(end, last_id + 1) - first_id
+        total = last_id + 1 - first_id
+        ctx.report(f"{table}: {done}/{total} ids revisados, {updated} filas actualizadas")
+        start = end
+        if pause:
+            time.sleep(pause)
+    return updated
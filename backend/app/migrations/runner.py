@@ -0,0 +1,192 @@
+"""
+Ejecutor de migraciones versionadas
+
+Las versiones aplicadas se registran en la tabla schema_migrations de
+cada base de datos (principal y shards), junto con su estado y el
+último progreso reportado, de modo que una migración larga se puede
+seguir desde otra consola con "python manage.py migrate --status".
+"""
+from sqlalchemy import Column, DateTime, MetaData, String, Table, text
+from datetime import datetime
+import importlib
+import logging
+import os
+import pkgutil
+
+logger = logging.getLogger(__name__)
+
+# Tabla de control, fuera de Base para que no dependa de los modelos
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String(20), primary_key=True),
+    Column("description", String(200)),
+    Column("status", String(20), nullable=False),  # running | applied
+    Column("progress", String(255)),
+    Column("started_at", DateTime),
+    Column("applied_at", DateTime),
+)
+
+
+class MigrationContext:
+    """
+    Contexto que recibe cada migración
+
+    Atributos:
+        engine: Engine de la base de datos que se está migrando
+        version: Versión en curso
+    """
+
+    def __init__(self, engine, version: str):
+        self.engine = engine
+        self.version = version
+
+    @property
+    def is_mysql(self) -> bool:
+        """Indica si la base de datos es MySQL/MariaDB"""
+        return self.engine.dialect.name == "mysql"
+
+    def report(self, message: str) -> None:
+        """
+        Registra el progreso de la migración en curso
+
+        Args:
+            message: Texto de progreso (ej: "tasks: 120000/50000000")
+        """
+        logger.info(f"⏳ [{self.version}] {message}")
+        with self.engine.begin() as connection:
+            connection.execute(
+                schema_migrations.update()
+                .where(schema_migrations.c.version == self.version)
+                .values(progress=message[:255])
+            )
+
+
+def discover_migrations() -> list:
+    """
+    Busca las migraciones disponibles ordenadas por versión
+
+    Returns:
+        list: Módulos de migración (con VERSION, DESCRIPTION y upgrade)
+    """
+    package = importlib.import_module("migrations.versions")
+    modules = [
+        importlib.import_module(f"migrations.versions.{info.name}")
+        for info in pkgutil.iter_modules([os.path.dirname(package.__file__)])
+    ]
+    return sorted(modules, key=lambda module: module.VERSION)
+
+
+def _applied_versions(engine) -> dict:
+    """Versiones registradas y su estado"""
+    with engine.connect() as connection:
+        rows = connection.execute(
+            schema_migrations.select().order_by(schema_migrations.c.version)
+        ).mappings().all()
+    return {row["version"]: dict(row) for row in rows}
+
+
+def _acquire_lock(connection) -> None:
+    """Evita que dos despliegues migren la misma base a la vez (solo MySQL)"""
+    if connection.dialect.name != "mysql":
+        return
+    acquired = connection.execute(text("SELECT GET_LOCK('schema_migrations', 0)")).scalar()
+    if not acquired:
+        raise RuntimeError("Otra migración está en curso sobre esta base de datos")
+
+
+def _release_lock(connection) -> None:
+    """
+    Libera el bloqueo de migraciones (solo MySQL)
+
+    Si la conexión quedó inservible se invalida: al cerrarse se descarta
+    en lugar de volver al pool, y MySQL suelta el bloqueo con la sesión.
+    """
+    if connection.dialect.name != "mysql":
+        return
+    try:
+        connection.execute(text("SELECT RELEASE_LOCK('schema_migrations')"))
+    except Exception as exc:
+        logger.warning(f"⚠️ No se pudo liberar el bloqueo de migraciones: {exc}")
+        connection.invalidate()
+
+
+def run_migrations(engine, target: str = None) -> list:
+    """
+    Aplica en orden las migraciones pendientes
+
+    Una migración que quedó en estado "running" (proceso interrumpido)
+    se vuelve a ejecutar; por eso todas deben ser idempotentes.
+
+    Args:
+        engine: Engine de la base de datos a migrar
+        target: Última versión a aplicar (por defecto todas)
+
+    Returns:
+        list: Versiones aplicadas en esta ejecución
+    """
+    _metadata.create_all(bind=engine)
+
+    applied = []
+    with engine.connect() as lock_connection:
+        _acquire_lock(lock_connection)
+
+        try:
+            done = _applied_versions(engine)
+            for module in discover_migrations():
+                if target is not None and module.VERSION > target:
+                    break
+                if done.get(module.VERSION, {}).get("status") == "applied":
+                    continue
+
+                logger.info(f"🚚 Aplicando migración {module.VERSION}: {module.DESCRIPTION}")
+                with engine.begin() as connection:
+                    connection.execute(schema_migrations.delete().where(
+                        schema_migrations.c.version == module.VERSION
+                    ))
+                    connection.execute(schema_migrations.insert().values(
+                        version=module.VERSION,
+                        description=module.DESCRIPTION[:200],
+                        status="running",
+                        started_at=datetime.utcnow(),
+                    ))
+
+                module.upgrade(MigrationContext(engine, module.VERSION))
+
+                with engine.begin() as connection:
+                    connection.execute(
+                        schema_migrations.update()
+                        .where(schema_migrations.c.version == module.VERSION)
+                        .values(status="applied", applied_at=datetime.utcnow())
+                    )
+                applied.append(module.VERSION)
+        finally:
+            # También si una migración falla: si no, el bloqueo sigue tomado
+            # en la conexión devuelta al pool y los siguientes despliegues fallan
+            _release_lock(lock_connection)
+
+    return applied
+
+
+def migration_status(engine) -> list:
+    """
+    Estado de todas las migraciones conocidas en una base de datos
+
+    Args:
+        engine: Engine de la base de datos
+
+    Returns:
+        list: Diccionarios con version, description, status y progress
+    """
+    _metadata.create_all(bind=engine)
+    done = _applied_versions(engine)
+    return [
+        {
+            "version": module.VERSION,
+            "description": module.DESCRIPTION,
+            "status": done.get(module.VERSION, {}).get("status", "pending"),
+            "progress": done.get(module.VERSION, {}).get("progress"),
+        }
+        for module in discover_migrations()
+    ]
@@ -0,0 +1,17 @@
+"""
+Esquema inicial: usuarios, categorías, tareas y ubicación en shards
+
+En bases creadas con database/init.sql las tablas ya existen y esta
+versión solo las registra como aplicadas.
+"""
+from database import Base
+from migrations.online import create_table
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0001"
+DESCRIPTION = "Esquema inicial"
+
+
+def upgrade(ctx):
+    for name in ("users", "categories", "tasks", "user_shards"):
+        create_table(ctx, Base.metadata.tables[name])
@@ -0,0 +1,17 @@
+"""
+Índices compuestos para el listado y las estadísticas de tareas
+
+Sustituyen los recorridos por user_id seguidos de ordenación o filtrado
+por (user_id, created_at) y (user_id, is_completed, due_date).
+"""
+from migrations.online import create_index_online
+
+VERSION = "0002"
+DESCRIPTION = "Índices compuestos de tareas por usuario"
+
+
+def upgrade(ctx):
+    create_index_online(ctx, "tasks", "ix_tasks_user_created", ["user_id", "created_at"])
+    create_index_online(
+        ctx, "tasks", "ix_tasks_user_completed_due", ["user_id", "is_completed", "due_date"]
+    )
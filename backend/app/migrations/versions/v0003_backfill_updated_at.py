@@ -0,0 +1,17 @@
+"""
+Rellena updated_at en las filas que no lo tienen
+
+init.sql define updated_at con DEFAULT CURRENT_TIMESTAMP, pero las tablas
+creadas desde el ORM no tenían valor por defecto en la base de datos, así
+que las filas insertadas fuera del ORM quedaban con NULL y TaskResponse
+fallaba al serializarlas.
+"""
+from migrations.online import backfill
+
+VERSION = "0003"
+DESCRIPTION = "Rellenar updated_at nulos con created_at"
+
+
+def upgrade(ctx):
+    for table in ("users", "tasks"):
+        backfill(ctx, table, "updated_at = created_at", where="updated_at IS NULL")
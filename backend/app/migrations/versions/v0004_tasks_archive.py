@@ -0,0 +1,14 @@
+"""
+Tabla de archivo de tareas completadas e índice para seleccionarlas
+"""
+from database import Base
+from migrations.online import create_table, create_index_online
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0004"
+DESCRIPTION = "Archivo de tareas completadas"
+
+
+def upgrade(ctx):
+    create_table(ctx, Base.metadata.tables["tasks_archive"])
+    create_index_online(ctx, "tasks", "ix_tasks_completed_at", ["is_completed", "completed_at"])
@@ -0,0 +1,13 @@
+"""
+Tabla de progreso del borrado asíncrono de cuentas
+"""
+from database import Base
+from migrations.online import create_table
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0005"
+DESCRIPTION = "Borrado asíncrono de cuentas"
+
+
+def upgrade(ctx):
+    create_table(ctx, Base.metadata.tables["account_deletions"])
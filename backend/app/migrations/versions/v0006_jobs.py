@@ -0,0 +1,13 @@
+"""
+Tabla de trabajos en segundo plano
+"""
+from database import Base
+from migrations.online import create_table
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0006"
+DESCRIPTION = "Trabajos en segundo plano"
+
+
+def upgrade(ctx):
+    create_table(ctx, Base.metadata.tables["jobs"])
@@ -0,0 +1,14 @@
+"""
+Recordatorios de vencimiento: tabla de envíos e índice de tareas abiertas por fecha
+"""
+from database import Base
+from migrations.online import create_table, create_index_online
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0007"
+DESCRIPTION = "Recordatorios de vencimiento"
+
+
+def upgrade(ctx):
+    create_table(ctx, Base.metadata.tables["task_reminders"])
+    create_index_online(ctx, "tasks", "ix_tasks_open_due", ["is_completed", "due_date"])
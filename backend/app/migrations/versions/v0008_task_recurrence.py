@@ -0,0 +1,13 @@
+"""
+Regla de recurrencia en las tareas (y en el archivo, que copia sus columnas)
+"""
+from sqlalchemy import Column, String
+from migrations.online import add_column_online
+
+VERSION = "0008"
+DESCRIPTION = "Tareas recurrentes"
+
+
+def upgrade(ctx):
+    for table in ("tasks", "tasks_archive"):
+        add_column_online(ctx, table, Column("recurrence", String(200), nullable=True))
@@ -0,0 +1,11 @@
+"""
+Índice (user_id, due_date) para las consultas por rango del calendario
+"""
+from migrations.online import create_index_online
+
+VERSION = "0009"
+DESCRIPTION = "Índice de tareas por usuario y fecha límite"
+
+
+def upgrade(ctx):
+    create_index_online(ctx, "tasks", "ix_tasks_user_due", ["user_id", "due_date"])
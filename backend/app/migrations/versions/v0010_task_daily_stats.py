@@ -0,0 +1,16 @@
+"""
+Agregados diarios de tareas para las series temporales
+
+La tabla nace vacía; el historial se rellena con:
+    python rollups.py backfill
+"""
+from database import Base
+from migrations.online import create_table
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0010"
+DESCRIPTION = "Agregados diarios de tareas"
+
+
+def upgrade(ctx):
+    create_table(ctx, Base.metadata.tables["task_daily_stats"])
@@ -0,0 +1,13 @@
+"""
+Respuestas guardadas de las Idempotency-Key (backend "database")
+"""
+from database import Base
+from migrations.online import create_table
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0011"
+DESCRIPTION = "Claves de idempotencia"
+
+
+def upgrade(ctx):
+    create_table(ctx, Base.metadata.tables["idempotency_keys"])
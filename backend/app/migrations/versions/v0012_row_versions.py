@@ -0,0 +1,16 @@
+"""
+Versión de fila en tareas y categorías (ETag / If-Match)
+
+Columna NOT NULL con DEFAULT constante: MySQL la añade en línea y las
+filas existentes parten de la versión 1 sin necesidad de rellenarlas.
+"""
+from sqlalchemy import Column, Integer
+from migrations.online import add_column_online
+
+VERSION = "0012"
+DESCRIPTION = "Versiones de fila para control de concurrencia optimista"
+
+
+def upgrade(ctx):
+    for table in ("tasks", "tasks_archive", "categories"):
+        add_column_online(ctx, table, Column("version", Integer, nullable=False, server_default="1"))
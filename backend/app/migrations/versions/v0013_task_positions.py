@@ -0,0 +1,48 @@
+"""
+Orden manual de las tareas (clave de posición fraccionaria)
+
+La columna se añade como NULL y se rellena en lotes con una clave
+derivada del id, de modo que el orden manual inicial de cada usuario es
+el de creación. Las tareas nuevas reciben su clave al insertarse.
+"""
+from sqlalchemy import Column, MetaData, Table, bindparam, select, update
+import time
+
+from migrations.online import add_column_online, create_index_online
+from models.task import PositionKey
+from positions import integer_key
+
+VERSION = "0013"
+DESCRIPTION = "Clave de orden manual de las tareas"
+
+
+def _backfill_positions(ctx, name: str, batch_size: int = 1000, pause: float = 0.05) -> int:
+    """Da a las filas sin posición la clave de su id; cada lote es una transacción corta"""
+    table = Table(name, MetaData(), autoload_with=ctx.engine)
+    statement = update(table).where(table.c.id == bindparam("_id")).values(position=bindparam("_position"))
+    updated = 0
+    last_id = 0
+    while True:
+        with ctx.engine.begin() as connection:
+            ids = connection.execute(
+                select(table.c.id)
+                .where(table.c.id > last_id, table.c.position.is_(None))
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return updated
+            connection.execute(statement, [{"_id": row_id, "_position": integer_key(row_id)} for row_id in ids])
+        updated += len(ids)
+        last_id = ids[-1]
+        ctx.report(f"{name}: {updated} posiciones asignadas")
+        if pause:
+            time.sleep(pause)
+
+
+def upgrade(ctx):
+    for name in ("tasks", "tasks_archive"):
+        add_column_online(ctx, name, Column("position", PositionKey))
+    create_index_online(ctx, "tasks", "ix_tasks_user_position", ["user_id", "position"])
+    for name in ("tasks", "tasks_archive"):
+        _backfill_positions(ctx, name)
@@ -0,0 +1,22 @@
+"""
+Subtareas: padre, ruta materializada y nivel de cada tarea
+
+Columnas NULL o con DEFAULT constante: las tareas existentes quedan en
+el primer nivel (ruta "/", nivel 0) sin necesidad de rellenarlas.
+"""
+from sqlalchemy import Column, Integer
+
+from migrations.online import add_column_online, create_index_online
+from models.task import TreePath
+
+VERSION = "0014"
+DESCRIPTION = "Subtareas con ruta materializada"
+
+
+def upgrade(ctx):
+    for table in ("tasks", "tasks_archive"):
+        add_column_online(ctx, table, Column("parent_id", Integer))
+        add_column_online(ctx, table, Column("path", TreePath, nullable=False, server_default="/"))
+        add_column_online(ctx, table, Column("depth", Integer, nullable=False, server_default="0"))
+    create_index_online(ctx, "tasks", "ix_tasks_user_parent", ["user_id", "parent_id"])
+    create_index_online(ctx, "tasks", "ix_tasks_user_path", ["user_id", "path"])
@@ -0,0 +1,14 @@
+"""
+Etiquetas de tareas y su índice invertido (etiqueta -> tareas)
+"""
+from database import Base
+from migrations.online import create_table
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0015"
+DESCRIPTION = "Etiquetas de tareas"
+
+
+def upgrade(ctx):
+    create_table(ctx, Base.metadata.tables["tags"])
+    create_table(ctx, Base.metadata.tables["task_tags"])
@@ -0,0 +1,13 @@
+"""
+Vistas guardadas (filtros de tareas con nombre)
+"""
+from database import Base
+from migrations.online import create_table
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0016"
+DESCRIPTION = "Vistas guardadas"
+
+
+def upgrade(ctx):
+    create_table(ctx, Base.metadata.tables["saved_views"])
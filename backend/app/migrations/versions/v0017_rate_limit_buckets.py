@@ -0,0 +1,13 @@
+"""
+Cubos del límite de peticiones (backend "database")
+"""
+from database import Base
+from migrations.online import create_table
+import models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+VERSION = "0017"
+DESCRIPTION = "Cubos del límite de peticiones"
+
+
+def upgrade(ctx):
+    create_table(ctx, Base.metadata.tables["rate_limit_buckets"])
@@ -0,0 +1,11 @@
+"""
+Índice (user_id, due_date) del archivo para el calendario
+"""
+from migrations.online import create_index_online
+
+VERSION = "0018"
+DESCRIPTION = "Índice de tareas archivadas por usuario y fecha límite"
+
+
+def upgrade(ctx):
+    create_index_online(ctx, "tasks_archive", "ix_tasks_archive_user_due", ["user_id", "due_date"])
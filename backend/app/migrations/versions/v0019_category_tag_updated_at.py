@@ -0,0 +1,19 @@
+"""
+Fecha de modificación en categorías y etiquetas
+
+reshard.py copia durante la congelación solo las filas modificadas desde
+el inicio de la migración; sin updated_at tenía que recopiar todas las
+categorías y etiquetas del usuario. Las filas existentes parten de su
+fecha de creación.
+"""
+from sqlalchemy import Column, DateTime
+from migrations.online import add_column_online, backfill
+
+VERSION = "0019"
+DESCRIPTION = "Fecha de modificación en categorías y etiquetas"
+
+
+def upgrade(ctx):
+    for table in ("categories", "tags"):
+        add_column_online(ctx, table, Column("updated_at", DateTime))
+        backfill(ctx, table, "updated_at = created_at", where="updated_at IS NULL")
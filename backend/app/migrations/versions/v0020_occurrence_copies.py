@@ -0,0 +1,36 @@
+"""
+Marca explícita de las copias de ocurrencias recurrentes
+
+Hasta ahora rollups.py reconocía la copia completada de una ocurrencia
+por tener created_at igual a completed_at. Con occurrence_of (ID de la
+serie) deja de depender de esa coincidencia. Las copias anteriores se
+marcan con la misma regla y occurrence_of = 0, porque no guardaban su
+serie.
+
+task_daily_stats.occurrences_completed separa esas finalizaciones, que
+no tienen tiempo de resolución, del tiempo medio. Los agregados ya
+existentes se corrigen con:
+    python rollups.py backfill
+"""
+from sqlalchemy import Column, Integer
+from migrations.online import add_column_online, backfill
+
+VERSION = "0020"
+DESCRIPTION = "Copias de ocurrencias recurrentes marcadas"
+
+
+def upgrade(ctx):
+    for table in ("tasks", "tasks_archive"):
+        add_column_online(ctx, table, Column("occurrence_of", Integer))
+        backfill(
+            ctx, table, "occurrence_of = 0",
+            where=(
+                "occurrence_of IS NULL AND recurrence IS NULL AND is_completed = :completed "
+                "AND completed_at IS NOT NULL AND completed_at <= created_at"
+            ),
+            params={"completed": True},
+        )
+    add_column_online(
+        ctx, "task_daily_stats",
+        Column("occurrences_completed", Integer, nullable=False, server_default="0"),
+    )
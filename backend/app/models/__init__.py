@@ -5,6 +5,17 @@ Importa todos los modelos para que SQLAlchemy los reconozca
 from .user import User
 from .category import Category
 from .task import Task, PriorityEnum
+from .user_shard import UserShard
+from .archived_task import ArchivedTask
+from .account_deletion import AccountDeletion
+from .job import Job
+from .task_reminder import TaskReminder
+from .task_daily_stat import TaskDailyStat
+from .idempotency_key import IdempotencyKey
+from .tag import Tag
+from .task_tag import TaskTag
+from .saved_view import SavedView
+from .rate_limit_bucket import RateLimitBucket
 
 # Exportar todos los modelos
-__all__ = ["User", "Category", "Task", "PriorityEnum"]
\ No newline at end of file
+__all__ = ["User", "Category", "Task", "PriorityEnum", "UserShard", "ArchivedTask", "AccountDeletion", "Job", "TaskReminder", "TaskDailyStat", "IdempotencyKey", "Tag", "TaskTag", "SavedView", "RateLimitBucket"]
\ No newline at end of file
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, func
+from datetime import datetime
+from database import Base
+
+
+class AccountDeletion(Base):
+    """
+    Modelo de Borrado de cuenta
+
+    La cuenta se desactiva al instante y sus datos se purgan después en
+    lotes desde segundo plano; esta tabla guarda el progreso.
+
+    Atributos:
+        id: Identificador único del borrado
+        user_id: ID del usuario borrado (sin clave foránea: el usuario desaparece)
+        token: Token aleatorio para consultar el progreso sin autenticación
+        status: Estado (pending, running, completed, failed)
+        tasks_deleted: Tareas purgadas hasta ahora (incluye archivadas)
+        categories_deleted: Categorías purgadas hasta ahora
+        error: Último error, si lo hubo
+        created_at: Fecha de la solicitud
+        updated_at: Fecha del último progreso
+        completed_at: Fecha de finalización
+    """
+    __tablename__ = "account_deletions"
+
+    # Columnas de la tabla
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    token = Column(String(64), unique=True, nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    tasks_deleted = Column(Integer, nullable=False, default=0)
+    categories_deleted = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
+    completed_at = Column(DateTime)
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Date, ForeignKey, Enum, Index, func
+from datetime import datetime
+from database import Base
+from .task import PriorityEnum, PositionKey, TreePath
+
+
+class ArchivedTask(Base):
+    """
+    Modelo de Tarea archivada
+
+    Tareas completadas hace más de ARCHIVE_AFTER_DAYS días, movidas fuera
+    de la tabla tasks para que esta se mantenga pequeña. Tiene las mismas
+    columnas que Task (conserva el mismo id) más la fecha de archivado.
+
+    Atributos:
+        archived_at: Fecha en que se movió al archivo
+        (resto de atributos: ver Task)
+    """
+    __tablename__ = "tasks_archive"
+    __table_args__ = (
+        # Listado de archivadas por usuario ordenado por fecha de creación
+        Index("ix_tasks_archive_user_created", "user_id", "created_at"),
+        # Rango de fechas límite por usuario para el calendario
+        Index("ix_tasks_archive_user_due", "user_id", "due_date"),
+    )
+
+    # Columnas de la tabla
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(200), nullable=False)
+    description = Column(Text)
+    is_completed = Column(Boolean, default=True)
+    priority = Column(Enum(PriorityEnum), default=PriorityEnum.medium)
+    due_date = Column(Date)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    category_id = Column(Integer)  # Sin clave foránea: la categoría puede haberse borrado
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    recurrence = Column(String(200))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    position = Column(PositionKey)
+    parent_id = Column(Integer)
+    path = Column(TreePath, nullable=False, default="/", server_default="/")
+    depth = Column(Integer, nullable=False, default=0, server_default="0")
+    occurrence_of = Column(Integer)
+    archived_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
@@ -14,6 +14,8 @@ class Category(Base):
         color: Color en formato hexadecimal para la UI (ej: #3B82F6)
         user_id: ID del usuario propietario de la categoría
         created_at: Fecha de creación
+        updated_at: Fecha de última actualización
+        version: Versión de la fila (ETag); cada UPDATE del ORM la comprueba e incrementa
     
     Relaciones:
         owner: Usuario propietario de la categoría
@@ -27,6 +29,11 @@ class Category(Base):
     color = Column(String(7), default="#3B82F6")  # Color por defecto: azul
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    # Bloqueo optimista: los UPDATE del ORM llevan "WHERE version = ?"
+    __mapper_args__ = {"version_id_col": version}
     
     # Relaciones con otras tablas
     owner = relationship("User", back_populates="categories")
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, DateTime, func
+from datetime import datetime
+from database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Modelo de Clave de idempotencia
+
+    Respuesta guardada para una Idempotency-Key cuando se usa el backend
+    "database" (ver idempotency.py). La clave primaria garantiza que solo
+    una petición con la misma clave se ejecuta, aunque lleguen a la vez
+    a procesos distintos.
+
+    Atributos:
+        key: Hash de la clave (cliente, método, ruta e Idempotency-Key)
+        fingerprint: Hash del cuerpo de la petición original
+        status: Estado (processing, completed)
+        status_code: Código HTTP de la respuesta guardada
+        headers: Cabeceras de la respuesta en JSON
+        body: Cuerpo de la respuesta
+        expires_at: Fecha a partir de la cual la clave se puede reutilizar
+        created_at: Fecha de creación
+    """
+    __tablename__ = "idempotency_keys"
+
+    # Columnas de la tabla
+    key = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="processing")
+    status_code = Column(Integer)
+    headers = Column(Text)
+    body = Column(LargeBinary)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, func
+from datetime import datetime
+from database import Base
+
+
+class Job(Base):
+    """
+    Modelo de Trabajo en segundo plano
+
+    Atributos:
+        id: Identificador único del trabajo
+        name: Nombre del manejador registrado en jobs.py
+        payload: Argumentos en JSON
+        status: Estado (queued, running, succeeded, dead)
+        attempts: Intentos realizados
+        max_attempts: Intentos máximos antes de darlo por perdido
+        run_at: Fecha a partir de la cual se puede ejecutar
+        locked_by: Proceso que lo está ejecutando
+        locked_until: Fin del arrendamiento; pasado este momento otro proceso puede retomarlo
+        dedupe_key: Clave única opcional (evita encolar dos veces el mismo trabajo periódico)
+        last_error: Último error producido
+        created_at: Fecha de creación
+        updated_at: Fecha de última actualización
+        finished_at: Fecha de finalización
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Búsqueda de trabajos listos para ejecutarse
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    # Columnas de la tabla
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = Column(String(100))
+    locked_until = Column(DateTime)
+    dedupe_key = Column(String(200), unique=True)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
+    finished_at = Column(DateTime)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Float
+from database import Base
+
+
+class RateLimitBucket(Base):
+    """
+    Modelo de Cubo de límite de peticiones
+
+    Estado de un cubo de fichas cuando se usa el backend "database" (ver
+    ratelimit.py), compartido por todos los procesos. Un cubo lleno no
+    guarda información, así que las filas con tat en el pasado se pueden
+    borrar en cualquier momento.
+
+    Atributos:
+        key: Hash del cubo (cliente, regla)
+        tat: Instante (epoch) en que el cubo vuelve a estar lleno
+    """
+    __tablename__ = "rate_limit_buckets"
+
+    # Columnas de la tabla
+    key = Column(String(64), primary_key=True)
+    tat = Column(Float, nullable=False, index=True)
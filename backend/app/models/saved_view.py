@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+from database import Base
+
+
+class SavedView(Base):
+    """
+    Modelo de Vista guardada
+
+    Filtro de tareas con nombre que el usuario reutiliza (ej: "alta
+    prioridad, vence en 7 días, en Trabajo o Urgente"). Se ejecuta con
+    una sentencia ya compilada (ver views.py).
+
+    Atributos:
+        id: Identificador único de la vista
+        name: Nombre de la vista (único por usuario)
+        filters: Definición del filtro en JSON (ver schemas.view.ViewFilters)
+        user_id: ID del usuario propietario
+        created_at: Fecha de creación
+        updated_at: Fecha de última actualización
+        version: Versión de la fila (ETag y clave de la caché de resultados)
+    """
+    __tablename__ = "saved_views"
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_saved_views_user_name"),
+    )
+
+    # Columnas de la tabla
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    filters = Column(Text, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Bloqueo optimista: los UPDATE del ORM llevan "WHERE version = ?"
+    __mapper_args__ = {"version_id_col": version}
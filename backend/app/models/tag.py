@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+from database import Base
+
+
+class Tag(Base):
+    """
+    Modelo de Etiqueta
+
+    Una tarea puede llevar varias etiquetas (ver TaskTag). task_count se
+    mantiene al etiquetar, desetiquetar y borrar tareas, de modo que el
+    listado de etiquetas no cuenta filas.
+
+    Atributos:
+        id: Identificador único de la etiqueta
+        name: Nombre (en minúsculas, único por usuario)
+        user_id: ID del usuario propietario
+        task_count: Tareas (activas o archivadas) con esta etiqueta
+        created_at: Fecha de creación
+        updated_at: Fecha de última actualización (también al cambiar task_count)
+    """
+    __tablename__ = "tags"
+    __table_args__ = (
+        # Resolución de nombres a IDs en los filtros
+        UniqueConstraint("user_id", "name", name="uq_tags_user_name"),
+    )
+
+    # Columnas de la tabla
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    task_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Date, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Date, ForeignKey, Enum, Index, func
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -14,6 +15,24 @@ class PriorityEnum(str, enum.Enum):
     high = "high"     # Prioridad alta
 
 
+def ascii_key(length: int):
+    """
+    Texto ASCII comparado byte a byte (intercalación binaria en MySQL y
+    "C" en PostgreSQL), para ordenar claves y buscar prefijos por índice
+    """
+    return (
+        String(length)
+        .with_variant(String(length, collation="C"), "postgresql")
+        .with_variant(mysql.VARCHAR(length, charset="ascii", collation="ascii_bin"), "mysql", "mariadb")
+    )
+
+
+# Clave de orden manual (positions.py)
+PositionKey = ascii_key(64)
+# Ruta materializada de antecesores (subtasks.py)
+TreePath = ascii_key(255)
+
+
 class Task(Base):
     """
     Modelo de Tarea
@@ -30,12 +49,39 @@ class Task(Base):
         created_at: Fecha de creación
         updated_at: Fecha de última actualización
         completed_at: Fecha en que se completó la tarea
+        recurrence: Regla de recurrencia (RRULE); due_date es la próxima ocurrencia
+        version: Versión de la fila (ETag); cada UPDATE del ORM la comprueba e incrementa
+        position: Clave de orden manual (índice fraccionario, ver positions.py)
+        parent_id: ID de la tarea padre (None en las tareas de primer nivel)
+        path: Ruta de antecesores, "/" en el primer nivel y "/1/5/" para una
+            nieta de la tarea 1 (ver subtasks.py)
+        depth: Nivel en el árbol (0 en el primer nivel)
+        occurrence_of: ID de la serie recurrente de la que es copia una
+            ocurrencia completada (None en el resto; 0 en las copias
+            anteriores a la columna)
     
     Relaciones:
         owner: Usuario propietario de la tarea
         category: Categoría a la que pertenece la tarea
     """
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Listado por usuario ordenado por fecha de creación
+        Index("ix_tasks_user_created", "user_id", "created_at"),
+        # Pendientes/completadas y vencidas por usuario
+        Index("ix_tasks_user_completed_due", "user_id", "is_completed", "due_date"),
+        # Búsqueda de completadas antiguas para el archivado
+        Index("ix_tasks_completed_at", "is_completed", "completed_at"),
+        # Tareas abiertas por fecha límite para los recordatorios
+        Index("ix_tasks_open_due", "is_completed", "due_date"),
+        # Rango de fechas límite por usuario para el calendario
+        Index("ix_tasks_user_due", "user_id", "due_date"),
+        # Orden manual por usuario
+        Index("ix_tasks_user_position", "user_id", "position"),
+        # Hijas directas y subárboles (búsqueda por prefijo de la ruta)
+        Index("ix_tasks_user_parent", "user_id", "parent_id"),
+        Index("ix_tasks_user_path", "user_id", "path"),
+    )
     
     # Columnas de la tabla
     id = Column(Integer, primary_key=True, index=True)
@@ -46,9 +92,20 @@ class Task(Base):
     due_date = Column(Date, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"), index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
     completed_at = Column(DateTime)
+    recurrence = Column(String(200))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    position = Column(PositionKey)
+    # Sin clave foránea: al copiar entre shards una hija puede llegar antes que su padre
+    parent_id = Column(Integer)
+    path = Column(TreePath, nullable=False, default="/", server_default="/")
+    depth = Column(Integer, nullable=False, default=0, server_default="0")
+    occurrence_of = Column(Integer)
+    
+    # Bloqueo optimista: los UPDATE del ORM llevan "WHERE version = ?"
+    __mapper_args__ = {"version_id_col": version}
     
     # Relaciones con otras tablas
     owner = relationship("User", back_populates="tasks")
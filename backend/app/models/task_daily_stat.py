@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, BigInteger, Date
+from database import Base
+
+
+class TaskDailyStat(Base):
+    """
+    Modelo de agregado diario de tareas
+
+    Una fila por usuario, día (UTC) y categoría con los contadores de ese
+    día. Se mantiene al crear y completar tareas (ver rollups.py), de modo
+    que las series temporales se leen de aquí en lugar de recorrer tasks.
+
+    Atributos:
+        user_id: ID del usuario
+        day: Día al que corresponden los contadores
+        category_id: ID de la categoría (0 = sin categoría)
+        tasks_created: Tareas creadas ese día
+        tasks_completed: Tareas completadas ese día
+        completion_seconds: Suma de segundos entre creación y finalización
+            de las tareas completadas ese día
+        occurrences_completed: Cuántas de las completadas son copias de
+            ocurrencias recurrentes (sin tiempo de resolución)
+    """
+    __tablename__ = "task_daily_stats"
+
+    # Columnas de la tabla
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    day = Column(Date, primary_key=True)
+    category_id = Column(Integer, primary_key=True, autoincrement=False, default=0)
+    tasks_created = Column(Integer, nullable=False, default=0)
+    tasks_completed = Column(Integer, nullable=False, default=0)
+    completion_seconds = Column(BigInteger, nullable=False, default=0)
+    occurrences_completed = Column(Integer, nullable=False, default=0, server_default="0")
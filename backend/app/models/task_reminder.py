@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, func
+from datetime import datetime
+from database import Base
+
+
+class TaskReminder(Base):
+    """
+    Modelo de Recordatorio enviado
+
+    Registro de los recordatorios de vencimiento ya reclamados o enviados.
+    La clave (task_id, due_date) garantiza que cada vencimiento se
+    reclama una sola vez aunque varios procesos lo detecten; si la tarea
+    cambia de fecha, el nuevo vencimiento tiene su propio recordatorio.
+
+    Atributos:
+        task_id: ID de la tarea
+        due_date: Fecha límite notificada
+        user_id: ID del usuario propietario
+        status: Estado (sending, sent)
+        created_at: Fecha en que se reclamó
+        sent_at: Fecha en que se entregó
+    """
+    __tablename__ = "task_reminders"
+
+    # Columnas de la tabla
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+    due_date = Column(Date, primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="sending")
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    sent_at = Column(DateTime)
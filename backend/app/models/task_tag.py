@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, Index
+from database import Base
+
+
+class TaskTag(Base):
+    """
+    Modelo de Etiqueta de tarea (índice invertido etiqueta -> tareas)
+
+    La clave primaria (tag_id, task_id) guarda, para cada etiqueta, la
+    lista ordenada de sus tareas: filtrar por varias etiquetas es unir o
+    intersecar esas listas sin tocar la tabla tasks.
+
+    Sin claves foráneas: la tarea puede estar en tasks o en tasks_archive.
+
+    Atributos:
+        tag_id: ID de la etiqueta
+        task_id: ID de la tarea
+        user_id: ID del usuario propietario (purga y copia entre shards)
+    """
+    __tablename__ = "task_tags"
+    __table_args__ = (
+        # Etiquetas de una tarea (listados con expand=tags, borrados)
+        Index("ix_task_tags_task", "task_id"),
+        Index("ix_task_tags_user", "user_id"),
+    )
+
+    # Columnas de la tabla
+    tag_id = Column(Integer, primary_key=True, autoincrement=False)
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
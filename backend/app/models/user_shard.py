@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+from database import Base
+
+
+class UserShard(Base):
+    """
+    Modelo de ubicación de usuario en un shard
+
+    Solo existe para los usuarios que se han movido (o se están moviendo)
+    fuera del shard que les asigna el hash consistente. Vive en la base
+    de datos principal, junto a la tabla de usuarios.
+
+    Atributos:
+        user_id: ID del usuario
+        shard: Nombre del shard donde están sus tareas y categorías
+        state: Estado de la ubicación ("active" o "migrating")
+        updated_at: Fecha del último cambio de ubicación
+    """
+    __tablename__ = "user_shards"
+
+    # Columnas de la tabla
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(String(50), nullable=False)
+    state = Column(String(20), nullable=False, default="active")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,88 @@
+"""
+Escrituras de una sola ida y vuelta sobre filas de un usuario
+
+En lugar de cargar el objeto con el ORM, modificarlo, hacer commit y
+refrescarlo (tres viajes a la base de datos), cada escritura es un único
+UPDATE o DELETE acotado por propietario:
+
+    UPDATE tasks SET ... WHERE id = ? AND user_id = ? [AND condiciones]
+
+Si el motor soporta RETURNING (SQLite, PostgreSQL) la fila actualizada
+vuelve en la misma sentencia; si no (MySQL), el rowcount decide el 404
+y la fila se relee con una SELECT por clave primaria.
+
+Estas sentencias no pasan por el flush del ORM: quien las use debe
+mantener a mano lo que dependa de él (updated_at, agregados de
+rollups.py). La columna version sí se incrementa aquí, igual que en los
+UPDATE del ORM (version_id_col).
+"""
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+
+def select_owned(db: Session, model, row_id: int, user_id: int):
+    """
+    Lee una fila del usuario sin cargarla en el ORM
+
+    Args:
+        db: Sesión de base de datos
+        model: Modelo de la tabla
+        row_id: ID de la fila
+        user_id: ID del propietario
+
+    Returns:
+        Row: Fila con todas las columnas, o None si no existe o no es suya
+    """
+    table = model.__table__
+    return db.execute(
+        select(table).where(table.c.id == row_id, table.c.user_id == user_id)
+    ).first()
+
+
+def update_owned(db: Session, model, row_id: int, user_id: int, values: dict, *conditions, returning: bool = True):
+    """
+    UPDATE de una fila del usuario en una sola sentencia
+
+    Args:
+        db: Sesión de base de datos
+        model: Modelo de la tabla
+        row_id: ID de la fila
+        user_id: ID del propietario
+        values: Columnas a actualizar (version se incrementa sola)
+        *conditions: Condiciones adicionales (ej: Task.is_completed == False,
+            o Task.version.in_(...) para If-Match)
+        returning: Devolver la fila actualizada (si es False solo si se actualizó)
+
+    Returns:
+        Row | bool: Fila actualizada (o True) si alguna fila cumplía las
+            condiciones; None (o False) en otro caso
+    """
+    table = model.__table__
+    if "version" in table.c and "version" not in values:
+        values = {**values, "version": table.c.version + 1}
+    statement = (
+        update(table)
+        .where(table.c.id == row_id, table.c.user_id == user_id, *conditions)
+        .values(**values)
+    )
+    if not returning:
+        return db.execute(statement).rowcount > 0
+
+    if db.get_bind().dialect.update_returning:
+        return db.execute(statement.returning(*table.c)).first()
+
+    if db.execute(statement).rowcount == 0:
+        return None
+    return db.execute(select(table).where(table.c.id == row_id)).first()
+
+
+def delete_owned(db: Session, model, row_id: int, user_id: int) -> bool:
+    """
+    DELETE de una fila del usuario en una sola sentencia
+
+    Returns:
+        bool: True si se borró; False si no existe o no es suya
+    """
+    table = model.__table__
+    result = db.execute(delete(table).where(table.c.id == row_id, table.c.user_id == user_id))
+    return result.rowcount > 0
@@ -0,0 +1,343 @@
+"""
+Orden manual de las tareas con índices fraccionarios
+
+Cada tarea lleva una clave de posición (position) que se compara como
+texto. Para mover una tarea entre otras dos basta con darle una clave
+que quede entre las de sus vecinas, así que un movimiento escribe una
+sola fila en lugar de renumerar toda la lista:
+
+    a0 < a1 < a1V < a2 < b10 ...
+
+Formato de las claves (base 62, como la librería fractional-indexing):
+
+    - Parte entera: una letra que indica cuántas cifras siguen (a-z
+      para enteros crecientes, A-Z para decrecientes) y esas cifras
+    - Parte fraccionaria opcional, que nunca termina en "0"
+
+Añadir al final o al principio solo incrementa la parte entera (la clave
+crece de forma logarítmica); insertar una y otra vez en el mismo hueco
+alarga la parte fraccionaria. Cuando una clave supera
+POSITION_MAX_KEY_LENGTH se encola un reequilibrado que reescribe las
+claves del usuario como enteros consecutivos.
+
+Puede lanzarse a mano:
+    python positions.py rebalance --user-id 42
+"""
+from sqlalchemy import bindparam, event, or_, select, update
+from sqlalchemy.orm import Session
+from datetime import datetime
+import argparse
+import logging
+import os
+import time
+
+from database import SessionLocal
+from models.task import Task
+from sharding import shard_router
+from jobs import job_runner
+
+logger = logging.getLogger(__name__)
+
+# Longitud de clave a partir de la cual se reequilibran las de un usuario
+POSITION_MAX_KEY_LENGTH = int(os.getenv("POSITION_MAX_KEY_LENGTH", 24))
+# Filas reescritas por sentencia al reequilibrar
+POSITION_REBALANCE_BATCH_SIZE = int(os.getenv("POSITION_REBALANCE_BATCH_SIZE", 500))
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+ZERO = DIGITS[0]
+# Menor entero representable: ninguna clave puede ir antes
+SMALLEST_INTEGER = "A" + ZERO * 26
+
+
+# ====================
+# CLAVES
+# ====================
+
+def _midpoint(a: str, b: str = None) -> str:
+    """
+    Parte fraccionaria entre a y b (b=None significa "sin límite superior")
+
+    Ninguna de las dos puede terminar en "0"; el resultado tampoco.
+    """
+    if b is not None:
+        # Prefijo común: se conserva y se busca el punto medio del resto
+        n = 0
+        while (a[n] if n < len(a) else ZERO) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if digit_b - digit_a > 1:
+        return DIGITS[round((digit_a + digit_b) / 2)]
+    # Cifras consecutivas: se baja un nivel
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:])
+
+
+def _integer_length(head: str) -> int:
+    """Caracteres de la parte entera según su letra inicial"""
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"Clave de posición no válida: {head!r}")
+
+
+def _split(key: str) -> tuple:
+    """Separa una clave válida en parte entera y fraccionaria"""
+    if not key or key == SMALLEST_INTEGER:
+        raise ValueError(f"Clave de posición no válida: {key!r}")
+    length = _integer_length(key[0])
+    if length > len(key) or any(char not in DIGITS for char in key[1:]):
+        raise ValueError(f"Clave de posición no válida: {key!r}")
+    integer, fraction = key[:length], key[length:]
+    if fraction.endswith(ZERO):
+        raise ValueError(f"Clave de posición no válida: {key!r}")
+    return integer, fraction
+
+
+def _increment(integer: str):
+    """Siguiente entero, o None si ya es el mayor representable"""
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) + 1
+        if value < len(DIGITS):
+            digits[i] = DIGITS[value]
+            return head + "".join(digits)
+        digits[i] = ZERO
+    # Acarreo: el entero necesita una cifra más
+    if head == "Z":
+        return "a" + ZERO
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append(ZERO)
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement(integer: str):
+    """Entero anterior, o None si ya es el menor representable"""
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) - 1
+        if value >= 0:
+            digits[i] = DIGITS[value]
+            return head + "".join(digits)
+        digits[i] = DIGITS[-1]
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def key_between(before: str = None, after: str = None) -> str:
+    """
+    Clave que queda estrictamente entre dos claves
+
+    Args:
+        before: Clave anterior (None = principio de la lista)
+        after: Clave siguiente (None = final de la lista)
+
+    Returns:
+        str: Nueva clave
+
+    Raises:
+        ValueError: Si alguna clave no es válida o before >= after
+    """
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Claves fuera de orden: {before!r} >= {after!r}")
+
+    if before is None:
+        if after is None:
+            return "a" + ZERO
+        integer, fraction = _split(after)
+        if integer == SMALLEST_INTEGER:
+            return integer + _midpoint("", fraction)
+        if integer < after:
+            return integer
+        previous = _decrement(integer)
+        if previous is None:
+            raise ValueError("No quedan claves antes de la primera")
+        return previous
+
+    integer, fraction = _split(before)
+    if after is None:
+        following = _increment(integer)
+        return integer + _midpoint(fraction) if following is None else following
+
+    integer_after, fraction_after = _split(after)
+    if integer == integer_after:
+        return integer + _midpoint(fraction, fraction_after)
+    following = _increment(integer)
+    if following is not None and following < after:
+        return following
+    return integer + _midpoint(fraction)
+
+
+def sequential_keys(count: int) -> list:
+    """Claves cortas y consecutivas para count filas (a0, a1, ..., az, b10, ...)"""
+    keys = []
+    key = None
+    for _ in range(count):
+        key = key_between(key, None)
+        keys.append(key)
+    return keys
+
+
+def integer_key(number: int) -> str:
+    """
+    Clave de posición de un entero no negativo
+
+    Respeta el orden numérico, así que sirve para dar posición a filas
+    existentes a partir de su id.
+    """
+    digits = ""
+    while True:
+        number, remainder = divmod(number, len(DIGITS))
+        digits = DIGITS[remainder] + digits
+        if number == 0:
+            break
+    return chr(ord("a") + len(digits) - 1) + digits
+
+
+# ====================
+# TAREAS
+# ====================
+
+def last_position(db: Session, user_id: int):
+    """Mayor clave de las tareas del usuario (índice (user_id, position))"""
+    return db.execute(
+        select(Task.position)
+        .where(Task.user_id == user_id, Task.position.isnot(None))
+        .order_by(Task.position.desc())
+        .limit(1)
+    ).scalar()
+
+
+def neighbour_position(db: Session, user_id: int, position: str, exclude_id: int, following: bool = True):
+    """
+    Clave de la tarea inmediatamente después (o antes) de una posición
+
+    Args:
+        db: Sesión del shard
+        user_id: ID del usuario
+        position: Clave de referencia
+        exclude_id: Tarea que se está moviendo (no cuenta como vecina)
+        following: True para la siguiente, False para la anterior
+
+    Returns:
+        str: Clave de la vecina, o None si la referencia es la última (primera)
+    """
+    query = select(Task.position).where(Task.user_id == user_id, Task.id != exclude_id)
+    if following:
+        query = query.where(Task.position > position).order_by(Task.position)
+    else:
+        query = query.where(Task.position < position).order_by(Task.position.desc())
+    return db.execute(query.limit(1)).scalar()
+
+
+@event.listens_for(Session, "before_flush")
+def assign_positions(session: Session, flush_context, instances) -> None:
+    """Coloca al final de la lista de su usuario las tareas nuevas sin posición"""
+    last = {}
+    for task in session.new:
+        if not isinstance(task, Task) or task.position is not None:
+            continue
+        if task.user_id not in last:
+            last[task.user_id] = last_position(session, task.user_id)
+        task.position = last[task.user_id] = key_between(last[task.user_id], None)
+
+
+def needs_rebalance(position: str) -> bool:
+    """Indica si una clave ya es demasiado larga"""
+    return len(position) > POSITION_MAX_KEY_LENGTH
+
+
+def request_rebalance(user_id: int) -> None:
+    """Encola el reequilibrado de un usuario (como mucho uno por hora)"""
+    slot = int(time.time() // 3600)
+    job_runner.enqueue(
+        "rebalance_task_positions",
+        {"user_id": user_id},
+        dedupe_key=f"rebalance_task_positions:{user_id}:{slot}",
+    )
+
+
+def rebalance_user(db: Session, user_id: int, batch_size: int = POSITION_REBALANCE_BATCH_SIZE) -> int:
+    """
+    Reescribe las claves de un usuario como enteros consecutivos
+
+    Conserva el orden actual (posición y, en empates, id) y se hace en
+    una sola transacción, de modo que nunca se ve un orden a medias.
+
+    Args:
+        db: Sesión del shard
+        user_id: ID del usuario
+        batch_size: Filas por sentencia
+
+    Returns:
+        int: Tareas reescritas
+    """
+    ids = db.execute(
+        select(Task.id).where(Task.user_id == user_id).order_by(Task.position, Task.id)
+    ).scalars().all()
+    table = Task.__table__
+    # Solo cambian las filas cuya clave no es ya la nueva (o no tienen clave:
+    # NULL != x no es cierto en SQL)
+    statement = (
+        update(table)
+        .where(
+            table.c.id == bindparam("_id"),
+            or_(table.c.position.is_(None), table.c.position != bindparam("_position")),
+        )
+        .values(position=bindparam("_position"), updated_at=datetime.utcnow(), version=table.c.version + 1)
+    )
+    rows = [{"_id": task_id, "_position": key} for task_id, key in zip(ids, sequential_keys(len(ids)))]
+    for start in range(0, len(rows), batch_size):
+        db.execute(statement, rows[start:start + batch_size])
+    db.commit()
+    return len(ids)
+
+
+@job_runner.register("rebalance_task_positions")
+def rebalance_task_positions(payload: dict) -> None:
+    """Reequilibra las claves de posición del usuario del trabajo"""
+    user_id = payload["user_id"]
+    directory = SessionLocal()
+    try:
+        # El reintento del trabajo lo aplaza hasta que termine la migración
+        if user_id in shard_router.migrating_users(directory):
+            raise RuntimeError(f"El usuario {user_id} se está moviendo de shard")
+        db = shard_router.session_for(shard_router.shard_for(directory, user_id))
+    finally:
+        directory.close()
+    try:
+        rewritten = rebalance_user(db, user_id)
+        logger.info(f"↕️ Posiciones del usuario {user_id} reequilibradas ({rewritten} tareas)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Orden manual de las tareas")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebalance_parser = subcommands.add_parser("rebalance", help="Reescribir las claves de un usuario")
+    rebalance_parser.add_argument("--user-id", type=int, required=True)
+    args = parser.parse_args()
+
+    if args.command == "rebalance":
+        rebalance_task_positions({"user_id": args.user_id})
@@ -0,0 +1,239 @@
+"""
+Purga asíncrona de cuentas borradas
+
+DELETE /users/me solo desactiva la cuenta y registra un AccountDeletion.
+Aquí se borran después sus tareas, tareas archivadas, recordatorios, etiquetas, vistas y categorías en
+lotes acotados (transacciones cortas, memoria constante), actualizando
+el progreso tras cada lote. Al final se borra la fila del usuario.
+
+Cada borrado se ejecuta como trabajo "purge_account" (ver jobs.py). Un
+borrado interrumpido se retoma en la pasada periódica, porque los lotes
+son idempotentes.
+"""
+from sqlalchemy import delete, or_, select, update
+from datetime import datetime, timedelta
+from functools import partial
+import logging
+import os
+import time
+
+from database import SessionLocal
+from models.user import User
+from models.task import Task
+from models.archived_task import ArchivedTask
+from models.category import Category
+from models.tag import Tag
+from models.task_tag import TaskTag
+from models.saved_view import SavedView
+from models.task_daily_stat import TaskDailyStat
+from models.task_reminder import TaskReminder
+from models.user_shard import UserShard
+from models.account_deletion import AccountDeletion
+from sharding import shard_router
+from jobs import job_runner
+
+logger = logging.getLogger(__name__)
+
+# Filas borradas por lote
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", 1000))
+# Pausa entre lotes para no saturar la base de datos
+PURGE_PAUSE_SECONDS = float(os.getenv("PURGE_PAUSE_SECONDS", 0.05))
+# Segundos entre pasadas que retoman borrados pendientes (0 = desactivado)
+PURGE_SWEEP_INTERVAL_SECONDS = float(os.getenv("PURGE_SWEEP_INTERVAL_SECONDS", 60))
+# Un borrado "running" sin progreso durante este tiempo se considera abandonado
+PURGE_STALE_SECONDS = float(os.getenv("PURGE_STALE_SECONDS", 300))
+
+
+def _delete_batch(db, model, user_id: int, batch_size: int) -> int:
+    """Borra un lote de filas del usuario y devuelve cuántas eran"""
+    table = model.__table__
+    ids = db.execute(
+        select(table.c.id).where(table.c.user_id == user_id).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+    db.execute(delete(table).where(table.c.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
+def _delete_tag_batch(db, user_id: int, batch_size: int) -> int:
+    """Borra un lote de etiquetas del usuario junto con sus asignaciones"""
+    ids = db.execute(
+        select(Tag.id).where(Tag.user_id == user_id).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+    db.execute(delete(TaskTag.__table__).where(TaskTag.tag_id.in_(ids)))
+    db.execute(delete(Tag.__table__).where(Tag.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
+def _claim(directory, deletion_id: int) -> bool:
+    """
+    Marca el borrado como "running" si nadie más lo está procesando
+
+    Returns:
+        bool: True si este proceso se queda con el borrado
+    """
+    stale = datetime.utcnow() - timedelta(seconds=PURGE_STALE_SECONDS)
+    result = directory.execute(
+        update(AccountDeletion.__table__)
+        .where(
+            AccountDeletion.id == deletion_id,
+            or_(
+                AccountDeletion.status.in_(["pending", "failed"]),
+                (AccountDeletion.status == "running") & (AccountDeletion.updated_at < stale),
+            ),
+        )
+        .values(status="running", updated_at=datetime.utcnow(), error=None)
+    )
+    directory.commit()
+    return result.rowcount == 1
+
+
+def _report(directory, deletion_id: int, **values) -> None:
+    """Guarda el progreso del borrado"""
+    directory.execute(
+        update(AccountDeletion.__table__)
+        .where(AccountDeletion.id == deletion_id)
+        .values(updated_at=datetime.utcnow(), **values)
+    )
+    directory.commit()
+
+
+def _delete_reminder_batch(db, user_id: int, batch_size: int) -> int:
+    """Borra los recordatorios de un lote de tareas del usuario"""
+    task_ids = db.execute(
+        select(TaskReminder.task_id.distinct()).where(TaskReminder.user_id == user_id).limit(batch_size)
+    ).scalars().all()
+    if not task_ids:
+        return 0
+    db.execute(delete(TaskReminder.__table__).where(
+        TaskReminder.user_id == user_id,
+        TaskReminder.task_id.in_(task_ids),
+    ))
+    db.commit()
+    return len(task_ids)
+
+
+def purge_account(deletion_id: int, batch_size: int = PURGE_BATCH_SIZE, pause: float = PURGE_PAUSE_SECONDS) -> str:
+    """
+    Purga en lotes todos los datos de una cuenta borrada
+
+    Args:
+        deletion_id: ID del AccountDeletion
+        batch_size: Filas por lote
+        pause: Segundos de espera entre lotes
+
+    Returns:
+        str: Estado final del borrado ("skipped" si otro proceso lo tiene)
+
+    Raises:
+        RuntimeError: Si el borrado falla (para que el trabajo se reintente)
+    """
+    directory = SessionLocal()
+    try:
+        if not _claim(directory, deletion_id):
+            return "skipped"
+
+        deletion = directory.get(AccountDeletion, deletion_id)
+        user_id = deletion.user_id
+        # Al retomar un borrado se parte del progreso ya guardado
+        counters = {
+            "tasks_deleted": deletion.tasks_deleted,
+            "categories_deleted": deletion.categories_deleted,
+        }
+
+        try:
+            shard = shard_router.shard_for(directory, user_id)
+            db = shard_router.session_for(shard)
+            try:
+                # Tareas primero: así borrar categorías no dispara SET NULL;
+                # etiquetas con sus asignaciones antes que el usuario, por la
+                # clave foránea. Cada lote refresca updated_at: así un borrado
+                # largo no parece abandonado
+                steps = (
+                    (partial(_delete_batch, db, Task, user_id, batch_size), "tasks_deleted"),
+                    (partial(_delete_batch, db, ArchivedTask, user_id, batch_size), "tasks_deleted"),
+                    (partial(_delete_batch, db, Category, user_id, batch_size), "categories_deleted"),
+                    (partial(_delete_reminder_batch, db, user_id, batch_size), None),
+                    (partial(_delete_tag_batch, db, user_id, batch_size), None),
+                    (partial(_delete_batch, db, SavedView, user_id, batch_size), None),
+                )
+                for delete_batch, counter in steps:
+                    while True:
+                        deleted = delete_batch()
+                        if not deleted:
+                            break
+                        if counter:
+                            counters[counter] += deleted
+                        _report(directory, deletion_id, **counters)
+                        if pause:
+                            time.sleep(pause)
+
+                # Agregados de productividad (pocas filas por usuario)
+                db.execute(delete(TaskDailyStat.__table__).where(TaskDailyStat.user_id == user_id))
+                db.commit()
+
+                # Copia del usuario en el shard
+                if shard_router.enabled:
+                    db.execute(delete(User.__table__).where(User.id == user_id))
+                    db.commit()
+                    shard_router.forget_user(shard, user_id)
+            finally:
+                db.close()
+
+            # Directorio: ubicación y usuario (ya sin filas dependientes)
+            directory.execute(delete(UserShard.__table__).where(UserShard.user_id == user_id))
+            directory.execute(delete(User.__table__).where(User.id == user_id))
+            directory.commit()
+
+            _report(directory, deletion_id, status="completed", completed_at=datetime.utcnow())
+            logger.info(f"🧹 Cuenta {user_id} purgada: {counters}")
+            return "completed"
+        except Exception as exc:
+            directory.rollback()
+            _report(directory, deletion_id, status="failed", error=str(exc))
+            raise RuntimeError(f"Error purgando la cuenta {user_id}: {exc}") from exc
+    finally:
+        directory.close()
+
+
+def purge_pending_accounts() -> int:
+    """
+    Retoma los borrados pendientes, fallidos o abandonados
+
+    Returns:
+        int: Borrados completados en esta pasada
+    """
+    directory = SessionLocal()
+    try:
+        ids = directory.execute(
+            select(AccountDeletion.id).where(AccountDeletion.status != "completed")
+        ).scalars().all()
+    finally:
+        directory.close()
+    completed = 0
+    for deletion_id in ids:
+        try:
+            completed += purge_account(deletion_id) == "completed"
+        except RuntimeError as exc:
+            logger.warning(f"⚠️ {exc}")
+    return completed
+
+
+@job_runner.register("purge_account")
+def purge_account_job(payload: dict) -> None:
+    """Trabajo que purga una cuenta concreta"""
+    purge_account(payload["deletion_id"])
+
+
+@job_runner.register("purge_pending_accounts")
+def purge_pending_job(payload: dict) -> None:
+    """Trabajo periódico que retoma los borrados abandonados"""
+    purge_pending_accounts()
+
+
+job_runner.schedule_every("purge_pending_accounts", PURGE_SWEEP_INTERVAL_SECONDS)
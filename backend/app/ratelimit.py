@@ -0,0 +1,331 @@
+"""
+Límite de peticiones por usuario y por IP con cubos de fichas
+
+Cada cliente tiene un cubo de N fichas que se rellena a N fichas por
+periodo; cada petición gasta una y, con el cubo vacío, se responde 429
+con Retry-After. Un cubo se guarda como un único instante, el momento en
+que volvería a estar lleno (tat, algoritmo GCRA), así que comprobarlo es
+O(1) y no hace falta ningún temporizador que lo rellene.
+
+Cubos que se consultan en cada petición:
+    - Por IP (RATE_LIMIT_IP), para todas las peticiones
+    - Por usuario (RATE_LIMIT_USER) si el token es válido; el usuario se
+      lee del JWT sin ir a la base de datos
+    - Por regla de ruta (RATE_LIMIT_ROUTES), en lugar del de usuario:
+      por usuario o, sin token, por IP. Por defecto el login es mucho
+      más estricto, porque cada intento cuesta una verificación bcrypt
+
+Formato de los límites: "peticiones/segundos" (ej: "10/60"). Las reglas
+de ruta son "MÉTODO /ruta=límite" separadas por comas.
+
+La IP es la del cliente de la conexión; detrás de un proxy hay que
+arrancar uvicorn con --proxy-headers para que sea la real.
+
+Backends (RATE_LIMIT_BACKEND):
+    memory    LRU acotado en memoria de cada proceso (por defecto); cada
+              worker aplica el límite por su cuenta
+    database  Tabla rate_limit_buckets de la base principal, compartida
+              por todos los procesos (una sentencia por cubo y petición)
+"""
+from collections import OrderedDict
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from jose import JWTError, jwt
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from database import SessionLocal
+from models.rate_limit_bucket import RateLimitBucket
+from jobs import job_runner
+from auth import SECRET_KEY, ALGORITHM
+
+logger = logging.getLogger(__name__)
+
+# Activar el límite de peticiones
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Backend de almacenamiento (memory o database)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Máximo de cubos en memoria por proceso (backend memory)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))
+# Límite por IP (todas las peticiones)
+RATE_LIMIT_IP = os.getenv("RATE_LIMIT_IP", "600/60")
+# Límite por usuario autenticado
+RATE_LIMIT_USER = os.getenv("RATE_LIMIT_USER", "300/60")
+# Límites por ruta (sustituyen al de usuario)
+RATE_LIMIT_ROUTES = os.getenv("RATE_LIMIT_ROUTES", "POST /auth/login=10/60,POST /auth/login-json=10/60")
+# Rutas sin límite
+RATE_LIMIT_EXEMPT_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+
+
+def parse_limit(value: str) -> tuple:
+    """
+    Interpreta un límite "peticiones/segundos"
+
+    Returns:
+        tuple: (segundos por ficha, fichas del cubo)
+
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    requests, _, seconds = value.strip().partition("/")
+    requests, seconds = int(requests), float(seconds)
+    if requests <= 0 or seconds <= 0:
+        raise ValueError(f"Límite no válido: {value!r}")
+    return seconds / requests, requests
+
+
+def parse_routes(value: str) -> dict:
+    """
+    Interpreta las reglas por ruta ("POST /auth/login=10/60,GET /tasks=300/60")
+
+    Returns:
+        dict: {(método, ruta sin "/" final): (segundos por ficha, fichas)}
+    """
+    routes = {}
+    for rule in (value or "").split(","):
+        if not rule.strip():
+            continue
+        route, _, limit = rule.partition("=")
+        method, _, path = route.strip().partition(" ")
+        routes[(method.upper(), path.strip().rstrip("/") or "/")] = parse_limit(limit)
+    return routes
+
+
+# ====================
+# BACKENDS
+# ====================
+
+class MemoryRateLimitStore:
+    """
+    Cubos en un LRU acotado en memoria del proceso
+
+    Cada comprobación es una búsqueda en un diccionario. Al superar
+    max_keys se descartan los cubos usados hace más tiempo, que son los
+    que con más probabilidad ya están llenos (y no guardan nada).
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, interval: float, burst: int) -> float:
+        """
+        Gasta una ficha del cubo
+
+        Args:
+            key: Identificador del cubo
+            interval: Segundos que tarda en reponerse una ficha
+            burst: Fichas del cubo lleno
+
+        Returns:
+            float: 0 si la petición pasa; si no, segundos hasta que haya ficha
+        """
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._buckets.get(key, now), now) + interval
+            wait = tat - now - interval * burst
+            if wait <= 0:
+                self._buckets[key] = tat
+            # Un cubo nuevo siempre tiene ficha, así que aquí la clave ya existe
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return max(wait, 0.0)
+
+    def clear(self) -> None:
+        """Vacía el almacén"""
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseRateLimitStore:
+    """
+    Cubos en la tabla rate_limit_buckets, compartidos entre procesos
+
+    Gastar una ficha es un único UPDATE condicionado a que quede alguna;
+    solo la primera petición de un cubo (o una rechazada) necesita otra
+    sentencia.
+    """
+
+    def take(self, key: str, interval: float, burst: int) -> float:
+        table = RateLimitBucket.__table__
+        key = hashlib.sha256(key.encode()).hexdigest()
+        now = time.time()
+        start = case((table.c.tat > now, table.c.tat), else_=now)
+        session = SessionLocal()
+        try:
+            for _ in range(2):
+                taken = session.execute(
+                    update(table)
+                    .where(table.c.key == key, start + interval - now <= interval * burst)
+                    .values(tat=start + interval)
+                ).rowcount
+                if taken:
+                    session.commit()
+                    return 0.0
+                tat = session.execute(select(table.c.tat).where(table.c.key == key)).scalar()
+                if tat is not None:
+                    session.rollback()
+                    return max(max(tat, now) + interval - now - interval * burst, 0.0)
+                # Primera petición del cubo (otra concurrente pudo crearlo)
+                try:
+                    session.execute(insert(table).values(key=key, tat=now + interval))
+                    session.commit()
+                    return 0.0
+                except IntegrityError:
+                    session.rollback()
+            return 0.0
+        finally:
+            session.close()
+
+    def clear(self) -> None:
+        """Los cubos llenos se borran solos (ver prune_rate_limit_buckets)"""
+
+
+def build_store(backend: str):
+    """
+    Crea el almacén configurado
+
+    Args:
+        backend: memory o database
+
+    Returns:
+        Almacén de cubos
+    """
+    if backend == "database":
+        return DatabaseRateLimitStore()
+    if backend != "memory":
+        logger.warning(f"⚠️ Backend de límite de peticiones desconocido: {backend}; se usa memory")
+    return MemoryRateLimitStore()
+
+
+# Almacén del proceso
+rate_limit_store = build_store(RATE_LIMIT_BACKEND)
+
+
+# ====================
+# MIDDLEWARE
+# ====================
+
+def token_subject(authorization: str):
+    """
+    Usuario (sub) de un token Bearer válido, sin consultar la base de datos
+
+    Returns:
+        str: Nombre de usuario, o None si no hay token o no es válido
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+async def _send_too_many(send, retry_after: float) -> None:
+    """Responde 429 con Retry-After (segundos enteros, al menos 1)"""
+    body = json.dumps({"detail": "Demasiadas peticiones; inténtalo más tarde"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI que aplica los cubos de fichas por usuario, IP y ruta
+
+    Args:
+        app: Aplicación ASGI
+        store: Almacén de cubos (por defecto el configurado)
+        ip_limit: Límite por IP
+        user_limit: Límite por usuario
+        routes: Límites por ruta
+    """
+
+    def __init__(self, app, store=None, ip_limit: str = RATE_LIMIT_IP,
+                 user_limit: str = RATE_LIMIT_USER, routes: str = RATE_LIMIT_ROUTES):
+        self.app = app
+        self.store = store or rate_limit_store
+        self.ip_limit = parse_limit(ip_limit)
+        self.user_limit = parse_limit(user_limit)
+        self.routes = parse_routes(routes)
+        # El backend en memoria es instantáneo; el de base de datos, no
+        self._blocking = not isinstance(self.store, MemoryRateLimitStore)
+
+    def buckets(self, scope) -> list:
+        """
+        Cubos que debe pagar una petición
+
+        Returns:
+            list: [(clave, (segundos por ficha, fichas))]
+        """
+        client = scope.get("client")
+        ip = client[0] if client else "anonymous"
+        buckets = [(f"ip:{ip}", self.ip_limit)]
+
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
+        user = token_subject(authorization)
+        identity = f"user:{user}" if user is not None else f"ip:{ip}"
+
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        route_limit = self.routes.get((method, path))
+        if route_limit is not None:
+            buckets.append((f"{identity}:{method} {path}", route_limit))
+        elif user is not None:
+            buckets.append((identity, self.user_limit))
+        return buckets
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not RATE_LIMIT_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in RATE_LIMIT_EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        for key, (interval, burst) in self.buckets(scope):
+            if self._blocking:
+                wait = await run_in_threadpool(self.store.take, key, interval, burst)
+            else:
+                wait = self.store.take(key, interval, burst)
+            if wait > 0:
+                await _send_too_many(send, wait)
+                return
+
+        await self.app(scope, receive, send)
+
+
+@job_runner.register("prune_rate_limit_buckets")
+def prune_rate_limit_buckets(payload: dict) -> None:
+    """Borra los cubos que ya están llenos (backend database)"""
+    session = SessionLocal()
+    try:
+        session.execute(delete(RateLimitBucket.__table__).where(RateLimitBucket.tat < time.time()))
+        session.commit()
+    finally:
+        session.close()
+
+
+if RATE_LIMIT_BACKEND == "database":
+    job_runner.schedule_every("prune_rate_limit_buckets", 600)
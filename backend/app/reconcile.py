@@ -0,0 +1,83 @@
+"""
+Reconciliación periódica de los contadores mantenidos
+
+Los contadores se actualizan con incrementos en la misma transacción que
+el cambio que los provoca; una escritura que se salte el ORM o un fallo
+a medias los puede descuadrar. Este trabajo los revisa en cada shard:
+
+    - tags.task_count: se recalcula desde task_tags (exacto)
+    - task_daily_stats: se suben los contadores de los últimos
+      RECONCILE_DAYS días que quedan por debajo de las tareas existentes
+      (ver rollups.reconcile)
+
+Los usuarios que se están moviendo de shard se saltan hasta la
+siguiente pasada.
+
+Puede lanzarse a mano:
+    python reconcile.py [--days 7]
+"""
+from datetime import datetime, timedelta
+import argparse
+import logging
+import os
+
+from database import SessionLocal
+from sharding import shard_router
+from jobs import job_runner
+import rollups
+import tags
+
+logger = logging.getLogger(__name__)
+
+# Días de agregados que se revisan en cada pasada
+RECONCILE_DAYS = int(os.getenv("RECONCILE_DAYS", 7))
+# Segundos entre pasadas de la reconciliación (0 = desactivado)
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("RECONCILE_INTERVAL_SECONDS", 24 * 3600))
+
+
+def reconcile_counters(days: int = RECONCILE_DAYS) -> dict:
+    """
+    Reconcilia los contadores de etiquetas y los agregados diarios de todos los shards
+
+    Args:
+        days: Días de agregados a revisar
+
+    Returns:
+        dict: Etiquetas y unidades de agregados corregidas
+    """
+    since = (datetime.utcnow() - timedelta(days=days)).date()
+    fixed = {"tags": 0, "rollups": 0}
+    directory = SessionLocal()
+    try:
+        migrating = shard_router.migrating_users(directory)
+    finally:
+        directory.close()
+    for shard in shard_router.engines:
+        db = shard_router.session_for(shard)
+        try:
+            fixed["tags"] += tags.reconcile_counts(db, skip_users=migrating)
+            fixed["rollups"] += rollups.reconcile(db, since, skip_users=migrating)
+        finally:
+            db.close()
+    if fixed["tags"] or fixed["rollups"]:
+        logger.warning(f"⚠️ Contadores descuadrados corregidos: {fixed}")
+    return fixed
+
+
+@job_runner.register("reconcile_counters")
+def reconcile_job(payload: dict) -> None:
+    """Trabajo periódico de reconciliación"""
+    reconcile_counters(**payload)
+
+
+job_runner.schedule_every("reconcile_counters", RECONCILE_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Reconciliar los contadores mantenidos")
+    parser.add_argument("--days", type=int, default=RECONCILE_DAYS)
+    args = parser.parse_args()
+
+    print(reconcile_counters(args.days))
@@ -0,0 +1,322 @@
+"""
+Reglas de recurrencia de tareas (subconjunto de RRULE)
+
+Solo se guarda la próxima ocurrencia de una tarea recurrente: la fila
+de la tarea tiene como due_date esa ocurrencia y la regla en recurrence.
+Las ocurrencias siguientes se generan al vuelo para los listados y el
+calendario. Al completar la ocurrencia actual se guarda una copia
+completada (historial) y la fila de la regla avanza a la siguiente fecha,
+así que el almacenamiento crece con las reglas y lo completado, no con
+las ocurrencias futuras.
+
+Formato (RRULE, separado por ";"):
+    FREQ=DAILY|WEEKLY|MONTHLY|YEARLY   (obligatorio)
+    INTERVAL=n                         (por defecto 1)
+    BYDAY=MO,TU,WE,TH,FR,SA,SU         (solo WEEKLY)
+    BYMONTHDAY=n                       (solo MONTHLY; en meses más cortos se usa el último día)
+    COUNT=n                            (ocurrencias restantes, incluida la actual)
+    UNTIL=YYYYMMDD o YYYY-MM-DD
+
+También se aceptan los atajos "daily", "weekly", "monthly" y "yearly".
+"""
+from datetime import date, datetime, timedelta
+import calendar
+
+from models.task import Task
+
+# Frecuencias admitidas
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+
+# Días de la semana en RRULE (lunes = 0, como date.weekday())
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+# Máximo de ocurrencias generadas por tarea en una expansión
+MAX_OCCURRENCES = 366
+
+
+class RecurrenceRule:
+    """
+    Regla de recurrencia interpretada
+
+    Atributos:
+        freq: Frecuencia (DAILY, WEEKLY, MONTHLY, YEARLY)
+        interval: Cada cuántas unidades de frecuencia se repite
+        by_day: Días de la semana (solo WEEKLY)
+        by_month_day: Día del mes (solo MONTHLY)
+        count: Ocurrencias restantes, incluida la actual
+        until: Última fecha posible
+    """
+
+    def __init__(self, freq: str, interval: int = 1, by_day: list = None, by_month_day: int = None, count: int = None, until: date = None):
+        self.freq = freq
+        self.interval = interval
+        self.by_day = sorted(by_day) if by_day else None
+        self.by_month_day = by_month_day
+        self.count = count
+        self.until = until
+
+    @classmethod
+    def parse(cls, value: str) -> "RecurrenceRule":
+        """
+        Interpreta una regla
+
+        Args:
+            value: Regla en formato RRULE o atajo
+
+        Returns:
+            RecurrenceRule: Regla interpretada
+
+        Raises:
+            ValueError: Si la regla no es válida
+        """
+        value = value.strip()
+        if value.lower() in ("daily", "weekly", "monthly", "yearly"):
+            return cls(value.upper())
+
+        parts = {}
+        for item in filter(None, value.upper().removeprefix("RRULE:").split(";")):
+            key, _, raw = item.partition("=")
+            if not raw:
+                raise ValueError(f"Parte de la regla sin valor: {item}")
+            parts[key] = raw
+
+        freq = parts.pop("FREQ", None)
+        if freq not in FREQUENCIES:
+            raise ValueError("FREQ debe ser DAILY, WEEKLY, MONTHLY o YEARLY")
+
+        try:
+            interval = int(parts.pop("INTERVAL", 1))
+            count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+            by_month_day = int(parts.pop("BYMONTHDAY")) if "BYMONTHDAY" in parts else None
+            until = None
+            if "UNTIL" in parts:
+                raw_until = parts.pop("UNTIL")[:10].replace("-", "")[:8]
+                until = datetime.strptime(raw_until, "%Y%m%d").date()
+        except ValueError:
+            raise ValueError("INTERVAL, COUNT, BYMONTHDAY o UNTIL no son válidos")
+
+        by_day = None
+        if "BYDAY" in parts:
+            names = parts.pop("BYDAY").split(",")
+            if freq != "WEEKLY" or any(name not in WEEKDAYS for name in names):
+                raise ValueError("BYDAY solo admite MO..SU con FREQ=WEEKLY")
+            by_day = [WEEKDAYS[name] for name in names]
+
+        if parts:
+            raise ValueError(f"Partes de la regla no soportadas: {', '.join(parts)}")
+        if interval < 1 or (count is not None and count < 1):
+            raise ValueError("INTERVAL y COUNT deben ser positivos")
+        if by_month_day is not None and (freq != "MONTHLY" or not 1 <= by_month_day <= 31):
+            raise ValueError("BYMONTHDAY solo admite 1..31 con FREQ=MONTHLY")
+
+        return cls(freq, interval, by_day, by_month_day, count, until)
+
+    def format(self) -> str:
+        """Regla en formato RRULE"""
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.by_day:
+            names = {number: name for name, number in WEEKDAYS.items()}
+            parts.append("BYDAY=" + ",".join(names[day] for day in self.by_day))
+        if self.by_month_day:
+            parts.append(f"BYMONTHDAY={self.by_month_day}")
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%d')}")
+        return ";".join(parts)
+
+    def _candidates(self, anchor: date):
+        """Fechas de la regla posteriores a anchor, sin límites"""
+        if self.freq == "DAILY":
+            step = 1
+            while True:
+                yield anchor + timedelta(days=self.interval * step)
+                step += 1
+
+        elif self.freq == "WEEKLY":
+            days = self.by_day or [anchor.weekday()]
+            week_start = anchor - timedelta(days=anchor.weekday())
+            week = 0
+            while True:
+                for day in days:
+                    candidate = week_start + timedelta(weeks=week, days=day)
+                    if candidate > anchor:
+                        yield candidate
+                week += self.interval
+
+        else:
+            months = self.interval * (12 if self.freq == "YEARLY" else 1)
+            day = self.by_month_day or anchor.day
+            step = 0
+            while True:
+                month_index = anchor.month - 1 + months * step
+                year, month = anchor.year + month_index // 12, month_index % 12 + 1
+                last_day = calendar.monthrange(year, month)[1]
+                candidate = date(year, month, min(day, last_day))
+                if candidate > anchor:
+                    yield candidate
+                step += 1
+
+    def occurrences(self, anchor: date, until: date = None, limit: int = MAX_OCCURRENCES):
+        """
+        Ocurrencias a partir de anchor (incluida), respetando COUNT y UNTIL
+
+        Args:
+            anchor: Ocurrencia actual (due_date de la tarea)
+            until: No generar más allá de esta fecha
+            limit: Máximo de ocurrencias
+
+        Yields:
+            date: Fechas de las ocurrencias
+        """
+        remaining = min(limit, self.count) if self.count is not None else limit
+        last = min(filter(None, (until, self.until)), default=None)
+        if remaining < 1 or (last is not None and anchor > last):
+            return
+        yield anchor
+        remaining -= 1
+        for candidate in self._candidates(anchor):
+            if remaining < 1 or (last is not None and candidate > last):
+                return
+            yield candidate
+            remaining -= 1
+
+    def _skip_periods(self, anchor: date, start: date):
+        """
+        Adelanta anchor periodos completos de la regla sin llegar a start
+
+        Las fechas de la regla se repiten con el periodo (interval días,
+        semanas, meses o años), así que desde la nueva ancla salen las
+        mismas ocurrencias posteriores a ella. La nueva ancla queda antes
+        de start y no se muestra aunque no sea una ocurrencia (semanal con
+        BYDAY que no incluye su día).
+
+        Returns:
+            tuple: (nueva ancla, regla equivalente a partir de ella)
+        """
+        if self.freq in ("DAILY", "WEEKLY"):
+            period = self.interval * (7 if self.freq == "WEEKLY" else 1)
+            periods = ((start - anchor).days - 1) // period
+            return anchor + timedelta(days=periods * period), self
+
+        months = self.interval * (12 if self.freq == "YEARLY" else 1)
+        elapsed = (start.year - anchor.year) * 12 + start.month - anchor.month
+        periods = max((elapsed - 1) // months, 0)
+        month_index = anchor.month - 1 + months * periods
+        year, month = anchor.year + month_index // 12, month_index % 12 + 1
+        # Fijar el día del mes: la nueva ancla puede caer en un mes más corto
+        day = self.by_month_day or anchor.day
+        shifted = date(year, month, min(day, calendar.monthrange(year, month)[1]))
+        return shifted, RecurrenceRule(self.freq, self.interval, self.by_day, day, self.count, self.until)
+
+    def occurrences_between(self, anchor: date, start: date, end: date):
+        """
+        Ocurrencias de la serie que empieza en anchor entre start y end (incluidos)
+
+        Sin COUNT, el ancla salta directamente al rango, de modo que una
+        serie antigua no agota MAX_OCCURRENCES antes de llegar a él. Con
+        COUNT hay que contar desde anchor, así que se recorren como mucho
+        COUNT ocurrencias.
+
+        Args:
+            anchor: Ocurrencia actual (due_date de la tarea)
+            start: Primer día del rango
+            end: Último día del rango
+
+        Yields:
+            date: Fechas de las ocurrencias dentro del rango
+        """
+        rule, limit = self, MAX_OCCURRENCES
+        if anchor < start:
+            if self.count is None:
+                anchor, rule = self._skip_periods(anchor, start)
+            else:
+                limit = self.count
+        for due in rule.occurrences(anchor, until=end, limit=limit):
+            if due >= start:
+                yield due
+
+    def advance(self, anchor: date):
+        """
+        Siguiente ocurrencia tras completar la actual
+
+        Args:
+            anchor: Ocurrencia actual
+
+        Returns:
+            tuple: (fecha siguiente, regla actualizada) o (None, None) si era la última
+        """
+        upcoming = list(self.occurrences(anchor, limit=2))
+        if len(upcoming) < 2:
+            return None, None
+        count = self.count - 1 if self.count is not None else None
+        # Fijar el día del mes para que un 31 no derive a 28 tras pasar por febrero
+        by_month_day = self.by_month_day
+        if self.freq == "MONTHLY" and by_month_day is None:
+            by_month_day = anchor.day
+        rule = RecurrenceRule(self.freq, self.interval, self.by_day, by_month_day, count, self.until)
+        return upcoming[1], rule
+
+
+def validate_rule(value):
+    """
+    Valida y normaliza una regla para los schemas
+
+    Args:
+        value: Regla recibida o None
+
+    Returns:
+        str: Regla normalizada en formato RRULE o None
+    """
+    if value is None or value == "":
+        return None
+    return RecurrenceRule.parse(value).format()
+
+
+def complete_occurrence(db, task: Task) -> Task:
+    """
+    Completa la ocurrencia actual de una tarea recurrente
+
+    Se guarda una copia completada de la ocurrencia y la tarea avanza a
+    la siguiente fecha de la regla. Si era la última, se completa la
+    propia tarea y deja de ser recurrente.
+
+    Args:
+        db: Sesión de base de datos
+        task: Tarea recurrente pendiente
+
+    Returns:
+        Task: Ocurrencia completada
+    """
+    now = datetime.utcnow()
+    next_due, next_rule = RecurrenceRule.parse(task.recurrence).advance(task.due_date)
+
+    if next_due is None:
+        task.recurrence = None
+        task.is_completed = True
+        task.completed_at = now
+        return task
+
+    completed = Task(
+        title=task.title,
+        description=task.description,
+        priority=task.priority,
+        due_date=task.due_date,
+        user_id=task.user_id,
+        category_id=task.category_id,
+        parent_id=task.parent_id,
+        path=task.path,
+        depth=task.depth,
+        is_completed=True,
+        created_at=now,
+        completed_at=now,
+        # rollups cuenta su finalización, pero no como tarea nueva
+        occurrence_of=task.id,
+    )
+    db.add(completed)
+
+    task.due_date = next_due
+    task.recurrence = next_rule.format()
+    return completed
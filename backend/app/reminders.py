@@ -0,0 +1,370 @@
+"""
+Recordatorios de tareas próximas a vencer
+
+En lugar de recorrer todas las tareas de todos los usuarios, el
+planificador lee por el índice (is_completed, due_date) solo la ventana
+de fechas que vence en las próximas REMINDER_HORIZON_DAYS, paginando
+por (due_date, id). Los vencimientos encontrados se guardan en un heap
+en memoria ordenado por el momento de aviso, y en cada pasada se
+entregan los que ya tocan.
+
+Entrega al menos una vez: antes de notificar se inserta la fila
+(task_id, due_date) en task_reminders; si otro proceso ya la insertó,
+la inserción falla y no se notifica. Si la entrega falla, la fila se
+borra para reintentarlo en la siguiente pasada; si el proceso muere
+entre la reclamación y la marca de enviado, la fila se libera pasados
+REMINDER_STALE_SECONDS y el recordatorio puede llegar dos veces (los
+destinos pueden descartar duplicados por task_id y due_date).
+
+Las filas se borran con sus tareas y, pasados REMINDER_RETENTION_DAYS
+desde el vencimiento, en una pasada diaria.
+
+Destinos configurables con REMINDER_SINKS (separados por comas):
+    log      Escribe el recordatorio en el log
+    webhook  Envía un POST JSON a REMINDER_WEBHOOK_URL
+"""
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import date, datetime, time as dt_time, timedelta
+import heapq
+import json
+import logging
+import os
+import threading
+import urllib.request
+
+from database import SessionLocal
+from models.task import Task
+from models.task_reminder import TaskReminder
+from sharding import shard_router
+from jobs import job_runner
+
+logger = logging.getLogger(__name__)
+
+# Horas de antelación con las que se avisa antes del inicio de la fecha límite
+REMINDER_LEAD_HOURS = float(os.getenv("REMINDER_LEAD_HOURS", 24))
+# Días hacia delante que se cargan en memoria
+REMINDER_HORIZON_DAYS = int(os.getenv("REMINDER_HORIZON_DAYS", 2))
+# Filas leídas por página del índice
+REMINDER_SCAN_BATCH = int(os.getenv("REMINDER_SCAN_BATCH", 1000))
+# Máximo de vencimientos en memoria por proceso
+REMINDER_MAX_PENDING = int(os.getenv("REMINDER_MAX_PENDING", 100_000))
+# Segundos entre relecturas de la ventana (recoge tareas nuevas o cambiadas)
+REMINDER_REFRESH_SECONDS = float(os.getenv("REMINDER_REFRESH_SECONDS", 300))
+# Segundos entre pasadas de entrega (0 = desactivado)
+REMINDER_INTERVAL_SECONDS = float(os.getenv("REMINDER_INTERVAL_SECONDS", 60))
+# Una reclamación "sending" más antigua que esto se considera abandonada
+REMINDER_STALE_SECONDS = float(os.getenv("REMINDER_STALE_SECONDS", 600))
+# Días tras el vencimiento que se conserva el registro de un recordatorio
+REMINDER_RETENTION_DAYS = int(os.getenv("REMINDER_RETENTION_DAYS", 30))
+# Destinos de los recordatorios
+REMINDER_SINKS = os.getenv("REMINDER_SINKS", "log")
+REMINDER_WEBHOOK_URL = os.getenv("REMINDER_WEBHOOK_URL")
+
+
+# ====================
+# DESTINOS
+# ====================
+
+class LogSink:
+    """Escribe los recordatorios en el log"""
+
+    def deliver(self, reminder: dict) -> None:
+        logger.info(
+            f"⏰ Recordatorio: tarea {reminder['task_id']} de usuario {reminder['user_id']} "
+            f"vence el {reminder['due_date']}: {reminder['title']}"
+        )
+
+
+class WebhookSink:
+    """Envía cada recordatorio como POST JSON a una URL"""
+
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, reminder: dict) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(reminder).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def build_sinks(names: str) -> list:
+    """
+    Crea los destinos configurados
+
+    Args:
+        names: Nombres separados por comas (log, webhook)
+
+    Returns:
+        list: Destinos
+    """
+    sinks = []
+    for name in filter(None, (part.strip() for part in names.split(","))):
+        if name == "log":
+            sinks.append(LogSink())
+        elif name == "webhook" and REMINDER_WEBHOOK_URL:
+            sinks.append(WebhookSink(REMINDER_WEBHOOK_URL))
+        else:
+            logger.warning(f"⚠️ Destino de recordatorios desconocido o sin configurar: {name}")
+    return sinks
+
+
+# ====================
+# PLANIFICADOR
+# ====================
+
+def fire_at(due_date: date) -> datetime:
+    """Momento en que se avisa de un vencimiento"""
+    return datetime.combine(due_date, dt_time.min) - timedelta(hours=REMINDER_LEAD_HOURS)
+
+
+class ReminderScheduler:
+    """
+    Heap en memoria de los próximos vencimientos, alimentado por lecturas
+    acotadas del índice de fechas
+    """
+
+    def __init__(self, sinks: list):
+        self.sinks = sinks
+        self._heap = []
+        self._queued = set()
+        self._last_refresh = None
+        self._lock = threading.Lock()
+
+    def refresh(self, today: date = None) -> int:
+        """
+        Lee la ventana de vencimientos próximos de cada shard
+
+        Solo tareas abiertas sin recordatorio ya reclamado (anti-join con
+        task_reminders), paginando por (due_date, id) sobre el índice. Los
+        usuarios que se están moviendo de shard se saltan hasta la
+        siguiente relectura.
+
+        Args:
+            today: Fecha de referencia (por defecto hoy)
+
+        Returns:
+            int: Vencimientos añadidos al heap
+        """
+        today = today or date.today()
+        window_end = today + timedelta(days=REMINDER_HORIZON_DAYS)
+        added = 0
+        migrating = _migrating_users()
+        for shard in shard_router.engines:
+            db = shard_router.session_for(shard)
+            try:
+                # Liberar reclamaciones de procesos que murieron antes de entregar
+                db.execute(delete(TaskReminder.__table__).where(
+                    TaskReminder.status == "sending",
+                    TaskReminder.created_at < datetime.utcnow() - timedelta(seconds=REMINDER_STALE_SECONDS),
+                    TaskReminder.user_id.notin_(migrating),
+                ))
+                db.commit()
+
+                last = (today, 0)
+                while len(self._heap) < REMINDER_MAX_PENDING:
+                    rows = db.execute(
+                        select(Task.id, Task.user_id, Task.title, Task.due_date)
+                        .outerjoin(TaskReminder, and_(
+                            TaskReminder.task_id == Task.id,
+                            TaskReminder.due_date == Task.due_date,
+                        ))
+                        .where(
+                            Task.is_completed == False,
+                            Task.due_date >= today,
+                            Task.due_date <= window_end,
+                            or_(Task.due_date > last[0], and_(Task.due_date == last[0], Task.id > last[1])),
+                            TaskReminder.task_id.is_(None),
+                            Task.user_id.notin_(migrating),
+                        )
+                        .order_by(Task.due_date, Task.id)
+                        .limit(REMINDER_SCAN_BATCH)
+                    ).all()
+                    if not rows:
+                        break
+                    with self._lock:
+                        for task_id, user_id, title, due_date in rows:
+                            key = (shard, task_id, due_date)
+                            if key not in self._queued:
+                                self._queued.add(key)
+                                heapq.heappush(self._heap, (fire_at(due_date), shard, task_id, due_date, user_id, title))
+                                added += 1
+                    last = (rows[-1].due_date, rows[-1].id)
+            finally:
+                db.close()
+        self._last_refresh = datetime.utcnow()
+        return added
+
+    def _claim(self, db, task_id: int, due_date: date, user_id: int) -> bool:
+        """Reclama el recordatorio; False si ya lo reclamó otro proceso"""
+        try:
+            db.add(TaskReminder(task_id=task_id, due_date=due_date, user_id=user_id, status="sending"))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+
+    def deliver_due(self, now: datetime = None) -> int:
+        """
+        Entrega los recordatorios cuyo momento de aviso ya llegó
+
+        Args:
+            now: Momento de referencia (por defecto ahora)
+
+        Returns:
+            int: Recordatorios entregados
+        """
+        now = now or datetime.now()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                item = heapq.heappop(self._heap)
+                self._queued.discard((item[1], item[2], item[3]))
+                due.append(item)
+
+        # Usuario en migración o ya movido de shard: lo recoge la siguiente relectura
+        directory = SessionLocal()
+        try:
+            migrating = shard_router.migrating_users(directory)
+            due = [
+                item for item in due
+                if item[4] not in migrating and shard_router.shard_for(directory, item[4]) == item[1]
+            ]
+        finally:
+            directory.close()
+
+        delivered = 0
+        for _, shard, task_id, due_date, user_id, title in due:
+            db = shard_router.session_for(shard)
+            try:
+                # La tarea puede haberse completado o cambiado de fecha
+                task = db.get(Task, task_id)
+                if task is None or task.is_completed or task.due_date != due_date:
+                    continue
+                if not self._claim(db, task_id, due_date, user_id):
+                    continue
+
+                reminder = {
+                    "task_id": task_id,
+                    "user_id": user_id,
+                    "title": title,
+                    "due_date": due_date.isoformat(),
+                }
+                try:
+                    for sink in self.sinks:
+                        sink.deliver(reminder)
+                except Exception as exc:
+                    # Liberar la reclamación para reintentarlo
+                    db.execute(delete(TaskReminder.__table__).where(
+                        TaskReminder.task_id == task_id,
+                        TaskReminder.due_date == due_date,
+                    ))
+                    db.commit()
+                    logger.warning(f"⚠️ No se pudo entregar el recordatorio de la tarea {task_id}: {exc}")
+                    continue
+
+                db.execute(
+                    update(TaskReminder.__table__)
+                    .where(TaskReminder.task_id == task_id, TaskReminder.due_date == due_date)
+                    .values(status="sent", sent_at=datetime.utcnow())
+                )
+                db.commit()
+                delivered += 1
+            finally:
+                db.close()
+        return delivered
+
+    def run_once(self) -> int:
+        """
+        Pasada completa: relee la ventana si toca y entrega lo pendiente
+
+        Returns:
+            int: Recordatorios entregados
+        """
+        stale = (
+            self._last_refresh is None
+            or datetime.utcnow() - self._last_refresh >= timedelta(seconds=REMINDER_REFRESH_SECONDS)
+        )
+        if stale:
+            self.refresh()
+        return self.deliver_due()
+
+
+def _migrating_users() -> set:
+    """Usuarios en migración de shard, cuyas filas no se tocan"""
+    directory = SessionLocal()
+    try:
+        return shard_router.migrating_users(directory)
+    finally:
+        directory.close()
+
+
+# Planificador del proceso
+reminder_scheduler = ReminderScheduler(build_sinks(REMINDER_SINKS))
+
+
+def forget_tasks(db, task_condition) -> None:
+    """
+    Borra los recordatorios de las tareas que se van a borrar
+
+    Args:
+        db: Sesión del shard
+        task_condition: Condición sobre TaskReminder.task_id (ej: TaskReminder.task_id.in_(...))
+    """
+    db.execute(delete(TaskReminder.__table__).where(task_condition))
+
+
+def prune_reminders(retention_days: int = REMINDER_RETENTION_DAYS) -> int:
+    """
+    Borra de todos los shards los recordatorios de vencimientos pasados
+
+    La ventana del planificador empieza en hoy, así que estas filas ya no
+    evitan ningún aviso.
+
+    Args:
+        retention_days: Días tras el vencimiento que se conservan
+
+    Returns:
+        int: Filas borradas
+    """
+    cutoff = date.today() - timedelta(days=retention_days)
+    migrating = _migrating_users()
+    deleted = 0
+    for shard in shard_router.engines:
+        db = shard_router.session_for(shard)
+        try:
+            deleted += db.execute(
+                delete(TaskReminder.__table__).where(
+                    TaskReminder.due_date < cutoff,
+                    TaskReminder.user_id.notin_(migrating),
+                )
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+    return deleted
+
+
+@job_runner.register("deliver_reminders")
+def deliver_reminders_job(payload: dict) -> None:
+    """Trabajo periódico de entrega de recordatorios"""
+    delivered = reminder_scheduler.run_once()
+    if delivered:
+        logger.info(f"⏰ {delivered} recordatorios entregados")
+
+
+@job_runner.register("prune_reminders")
+def prune_reminders_job(payload: dict) -> None:
+    """Trabajo diario de limpieza de recordatorios"""
+    prune_reminders(**payload)
+
+
+job_runner.schedule_every("deliver_reminders", REMINDER_INTERVAL_SECONDS)
+job_runner.schedule_every("prune_reminders", 24 * 3600)
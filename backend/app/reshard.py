@@ -0,0 +1,314 @@
+"""
+Herramienta para mover los datos de un usuario entre shards en caliente
+
+Fases:
+    1. Copia en lotes de categorías, etiquetas, vistas, tareas, tareas
+       archivadas, asignaciones de etiquetas, recordatorios y agregados
+       diarios al shard destino mientras el usuario sigue trabajando
+       sobre el origen
+    2. Congelación breve de escrituras (estado "migrating") y copia del
+       delta: filas modificadas o archivadas desde el inicio, filas
+       borradas y diferencias en las tablas sin id. Los trabajos en
+       segundo plano se saltan a los usuarios en este estado
+    3. Cambio de ubicación al destino y reanudación de las escrituras
+    4. Borrado en lotes de las filas del origen tras un periodo de gracia
+
+Uso:
+    python reshard.py --user-id 42 --to shard-b
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import and_, bindparam, delete, insert, inspect, select, update
+import argparse
+import logging
+import time
+
+from database import SessionLocal
+from models.user import User
+from models.category import Category
+from models.task import Task
+from models.archived_task import ArchivedTask
+from models.tag import Tag
+from models.task_tag import TaskTag
+from models.saved_view import SavedView
+from models.task_daily_stat import TaskDailyStat
+from models.task_reminder import TaskReminder
+from models.user_shard import UserShard
+from sharding import shard_router
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(obj) -> dict:
+    """Valores de todas las columnas de una fila del ORM"""
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(type(obj)).column_attrs}
+
+
+def _copy_rows(model, source, target, user_id: int, batch_size: int, pause: float, since=None) -> int:
+    """
+    Copia las filas de un usuario en lotes ordenados por ID
+
+    Se insertan las filas nuevas y se sobrescriben las que ya estaban en
+    el destino con sentencias de core: la versión del origen se copia tal
+    cual, sin la comprobación de version_id_col que haría merge().
+
+    Args:
+        model: Modelo a copiar
+        source: Sesión del shard origen
+        target: Sesión del shard destino
+        user_id: ID del usuario
+        batch_size: Filas por lote
+        pause: Segundos de espera entre lotes
+        since: Copiar solo filas modificadas (o archivadas) desde esta fecha
+
+    Returns:
+        int: Filas copiadas
+    """
+    copied = 0
+    last_id = 0
+    while True:
+        query = source.query(model).filter(model.user_id == user_id, model.id > last_id)
+        if since is not None:
+            query = query.filter(_changed_at(model) >= since)
+        rows = query.order_by(model.id).limit(batch_size).all()
+        if not rows:
+            return copied
+
+        table = model.__table__
+        values = [_columns(row) for row in rows]
+        existing = set(target.execute(
+            select(table.c.id).where(table.c.id.in_([row["id"] for row in values]))
+        ).scalars())
+        new_rows = [row for row in values if row["id"] not in existing]
+        if new_rows:
+            target.execute(insert(table), new_rows)
+        for row in values:
+            if row["id"] in existing:
+                target.execute(update(table).where(table.c.id == row["id"]).values(**row))
+        target.commit()
+        source.expunge_all()
+
+        copied += len(rows)
+        last_id = rows[-1].id
+        logger.info(f"📦 {model.__tablename__}: {copied} filas copiadas")
+        if pause:
+            time.sleep(pause)
+
+
+def _changed_at(model):
+    """Columna con la última modificación de una fila (las archivadas no se modifican)"""
+    return model.archived_at if model is ArchivedTask else model.updated_at
+
+
+def _delete_missing(model, source, target, user_id: int) -> int:
+    """
+    Borra del destino las filas que ya no existen en el origen y copia las
+    que faltan en él
+
+    Una tarea puede archivarse en el destino antes que en el origen (o al
+    revés) sin cambiar su fecha de modificación: tras esta pasada cada id
+    está en la misma tabla en ambos shards.
+    """
+    source_ids = {row_id for (row_id,) in source.query(model.id).filter(model.user_id == user_id)}
+    target_ids = {row_id for (row_id,) in target.query(model.id).filter(model.user_id == user_id)}
+    missing = target_ids - source_ids
+    if missing:
+        target.query(model).filter(model.id.in_(missing)).delete(synchronize_session=False)
+    absent = source_ids - target_ids
+    if absent:
+        rows = [_columns(row) for row in source.query(model).filter(model.id.in_(absent))]
+        target.execute(insert(model.__table__), rows)
+        source.expunge_all()
+    target.commit()
+    return len(missing)
+
+
+def _purge_rows(model, session, user_id: int, batch_size: int, pause: float) -> int:
+    """Borra las filas de un usuario en lotes acotados"""
+    deleted = 0
+    while True:
+        ids = [row_id for (row_id,) in session.query(model.id).filter(
+            model.user_id == user_id
+        ).limit(batch_size)]
+        if not ids:
+            return deleted
+        session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        session.commit()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def _replace_rows(model, source, target, user_id: int) -> int:
+    """
+    Sustituye en el destino las filas del usuario por las del origen
+
+    Para tablas sin id propio (asignaciones de etiquetas, recordatorios
+    y agregados diarios), que se copian enteras en la fase 1.
+    """
+    rows = [_columns(row) for row in source.query(model).filter(model.user_id == user_id)]
+    target.query(model).filter(model.user_id == user_id).delete(synchronize_session=False)
+    if rows:
+        target.execute(model.__table__.insert(), rows)
+    target.commit()
+    source.expunge_all()
+    return len(rows)
+
+
+def _sync_rows(model, source, target, user_id: int) -> int:
+    """
+    Iguala las filas del usuario en el destino escribiendo solo las diferencias
+
+    Para las tablas sin id propio en la fase 2: ya se copiaron enteras en
+    la fase 1, así que se comparan por clave primaria y solo se borran,
+    insertan o actualizan las que cambiaron desde entonces.
+
+    Returns:
+        int: Filas escritas en el destino
+    """
+    table = model.__table__
+    keys = [column.name for column in table.primary_key.columns]
+    query = select(table).where(table.c.user_id == user_id)
+    source_rows = {tuple(row[key] for key in keys): dict(row) for row in source.execute(query).mappings()}
+    target_rows = {tuple(row[key] for key in keys): dict(row) for row in target.execute(query).mappings()}
+
+    by_key = and_(*(table.c[key] == bindparam(f"_{key}") for key in keys))
+    stale = [dict(zip((f"_{key}" for key in keys), row_key)) for row_key in target_rows.keys() - source_rows.keys()]
+    if stale:
+        target.execute(delete(table).where(by_key), stale)
+    new_rows = [row for row_key, row in source_rows.items() if row_key not in target_rows]
+    if new_rows:
+        target.execute(insert(table), new_rows)
+    changed = [
+        {**row, **{f"_{key}": row[key] for key in keys}}
+        for row_key, row in source_rows.items()
+        if row_key in target_rows and target_rows[row_key] != row
+    ]
+    if changed:
+        values = {name: bindparam(name) for name in table.c.keys() if name not in keys}
+        target.execute(update(table).where(by_key).values(values), changed)
+    target.commit()
+    return len(stale) + len(new_rows) + len(changed)
+
+
+def _set_placement(directory, user_id: int, shard: str, state: str) -> None:
+    """Crea o actualiza la ubicación explícita del usuario"""
+    placement = directory.get(UserShard, user_id)
+    if placement is None:
+        placement = UserShard(user_id=user_id)
+        directory.add(placement)
+    placement.shard = shard
+    placement.state = state
+    directory.commit()
+
+
+def move_user(user_id: int, target_shard: str, batch_size: int = 1000, pause: float = 0.05, grace: float = 10) -> dict:
+    """
+    Mueve todas las tareas (activas y archivadas) y categorías de un usuario a otro shard
+
+    Args:
+        user_id: ID del usuario
+        target_shard: Nombre del shard destino
+        batch_size: Filas por lote
+        pause: Segundos de espera entre lotes (limita la carga)
+        grace: Segundos a esperar antes de borrar el origen
+
+    Returns:
+        dict: Resumen de la migración
+
+    Raises:
+        ValueError: Si el shard no existe o el usuario ya está en él
+    """
+    if target_shard not in shard_router.engines:
+        raise ValueError(f"Shard desconocido: {target_shard}")
+
+    directory = SessionLocal()
+    try:
+        user = directory.get(User, user_id)
+        if user is None:
+            raise ValueError(f"Usuario {user_id} no encontrado")
+
+        source_shard = shard_router.shard_for(directory, user_id)
+        if source_shard == target_shard:
+            raise ValueError(f"El usuario {user_id} ya está en {target_shard}")
+
+        source = shard_router.session_for(source_shard)
+        target = shard_router.session_for(target_shard)
+        try:
+            shard_router.mirror_user(target_shard, user)
+
+            # Fase 1: copia en caliente
+            started_at = datetime.utcnow() - timedelta(seconds=1)
+            categories = _copy_rows(Category, source, target, user_id, batch_size, pause)
+            _copy_rows(Tag, source, target, user_id, batch_size, pause)
+            _copy_rows(SavedView, source, target, user_id, batch_size, pause)
+            tasks = _copy_rows(Task, source, target, user_id, batch_size, pause)
+            tasks += _copy_rows(ArchivedTask, source, target, user_id, batch_size, pause)
+            for model in (TaskTag, TaskReminder, TaskDailyStat):
+                _replace_rows(model, source, target, user_id)
+
+            # Fase 2: congelar escrituras y copiar el delta
+            _set_placement(directory, user_id, source_shard, "migrating")
+            time.sleep(grace)  # Dejar terminar las escrituras en curso
+            delta = _copy_rows(Category, source, target, user_id, batch_size, 0, since=started_at)
+            delta += _copy_rows(Tag, source, target, user_id, batch_size, 0, since=started_at)
+            delta += _copy_rows(SavedView, source, target, user_id, batch_size, 0, since=started_at)
+            delta += _copy_rows(Task, source, target, user_id, batch_size, 0, since=started_at)
+            delta += _copy_rows(ArchivedTask, source, target, user_id, batch_size, 0, since=started_at)
+            removed = _delete_missing(Task, source, target, user_id)
+            removed += _delete_missing(ArchivedTask, source, target, user_id)
+            removed += _delete_missing(Category, source, target, user_id)
+            removed += _delete_missing(Tag, source, target, user_id)
+            removed += _delete_missing(SavedView, source, target, user_id)
+            # Los recordatorios ya enviados no se vuelven a enviar desde el destino
+            for model in (TaskTag, TaskReminder, TaskDailyStat):
+                delta += _sync_rows(model, source, target, user_id)
+
+            # Fase 3: cambiar la ubicación
+            if shard_router.hashed_shard(user_id) == target_shard:
+                directory.query(UserShard).filter(UserShard.user_id == user_id).delete()
+                directory.commit()
+            else:
+                _set_placement(directory, user_id, target_shard, "active")
+
+            # Fase 4: limpiar el origen cuando ya nadie lo lea
+            time.sleep(grace)
+            purged = _purge_rows(Task, source, user_id, batch_size, pause)
+            purged += _purge_rows(ArchivedTask, source, user_id, batch_size, pause)
+            purged += _purge_rows(Category, source, user_id, batch_size, pause)
+            source.query(TaskTag).filter(TaskTag.user_id == user_id).delete(synchronize_session=False)
+            purged += _purge_rows(Tag, source, user_id, batch_size, pause)
+            purged += _purge_rows(SavedView, source, user_id, batch_size, pause)
+            source.query(TaskReminder).filter(TaskReminder.user_id == user_id).delete(synchronize_session=False)
+            source.query(TaskDailyStat).filter(TaskDailyStat.user_id == user_id).delete(synchronize_session=False)
+            source.commit()
+            shard_router.forget_user(source_shard, user_id)
+        finally:
+            source.close()
+            target.close()
+    finally:
+        directory.close()
+
+    return {
+        "user_id": user_id,
+        "from": source_shard,
+        "to": target_shard,
+        "categories": categories,
+        "tasks": tasks,
+        "delta": delta,
+        "removed": removed,
+        "purged": purged,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Mover un usuario entre shards")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--to", dest="target", required=True)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.05)
+    parser.add_argument("--grace", type=float, default=10)
+    args = parser.parse_args()
+
+    print(move_user(args.user_id, args.target, args.batch_size, args.pause, args.grace))
@@ -0,0 +1,474 @@
+"""
+Agregados diarios de productividad (series temporales)
+
+Los contadores por usuario, día y categoría de task_daily_stats se
+actualizan en la misma transacción que la tarea, desde un listener
+before_flush de la sesión:
+
+    - Tarea nueva: +1 creada el día de created_at. Las copias de
+      ocurrencias recurrentes (occurrence_of) solo suman la finalización,
+      porque la tarea ya se contó al crear la serie
+    - Pendiente -> completada: +1 completada el día de completed_at y
+      los segundos desde la creación; las copias suman además a
+      occurrences_completed y quedan fuera del tiempo medio
+    - Completada -> pendiente: se revierte lo anterior
+
+Las escrituras que no pasan por el ORM (mutations.py) llaman a
+record_completion directamente.
+
+Son contadores de eventos: borrar, archivar o cambiar de categoría una
+tarea no reescribe el historial. Las series se sirven agregando como
+mucho una fila por día y categoría, sin tocar la tabla tasks.
+
+El historial anterior se rellena (o se recalcula) con:
+    python rollups.py backfill [--user-id 42]
+
+Los últimos días se revisan a diario (reconcile.py) por si algún
+incremento se perdió.
+"""
+from sqlalchemy import delete, event, inspect, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+import argparse
+import logging
+import time
+
+from models.task import Task
+from models.archived_task import ArchivedTask
+from models.task_daily_stat import TaskDailyStat
+from sharding import shard_router
+
+logger = logging.getLogger(__name__)
+
+# Contadores de la tabla de agregados
+COUNTERS = ("tasks_created", "tasks_completed", "completion_seconds", "occurrences_completed")
+
+# Granularidades de las series y días por defecto que abarcan
+GRANULARITIES = {"day": 30, "week": 12 * 7, "month": 365}
+
+# Máximo de días que abarca una serie
+TIMESERIES_MAX_DAYS = 3 * 366
+
+
+def _key(user_id: int, category_id, moment: datetime) -> tuple:
+    """Clave del agregado: (usuario, día, categoría)"""
+    return user_id, (moment or datetime.utcnow()).date(), category_id or 0
+
+
+def _seconds(task) -> int:
+    """Segundos entre la creación y la finalización de una tarea"""
+    created_at = task.created_at or datetime.utcnow()
+    completed_at = task.completed_at or datetime.utcnow()
+    return max(int((completed_at - created_at).total_seconds()), 0)
+
+
+def is_occurrence_copy(task) -> bool:
+    """Indica si la tarea es la copia completada de una ocurrencia recurrente"""
+    return task.occurrence_of is not None
+
+
+def _completion(task, sign: int = 1) -> dict:
+    """Incrementos de la finalización de una tarea (o su reversión)"""
+    if is_occurrence_copy(task):
+        return {"tasks_completed": sign, "occurrences_completed": sign}
+    return {"tasks_completed": sign, "completion_seconds": sign * _seconds(task)}
+
+
+def apply_deltas(db: Session, deltas: dict) -> None:
+    """
+    Suma los incrementos a los agregados, creando las filas que falten
+
+    Los incrementos positivos se aplican con un upsert atómico; los
+    negativos (reversiones) solo actualizan filas existentes.
+
+    Args:
+        db: Sesión del shard
+        deltas: {(user_id, day, category_id): {contador: incremento}}
+    """
+    table = TaskDailyStat.__table__
+    dialect = db.get_bind().dialect.name
+    for (user_id, day, category_id), values in deltas.items():
+        values = {name: amount for name, amount in values.items() if amount}
+        if not values:
+            continue
+        key = {"user_id": user_id, "day": day, "category_id": category_id}
+
+        if any(amount < 0 for amount in values.values()):
+            db.execute(
+                update(table)
+                .where(*(table.c[name] == value for name, value in key.items()))
+                .values({name: table.c[name] + amount for name, amount in values.items()})
+            )
+            continue
+
+        if dialect == "mysql":
+            statement = mysql.insert(table).values(**key, **values)
+            statement = statement.on_duplicate_key_update(
+                {name: table.c[name] + statement.inserted[name] for name in values}
+            )
+        else:
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            statement = insert(table).values(**key, **values)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(key),
+                set_={name: table.c[name] + statement.excluded[name] for name in values},
+            )
+        db.execute(statement)
+
+
+def _add(deltas: dict, key: tuple, **values) -> None:
+    """Acumula incrementos para una clave"""
+    counters = deltas.setdefault(key, dict.fromkeys(COUNTERS, 0))
+    for name, amount in values.items():
+        counters[name] += amount
+
+
+def record_completion(db: Session, task, sign: int = 1) -> None:
+    """
+    Suma a los agregados la finalización de una tarea escrita sin el ORM
+
+    Args:
+        db: Sesión del shard
+        task: Fila o modelo con user_id, category_id, created_at,
+            completed_at y occurrence_of
+        sign: 1 para registrarla, -1 para revertirla
+    """
+    deltas = {}
+    _add(deltas, _key(task.user_id, task.category_id, task.completed_at), **_completion(task, sign))
+    apply_deltas(db, deltas)
+
+
+@event.listens_for(Session, "before_flush")
+def track_task_changes(session: Session, flush_context, instances) -> None:
+    """Traduce las tareas nuevas y los cambios de estado a incrementos de los agregados"""
+    deltas = {}
+
+    for task in session.new:
+        if not isinstance(task, Task):
+            continue
+        if not is_occurrence_copy(task):
+            _add(deltas, _key(task.user_id, task.category_id, task.created_at), tasks_created=1)
+        if task.is_completed:
+            _add(deltas, _key(task.user_id, task.category_id, task.completed_at), **_completion(task))
+
+    for task in session.dirty:
+        if not isinstance(task, Task):
+            continue
+        state = inspect(task)
+        changed = state.attrs.is_completed.history
+        if not changed.has_changes():
+            continue
+        was_completed = bool(changed.deleted and changed.deleted[0])
+        if task.is_completed and not was_completed:
+            _add(deltas, _key(task.user_id, task.category_id, task.completed_at), **_completion(task))
+        elif was_completed and not task.is_completed:
+            completed_at = state.attrs.completed_at.history
+            previous = completed_at.deleted[0] if completed_at.deleted else task.completed_at
+            if previous is None:
+                continue
+            if is_occurrence_copy(task):
+                _add(deltas, _key(task.user_id, task.category_id, previous), tasks_completed=-1, occurrences_completed=-1)
+                continue
+            seconds = max(int((previous - (task.created_at or previous)).total_seconds()), 0)
+            _add(
+                deltas, _key(task.user_id, task.category_id, previous),
+                tasks_completed=-1, completion_seconds=-seconds,
+            )
+
+    if deltas:
+        apply_deltas(session, deltas)
+
+
+# ====================
+# CONSULTA
+# ====================
+
+def period_start(day: date, granularity: str) -> date:
+    """Primer día del periodo (día, semana desde el lunes o mes) que contiene day"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def timeseries(db: Session, user_id: int, start: date, end: date, granularity: str = "day", category_id: int = None) -> list:
+    """
+    Serie temporal de creación y finalización de tareas de un usuario
+
+    Args:
+        db: Sesión del shard
+        user_id: ID del usuario
+        start: Primer día (incluido)
+        end: Último día (incluido)
+        granularity: day, week o month
+        category_id: Limitar a una categoría (0 = sin categoría)
+
+    Returns:
+        list: Periodos con datos, en orden, cada uno con sus totales y el
+            desglose por categoría
+    """
+    query = select(
+        TaskDailyStat.day, TaskDailyStat.category_id,
+        TaskDailyStat.tasks_created, TaskDailyStat.tasks_completed,
+        TaskDailyStat.completion_seconds, TaskDailyStat.occurrences_completed,
+    ).where(
+        TaskDailyStat.user_id == user_id,
+        TaskDailyStat.day >= start,
+        TaskDailyStat.day <= end,
+    )
+    if category_id is not None:
+        query = query.where(TaskDailyStat.category_id == category_id)
+
+    periods = {}
+    for day, row_category, created, completed, seconds, occurrences in db.execute(query):
+        period = periods.setdefault(period_start(day, granularity), {})
+        counters = period.setdefault(row_category, [0, 0, 0, 0])
+        counters[0] += created
+        counters[1] += completed
+        counters[2] += seconds
+        counters[3] += occurrences
+
+    points = []
+    for period, categories in sorted(periods.items()):
+        created = sum(counters[0] for counters in categories.values())
+        completed = sum(counters[1] for counters in categories.values())
+        seconds = sum(counters[2] for counters in categories.values())
+        # Las ocurrencias completadas no tienen tiempo de resolución
+        timed = completed - sum(counters[3] for counters in categories.values())
+        points.append({
+            "period": period,
+            "created": created,
+            "completed": completed,
+            "avg_completion_hours": round(seconds / timed / 3600, 2) if timed > 0 else None,
+            "by_category": [
+                {"category_id": row_category or None, "created": counters[0], "completed": counters[1]}
+                for row_category, counters in sorted(categories.items())
+            ],
+        })
+    return points
+
+
+# ====================
+# RELLENO
+# ====================
+
+def _backfill_model(db: Session, model, user_id: int, batch_size: int, pause: float) -> int:
+    """Suma a los agregados las tareas de una tabla, en lotes por ID"""
+    processed = 0
+    last_id = 0
+    while True:
+        query = select(
+            model.id, model.user_id, model.category_id,
+            model.is_completed, model.created_at, model.completed_at, model.occurrence_of,
+        ).where(model.id > last_id).order_by(model.id).limit(batch_size)
+        if user_id is not None:
+            query = query.where(model.user_id == user_id)
+        rows = db.execute(query).all()
+        if not rows:
+            return processed
+
+        deltas = {}
+        for row in rows:
+            if not is_occurrence_copy(row):
+                _add(deltas, _key(row.user_id, row.category_id, row.created_at), tasks_created=1)
+            if row.is_completed and row.completed_at is not None:
+                _add(deltas, _key(row.user_id, row.category_id, row.completed_at), **_completion(row))
+        apply_deltas(db, deltas)
+        db.commit()
+
+        processed += len(rows)
+        last_id = rows[-1].id
+        if pause:
+            time.sleep(pause)
+
+
+def backfill(user_id: int = None, batch_size: int = 1000, pause: float = 0.05) -> int:
+    """
+    Recalcula los agregados a partir de las tareas y del archivo
+
+    Borra los agregados del alcance (todos o los de un usuario) y los
+    vuelve a sumar en lotes, con memoria acotada por lote.
+
+    Args:
+        user_id: Recalcular solo este usuario (por defecto todos)
+        batch_size: Tareas por lote
+        pause: Segundos de espera entre lotes
+
+    Returns:
+        int: Tareas procesadas
+    """
+    total = 0
+    for shard in shard_router.engines:
+        db = shard_router.session_for(shard)
+        try:
+            reset = delete(TaskDailyStat.__table__)
+            if user_id is not None:
+                reset = reset.where(TaskDailyStat.user_id == user_id)
+            db.execute(reset)
+            db.commit()
+
+            for model in (Task, ArchivedTask):
+                processed = _backfill_model(db, model, user_id, batch_size, pause)
+                total += processed
+                logger.info(f"📈 {shard}: {processed} filas de {model.__tablename__} agregadas")
+        finally:
+            db.close()
+    return total
+
+
+
+# ====================
+# RECONCILIACIÓN
+# ====================
+
+def _fill_shortfall(deltas: dict, user_id: int, day: date, floors: dict, counters: dict, count: str, seconds: str = None) -> int:
+    """
+    Sube los contadores de un usuario y día hasta lo que justifican sus tareas
+
+    Solo se suma la diferencia del total del día, repartida entre las
+    categorías que se quedan cortas: una tarea que cambió de categoría
+    sigue contada en la original y no es un hueco.
+
+    Args:
+        deltas: Incrementos acumulados
+        floors: {category_id: [tareas, segundos]} de las tareas que existen
+        counters: {category_id: [contador, segundos]} de los agregados
+        count: Contador a corregir
+        seconds: Contador de segundos que lo acompaña (o None)
+
+    Returns:
+        int: Unidades añadidas
+    """
+    shortfall = sum(floor[0] for floor in floors.values()) - sum(counter[0] for counter in counters.values())
+    added = 0
+    for category_id, (floor, floor_seconds) in sorted(floors.items()):
+        if shortfall <= 0:
+            break
+        gap = min(floor - counters.get(category_id, (0, 0))[0], shortfall)
+        if gap <= 0:
+            continue
+        values = {count: gap}
+        if seconds is not None:
+            values[seconds] = floor_seconds * gap // floor
+        _add(deltas, (user_id, day, category_id), **values)
+        shortfall -= gap
+        added += gap
+    return added
+
+
+def reconcile(db: Session, since: date, batch_size: int = 500, skip_users: set = frozenset()) -> int:
+    """
+    Corrige los agregados desde since con lo que justifican las tareas
+
+    Los agregados cuentan eventos y las tareas borradas siguen contadas,
+    así que las tareas existentes (activas y archivadas) solo dan un
+    mínimo: se suben los contadores que quedan por debajo (incrementos
+    perdidos) y se ponen a cero los negativos (reversiones de más). Las
+    copias de ocurrencias se comparan aparte, con occurrences_completed,
+    para no mezclarlas en el tiempo de resolución. Los
+    usuarios se procesan en lotes, cada uno en su transacción; las tareas
+    se leen antes que los agregados para que cualquier tarea visible ya
+    tenga su incremento visible.
+
+    Args:
+        db: Sesión del shard
+        since: Primer día a revisar
+        batch_size: Usuarios por lote
+        skip_users: Usuarios que no se tocan (en migración de shard)
+
+    Returns:
+        int: Unidades corregidas
+    """
+    table = TaskDailyStat.__table__
+    start = datetime.combine(since, datetime.min.time())
+    fixed = 0
+    for name in COUNTERS:
+        fixed += db.execute(
+            update(table)
+            .where(table.c.day >= since, table.c[name] < 0, table.c.user_id.notin_(skip_users))
+            .values({name: 0})
+        ).rowcount
+    db.commit()
+
+    last_user = 0
+    while True:
+        users = sorted(set().union(*(
+            db.execute(
+                select(model.user_id.distinct())
+                .where(model.user_id > last_user, (model.created_at >= start) | (model.completed_at >= start))
+                .order_by(model.user_id).limit(batch_size)
+            ).scalars()
+            for model in (Task, ArchivedTask)
+        )))[:batch_size]
+        if not users:
+            return fixed
+        last_user = users[-1]
+        users = [user_id for user_id in users if user_id not in skip_users]
+
+        created, completed, occurrences = {}, {}, {}
+        for model in (Task, ArchivedTask):
+            rows = db.execute(
+                select(
+                    model.user_id, model.category_id, model.is_completed,
+                    model.created_at, model.completed_at, model.occurrence_of,
+                ).where(
+                    model.user_id.in_(users),
+                    (model.created_at >= start) | (model.completed_at >= start),
+                )
+            )
+            for row in rows:
+                copy = is_occurrence_copy(row)
+                if row.created_at is not None and row.created_at >= start and not copy:
+                    user_id, day, category_id = _key(row.user_id, row.category_id, row.created_at)
+                    created.setdefault((user_id, day), {}).setdefault(category_id, [0, 0])[0] += 1
+                if row.is_completed and row.completed_at is not None and row.completed_at >= start:
+                    user_id, day, category_id = _key(row.user_id, row.category_id, row.completed_at)
+                    floor = (occurrences if copy else completed).setdefault((user_id, day), {}).setdefault(category_id, [0, 0])
+                    floor[0] += 1
+                    floor[1] += 0 if copy else _seconds(row)
+
+        stored_created, stored_completed, stored_occurrences = {}, {}, {}
+        for row in db.execute(select(table).where(table.c.user_id.in_(users), table.c.day >= since)):
+            stored_created.setdefault((row.user_id, row.day), {})[row.category_id] = [row.tasks_created, 0]
+            stored_completed.setdefault((row.user_id, row.day), {})[row.category_id] = [
+                row.tasks_completed - row.occurrences_completed, row.completion_seconds,
+            ]
+            stored_occurrences.setdefault((row.user_id, row.day), {})[row.category_id] = [
+                row.occurrences_completed, 0,
+            ]
+
+        deltas = {}
+        for (user_id, day), floors in created.items():
+            fixed += _fill_shortfall(deltas, user_id, day, floors, stored_created.get((user_id, day), {}), "tasks_created")
+        for (user_id, day), floors in completed.items():
+            fixed += _fill_shortfall(
+                deltas, user_id, day, floors, stored_completed.get((user_id, day), {}),
+                "tasks_completed", "completion_seconds",
+            )
+        for (user_id, day), floors in occurrences.items():
+            gaps = {}
+            fixed += _fill_shortfall(
+                gaps, user_id, day, floors, stored_occurrences.get((user_id, day), {}), "occurrences_completed",
+            )
+            # Cada copia que falta cuenta también como completada
+            for key, values in gaps.items():
+                _add(deltas, key, tasks_completed=values["occurrences_completed"], occurrences_completed=values["occurrences_completed"])
+        apply_deltas(db, deltas)
+        db.commit()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Agregados diarios de tareas")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subcommands.add_parser("backfill", help="Recalcular los agregados desde el historial")
+    backfill_parser.add_argument("--user-id", type=int)
+    backfill_parser.add_argument("--batch-size", type=int, default=1000)
+    backfill_parser.add_argument("--pause", type=float, default=0.05)
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        print(f"Tareas procesadas: {backfill(args.user_id, args.batch_size, args.pause)}")
@@ -6,6 +6,8 @@ from .auth import router as auth_router
 from .users import router as users_router
 from .categories import router as categories_router
 from .tasks import router as tasks_router
+from .tags import router as tags_router
+from .views import router as views_router
 
 # Exportar todos los routers
 __all__ = [
@@ -13,4 +15,6 @@ __all__ = [
     "users_router",
     "categories_router",
     "tasks_router",
+    "tags_router",
+    "views_router",
 ]
\ No newline at end of file
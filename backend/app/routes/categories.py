@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import and_, case, func, update
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
+from datetime import date, datetime
 
-from database import get_db
+from sharding import get_shard_db
 from models.user import User
 from models.category import Category
-from schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
+from models.task import Task
+from schemas.category import CategoryCreate, CategoryUpdate, CategoryTaskCounts, CategoryResponse, CategoryWithCountsResponse
 from auth import get_current_active_user
+from mutations import select_owned, update_owned, delete_owned
+from etags import set_etag, parse_if_match, precondition_failed
 
 # Crear router para las rutas de categorías
 router = APIRouter(
@@ -18,12 +23,13 @@ router = APIRouter(
 # ======================================= 
 # ENDPOINT: OBTENER TODAS LAS CATEGORÍAS 
 # =======================================
-@router.get("/", response_model=List[CategoryResponse])
+@router.get("/", response_model=Union[List[CategoryWithCountsResponse], List[CategoryResponse]])
 async def get_categories(
     skip: int = 0,
     limit: int = 100,
+    include_counts: bool = False,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Obtener todas las categorías del usuario actual
@@ -31,17 +37,43 @@ async def get_categories(
     Args:
         skip: Número de registros a saltar (paginación)
         limit: Número máximo de registros a retornar
+        include_counts: Incluir los contadores de tareas (total, pendientes y
+            vencidas) de cada categoría, calculados en la misma consulta
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
     Returns:
-        List[CategoryResponse]: Lista de categorías
+        List[CategoryResponse]: Lista de categorías (CategoryWithCountsResponse
+            con include_counts)
     """
-    categories = db.query(Category).filter(
+    if not include_counts:
+        categories = db.query(Category).filter(
+            Category.user_id == current_user.id
+        ).offset(skip).limit(limit).all()
+        
+        return categories
+    
+    # Una sola consulta: categorías con sus tareas (no archivadas) agrupadas
+    is_pending = Task.is_completed == False
+    rows = db.query(
+        Category,
+        func.count(Task.id),
+        func.sum(case((is_pending, 1), else_=0)),
+        func.sum(case((and_(is_pending, Task.due_date < date.today()), 1), else_=0)),
+    ).outerjoin(
+        Task,
+        and_(Task.category_id == Category.id, Task.user_id == current_user.id)
+    ).filter(
         Category.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    ).group_by(Category.id).offset(skip).limit(limit).all()
     
-    return categories
+    return [
+        CategoryWithCountsResponse(
+            **CategoryResponse.model_validate(category).model_dump(),
+            task_counts=CategoryTaskCounts(total=total, pending=pending or 0, overdue=overdue or 0),
+        )
+        for category, total, pending, overdue in rows
+    ]
 
 
 # =========================== 
@@ -51,7 +83,7 @@ async def get_categories(
 async def create_category(
     category: CategoryCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Crear una nueva categoría
@@ -98,14 +130,16 @@ async def create_category(
 @router.get("/{category_id}", response_model=CategoryResponse)
 async def get_category(
     category_id: int,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Obtener una categoría por ID
     
     Args:
         category_id: ID de la categoría
+        response: Respuesta (lleva el ETag de la versión)
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
@@ -126,6 +160,7 @@ async def get_category(
             detail="Categoría no encontrada"
         )
     
+    set_etag(response, category)
     return category
 
 
@@ -136,15 +171,21 @@ async def get_category(
 async def update_category(
     category_id: int,
     category_update: CategoryUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Actualizar una categoría
     
+    Con If-Match solo se aplica si la categoría sigue en la versión leída.
+    
     Args:
         category_id: ID de la categoría
         category_update: Datos a actualizar
+        response: Respuesta (lleva el ETag de la nueva versión)
+        if_match: ETag leído (cabecera If-Match)
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
@@ -152,25 +193,19 @@ async def update_category(
         CategoryResponse: Categoría actualizada
         
     Raises:
-        HTTPException: Si la categoría no existe o el nombre ya está en uso
+        HTTPException: Si la categoría no existe, el nombre ya está en uso
+            o If-Match no coincide con la versión actual (412)
     """
-    # Buscar categoría
-    category = db.query(Category).filter(
-        Category.id == category_id,
-        Category.user_id == current_user.id
-    ).first()
-    
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Categoría no encontrada"
-        )
+    versions = parse_if_match(if_match)
+    conditions = [Category.version.in_(versions)] if versions is not None else []
+    values = {}
     
-    # Verificar si el nuevo nombre ya existe
-    if category_update.name and category_update.name != category.name:
-        existing_category = db.query(Category).filter(
+    # Verificar si el nuevo nombre ya existe en otra categoría
+    if category_update.name:
+        existing_category = db.query(Category.id).filter(
             Category.user_id == current_user.id,
-            Category.name == category_update.name
+            Category.name == category_update.name,
+            Category.id != category_id
         ).first()
         
         if existing_category:
@@ -178,15 +213,35 @@ async def update_category(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Ya existe una categoría con ese nombre"
             )
-        category.name = category_update.name
+        values["name"] = category_update.name
     
     # Actualizar color si se proporciona
     if category_update.color is not None:
-        category.color = category_update.color
+        values["color"] = category_update.color
+    
+    # Un solo UPDATE acotado por propietario (o una lectura si no hay cambios)
+    if values:
+        category = update_owned(db, Category, category_id, current_user.id, values, *conditions)
+    else:
+        category = select_owned(db, Category, category_id, current_user.id)
+        if category is not None and versions is not None and category.version not in versions:
+            raise precondition_failed(category.version)
+    
+    if category is None:
+        db.rollback()
+        # Si existe, el UPDATE no aplicó porque la versión ya no es la leída
+        if conditions and values:
+            current = select_owned(db, Category, category_id, current_user.id)
+            if current is not None:
+                raise precondition_failed(current.version)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Categoría no encontrada"
+        )
     
     db.commit()
-    db.refresh(category)
     
+    set_etag(response, category)
     return category
 
 
@@ -197,7 +252,7 @@ async def update_category(
 async def delete_category(
     category_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Eliminar una categoría
@@ -213,19 +268,20 @@ async def delete_category(
     Raises:
         HTTPException: Si la categoría no existe o no pertenece al usuario
     """
-    # Buscar categoría
-    category = db.query(Category).filter(
-        Category.id == category_id,
-        Category.user_id == current_user.id
-    ).first()
+    # Desvincular sus tareas (updated_at incluido, para la copia del delta de reshard.py)
+    db.execute(
+        update(Task.__table__)
+        .where(Task.user_id == current_user.id, Task.category_id == category_id)
+        .values(category_id=None, updated_at=datetime.utcnow(), version=Task.version + 1)
+    )
     
-    if not category:
+    if not delete_owned(db, Category, category_id, current_user.id):
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Categoría no encontrada"
         )
     
-    db.delete(category)
     db.commit()
     
     return None
\ No newline at end of file
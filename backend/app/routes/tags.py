@@ -0,0 +1,231 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List
+
+from sharding import get_shard_db
+from models.user import User
+from models.tag import Tag
+from models.task_tag import TaskTag
+from schemas.tag import TagCreate, TagUpdate, TagResponse, TagAssignment, TagAssignmentResult
+from auth import get_current_active_user
+from mutations import update_owned
+import tags
+
+# Crear router para las rutas de etiquetas
+router = APIRouter(
+    prefix="/tags",
+    tags=["Etiquetas"]
+)
+
+
+# ===================================== 
+# ENDPOINT: OBTENER TODAS LAS ETIQUETAS 
+# =====================================
+@router.get("/", response_model=List[TagResponse])
+async def get_tags(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Obtener las etiquetas del usuario con su número de tareas
+    
+    Los contadores están mantenidos en la propia tabla: no se cuentan filas.
+    
+    Args:
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        List[TagResponse]: Etiquetas ordenadas por nombre
+    """
+    return db.query(Tag).filter(Tag.user_id == current_user.id).order_by(Tag.name).all()
+
+
+# ========================== 
+# ENDPOINT: CREAR ETIQUETA 
+# ==========================
+@router.post("/", response_model=TagResponse, status_code=status.HTTP_201_CREATED)
+async def create_tag(
+    tag: TagCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Crear una etiqueta
+    
+    Args:
+        tag: Datos de la etiqueta
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        TagResponse: Etiqueta creada
+        
+    Raises:
+        HTTPException: Si ya existe una etiqueta con ese nombre
+    """
+    db_tag = Tag(name=tag.name, user_id=current_user.id, task_count=0)
+    db.add(db_tag)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ya existe una etiqueta con ese nombre"
+        )
+    db.refresh(db_tag)
+    
+    return db_tag
+
+
+# ============================= 
+# ENDPOINT: RENOMBRAR ETIQUETA 
+# =============================
+@router.put("/{tag_id}", response_model=TagResponse)
+async def update_tag(
+    tag_id: int,
+    tag_update: TagUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Renombrar una etiqueta (sus tareas la conservan)
+    
+    Args:
+        tag_id: ID de la etiqueta
+        tag_update: Nuevo nombre
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        TagResponse: Etiqueta renombrada
+        
+    Raises:
+        HTTPException: Si la etiqueta no existe o el nombre ya está en uso
+    """
+    try:
+        tag = update_owned(db, Tag, tag_id, current_user.id, {"name": tag_update.name})
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ya existe una etiqueta con ese nombre"
+        )
+    
+    if tag is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Etiqueta no encontrada"
+        )
+    
+    db.commit()
+    
+    return tag
+
+
+# ============================ 
+# ENDPOINT: ELIMINAR ETIQUETA 
+# ============================
+@router.delete("/{tag_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_tag(
+    tag_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Eliminar una etiqueta y quitarla de todas sus tareas
+    
+    Args:
+        tag_id: ID de la etiqueta
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        None
+        
+    Raises:
+        HTTPException: Si la etiqueta no existe o no pertenece al usuario
+    """
+    deleted = db.execute(
+        delete(Tag.__table__).where(Tag.id == tag_id, Tag.user_id == current_user.id)
+    ).rowcount
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Etiqueta no encontrada"
+        )
+    
+    # Su lista de tareas es un rango contiguo de la clave primaria
+    db.execute(delete(TaskTag.__table__).where(TaskTag.tag_id == tag_id))
+    db.commit()
+    
+    return None
+
+
+# ========================================= 
+# ENDPOINTS: ETIQUETAR Y DESETIQUETAR EN BLOQUE 
+# =========================================
+@router.post("/assign", response_model=TagAssignmentResult)
+async def assign_tags(
+    assignment: TagAssignment,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Añadir etiquetas a varias tareas (crea las etiquetas que no existan)
+    
+    Las tareas que no existen o no son del usuario se ignoran, igual que
+    las que ya tenían la etiqueta.
+    
+    Args:
+        assignment: Tareas y etiquetas
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        TagAssignmentResult: Pares añadidos y etiquetas con sus contadores
+    """
+    rows = tags.ensure_tags(db, current_user.id, assignment.tags)
+    changed = tags.tag_tasks(db, current_user.id, [row.id for row in rows], assignment.task_ids)
+    db.commit()
+    
+    return assignment_result(db, current_user.id, assignment.tags, changed)
+
+
+@router.post("/unassign", response_model=TagAssignmentResult)
+async def unassign_tags(
+    assignment: TagAssignment,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Quitar etiquetas de varias tareas
+    
+    Args:
+        assignment: Tareas y etiquetas
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        TagAssignmentResult: Pares quitados y etiquetas con sus contadores
+    """
+    rows = tags.resolve(db, current_user.id, assignment.tags)
+    changed = tags.untag_tasks(db, current_user.id, [row.id for row in rows], assignment.task_ids)
+    db.commit()
+    
+    return assignment_result(db, current_user.id, assignment.tags, changed)
+
+
+def assignment_result(db: Session, user_id: int, names: list, changed: int) -> TagAssignmentResult:
+    """Resultado de una operación en bloque con los contadores ya actualizados"""
+    return TagAssignmentResult(
+        changed=changed,
+        tags=[
+            TagResponse(id=row.id, name=row.name, task_count=row.task_count, created_at=row.created_at)
+            for row in sorted(tags.resolve(db, user_id, names), key=lambda row: row.name)
+        ],
+    )
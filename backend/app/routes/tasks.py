@@ -1,13 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
-from database import get_db
+from sharding import get_shard_db
 from models.user import User
 from models.task import Task
-from schemas.task import TaskCreate, TaskUpdate, TaskResponse
+from models.archived_task import ArchivedTask
+from models.category import Category
+from models.task_tag import TaskTag
+from models.task_reminder import TaskReminder
+from schemas.task import TaskCreate, TaskUpdate, TaskMove, TaskResponse, SubtreeProgress, CategorySummary, TaskSummary, CalendarDay, CalendarResponse
 from auth import get_current_active_user
+from schemas.stats import TimeseriesResponse
+from recurrence import RecurrenceRule, complete_occurrence
+from mutations import select_owned, update_owned
+from etags import set_etag, parse_if_match, precondition_failed
+import archive
+import rollups
+import positions
+import reminders
+import subtasks
+import tags as task_tags
 
 # Crear router para las rutas de tareas
 router = APIRouter(
@@ -15,6 +31,88 @@ router = APIRouter(
     tags=["Tareas"]
 )
 
+# Máximo de días que abarca una consulta de calendario
+CALENDAR_MAX_DAYS = 366
+
+# Relaciones que se pueden embeber en las respuestas con expand
+EXPANDABLE = {"category", "tags"}
+
+
+def parse_expand(expand: Optional[str]) -> set:
+    """
+    Interpreta el parámetro expand (lista separada por comas)
+    
+    Raises:
+        HTTPException: Si pide una relación que no se puede embeber
+    """
+    requested = {name.strip() for name in (expand or "").split(",") if name.strip()}
+    unknown = requested - EXPANDABLE
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No se puede expandir: {', '.join(sorted(unknown))}"
+        )
+    return requested
+
+
+def embed_categories(db: Session, tasks: list, user_id: int) -> list:
+    """
+    Embebe la categoría de cada tarea con una sola consulta
+    
+    Las categorías de todas las tareas se leen juntas (IN por ID), así
+    que el coste no depende del número de tareas. Sirve igual para
+    tareas, archivadas y ocurrencias virtuales.
+    
+    Args:
+        db: Sesión de base de datos
+        tasks: Tareas (modelos o TaskResponse)
+        user_id: ID del usuario propietario
+        
+    Returns:
+        list: TaskResponse con el campo category relleno
+    """
+    responses = [
+        task if isinstance(task, TaskResponse) else TaskResponse.model_validate(task)
+        for task in tasks
+    ]
+    ids = {response.category_id for response in responses if response.category_id is not None}
+    categories = {}
+    if ids:
+        categories = {
+            category.id: CategorySummary.model_validate(category)
+            for category in db.query(Category).filter(
+                Category.id.in_(ids),
+                Category.user_id == user_id
+            )
+        }
+    return [
+        response.model_copy(update={"category": categories.get(response.category_id)})
+        for response in responses
+    ]
+
+
+def embed_tags(db: Session, tasks: list, user_id: int) -> list:
+    """
+    Embebe los nombres de las etiquetas de cada tarea con una sola consulta
+    
+    Args:
+        db: Sesión de base de datos
+        tasks: Tareas (modelos o TaskResponse)
+        user_id: ID del usuario propietario
+        
+    Returns:
+        list: TaskResponse con el campo tags relleno
+    """
+    responses = [
+        task if isinstance(task, TaskResponse) else TaskResponse.model_validate(task)
+        for task in tasks
+    ]
+    names = task_tags.names_by_task(db, list({response.id for response in responses}), user_id)
+    return [
+        response.model_copy(update={"tags": names.get(response.id, [])})
+        for response in responses
+    ]
+
 
 # ==================================== 
 # ENDPOINT: OBTENER TODAS LAS TAREAS 
@@ -26,8 +124,16 @@ async def get_tasks(
     is_completed: Optional[bool] = None,
     category_id: Optional[int] = None,
     priority: Optional[str] = None,
+    include_archived: Optional[bool] = None,
+    occurrences_until: Optional[date] = None,
+    expand: Optional[str] = None,
+    sort: str = Query("created_at", pattern="^(created_at|position)$"),
+    parent_id: Optional[int] = None,
+    subtree_of: Optional[int] = None,
+    tags: Optional[str] = None,
+    match: str = Query("any", pattern="^(all|any)$"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Obtener todas las tareas del usuario actual con filtros opcionales
@@ -38,31 +144,213 @@ async def get_tasks(
         is_completed: Filtrar por estado (completada o no)
         category_id: Filtrar por categoría
         priority: Filtrar por prioridad (low, medium, high)
+        include_archived: Incluir tareas archivadas (por defecto solo con is_completed=true)
+        occurrences_until: Añadir tras cada tarea recurrente pendiente sus próximas
+            ocurrencias hasta esta fecha (generadas al vuelo, no se guardan)
+        expand: Relaciones a embeber (category, tags)
+        sort: Orden del listado: created_at (más recientes primero) o
+            position (orden manual)
+        parent_id: Solo las hijas directas de esta tarea (0 = primer nivel)
+        subtree_of: Solo los descendientes (a cualquier nivel) de esta tarea
+        tags: Filtrar por etiquetas (lista separada por comas)
+        match: Con tags, exigir todas las etiquetas (all) o alguna (any)
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
     Returns:
         List[TaskResponse]: Lista de tareas
+        
+    Raises:
+        HTTPException: Si la tarea de subtree_of no existe o se piden
+            demasiadas etiquetas
     """
-    # Query base
-    query = db.query(Task).filter(Task.user_id == current_user.id)
+    expansions = parse_expand(expand)
+    root = find_task_row(db, subtree_of, current_user.id) if subtree_of is not None else None
     
-    # Aplicar filtros opcionales
-    if is_completed is not None:
-        query = query.filter(Task.is_completed == is_completed)
+    tag_names = task_tags.parse_tags(tags)
+    if len(tag_names) > task_tags.TAGS_MAX_PER_REQUEST:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Como máximo {task_tags.TAGS_MAX_PER_REQUEST} etiquetas por filtro"
+        )
     
-    if category_id is not None:
-        query = query.filter(Task.category_id == category_id)
+    # Las archivadas siempre están completadas
+    if include_archived is None:
+        include_archived = is_completed is True
+    if is_completed is False:
+        include_archived = False
     
-    if priority is not None:
-        query = query.filter(Task.priority == priority)
+    def filtered(model):
+        """Query del modelo con los filtros de la petición"""
+        query = db.query(model).filter(model.user_id == current_user.id)
+        
+        # Aplicar filtros opcionales
+        if is_completed is not None:
+            query = query.filter(model.is_completed == is_completed)
+        
+        if category_id is not None:
+            query = query.filter(model.category_id == category_id)
+        
+        if priority is not None:
+            query = query.filter(model.priority == priority)
+        
+        if parent_id is not None:
+            query = query.filter(model.parent_id == parent_id if parent_id else model.parent_id.is_(None))
+        
+        # Descendientes: una lectura por rango del índice (user_id, path)
+        if root is not None:
+            query = query.filter(subtasks.descendants_filter(model, root))
+        
+        # Etiquetas: unión o intersección de sus listas en task_tags
+        if tag_names:
+            query = query.filter(task_tags.task_filter(db, model, current_user.id, tag_names, match))
+        
+        # Orden manual (índice (user_id, position)) o por fecha de creación
+        # (más recientes primero)
+        if sort == "position":
+            return query.order_by(model.position, model.id)
+        return query.order_by(model.created_at.desc())
+    
+    if not include_archived:
+        tasks = filtered(Task).offset(skip).limit(limit).all()
+    else:
+        # Mezclar ambas tablas: basta con las primeras skip + limit de cada una
+        window = skip + limit
+        tasks = filtered(Task).limit(window).all() + filtered(ArchivedTask).limit(window).all()
+        if sort == "position":
+            tasks.sort(key=lambda task: (task.position or "", task.id))
+        else:
+            tasks.sort(key=lambda task: task.created_at, reverse=True)
+        tasks = tasks[skip:window]
     
-    # Ordenar por fecha de creación (más recientes primero)
-    tasks = query.order_by(Task.created_at.desc()).offset(skip).limit(limit).all()
+    if occurrences_until is not None:
+        tasks = expand_occurrences(tasks, occurrences_until)
     
+    if "category" in expansions:
+        tasks = embed_categories(db, tasks, current_user.id)
+    if "tags" in expansions:
+        tasks = embed_tags(db, tasks, current_user.id)
     return tasks
 
 
+def expand_occurrences(tasks: list, until: date) -> list:
+    """
+    Añade tras cada tarea recurrente pendiente sus ocurrencias futuras
+    
+    Args:
+        tasks: Tareas guardadas
+        until: Última fecha a generar
+        
+    Returns:
+        list: Tareas y ocurrencias virtuales (is_occurrence=True)
+    """
+    expanded = []
+    for task in tasks:
+        expanded.append(task)
+        if not task.recurrence or task.is_completed or task.due_date is None:
+            continue
+        base = TaskResponse.model_validate(task)
+        upcoming = RecurrenceRule.parse(task.recurrence).occurrences(task.due_date, until=until)
+        next(upcoming, None)  # La primera es la propia tarea
+        for due in upcoming:
+            expanded.append(base.model_copy(update={"due_date": due, "is_occurrence": True}))
+    return expanded
+
+
+# ============================== 
+# ENDPOINT: CALENDARIO DE TAREAS 
+# ==============================
+@router.get("/calendar", response_model=CalendarResponse)
+async def get_calendar(
+    start: date,
+    end: date,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Obtener las tareas que vencen entre start y end agrupadas por día
+    
+    Una lectura por rango del índice (user_id, due_date) de tasks y otra
+    de tasks_archive (las completadas hace tiempo), con solo las columnas
+    del resumen, así que el coste depende de las tareas del periodo y no
+    del historial. Las tareas recurrentes pendientes aportan también sus
+    ocurrencias dentro del rango, aunque su fecha actual sea muy antigua.
+    
+    Args:
+        start: Primer día (incluido)
+        end: Último día (incluido)
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        CalendarResponse: Días con tareas, cada uno con sus contadores y resúmenes
+        
+    Raises:
+        HTTPException: Si el rango está invertido o supera CALENDAR_MAX_DAYS días
+    """
+    if end < start or (end - start).days >= CALENDAR_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango debe ir de start a end y abarcar como mucho {CALENDAR_MAX_DAYS} días"
+        )
+    
+    def columns(model):
+        return (
+            model.id, model.title, model.priority, model.is_completed,
+            model.category_id, model.due_date, model.recurrence
+        )
+    
+    rows = []
+    for model in (Task, ArchivedTask):
+        rows += db.query(*columns(model)).filter(
+            model.user_id == current_user.id,
+            model.due_date >= start,
+            model.due_date <= end
+        ).order_by(model.due_date, model.id).all()
+    
+    # Recurrentes cuya ocurrencia actual es anterior al rango pero se repiten dentro
+    rows += db.query(*columns(Task)).filter(
+        Task.user_id == current_user.id,
+        Task.is_completed == False,
+        Task.recurrence.isnot(None),
+        Task.due_date < start
+    ).all()
+    
+    days = {}
+    for row in rows:
+        summary = TaskSummary(
+            id=row.id,
+            title=row.title,
+            priority=row.priority,
+            is_completed=row.is_completed,
+            category_id=row.category_id,
+        )
+        if row.due_date >= start:
+            days.setdefault(row.due_date, []).append(summary)
+        if not row.recurrence or row.is_completed:
+            continue
+        for due in RecurrenceRule.parse(row.recurrence).occurrences_between(row.due_date, start, end):
+            # La ocurrencia actual es la propia tarea
+            if due != row.due_date:
+                days.setdefault(due, []).append(summary.model_copy(update={"is_occurrence": True}))
+    
+    buckets = [
+        CalendarDay(
+            date=day,
+            count=len(tasks),
+            completed=sum(task.is_completed for task in tasks),
+            tasks=tasks,
+        )
+        for day, tasks in sorted(days.items())
+    ]
+    return CalendarResponse(
+        start=start,
+        end=end,
+        total=sum(bucket.count for bucket in buckets),
+        days=buckets,
+    )
+
+
 # ======================= 
 # ENDPOINT: CREAR TAREA 
 # =======================
@@ -70,7 +358,7 @@ async def get_tasks(
 async def create_task(
     task: TaskCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Crear una nueva tarea
@@ -82,10 +370,37 @@ async def create_task(
         
     Returns:
         TaskResponse: Tarea creada
+        
+    Raises:
+        HTTPException: Si es recurrente y no tiene fecha límite, o si la
+            tarea padre no existe o ya está en el nivel máximo
     """
+    if task.recurrence and task.due_date is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Una tarea recurrente necesita fecha límite"
+        )
+    
+    # Las subtareas heredan la ruta de su padre
+    tree = {}
+    if task.parent_id is not None:
+        parent = select_owned(db, Task, task.parent_id, current_user.id)
+        if parent is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Tarea padre no encontrada"
+            )
+        if parent.depth + 1 > subtasks.TASK_MAX_DEPTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Las subtareas admiten como mucho {subtasks.TASK_MAX_DEPTH} niveles"
+            )
+        tree = {"path": subtasks.children_path(parent), "depth": parent.depth + 1}
+    
     # Crear nueva tarea
     db_task = Task(
         **task.model_dump(),
+        **tree,
         user_id=current_user.id
     )
     
@@ -102,14 +417,18 @@ async def create_task(
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: int,
+    response: Response,
+    expand: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Obtener una tarea por ID
     
     Args:
         task_id: ID de la tarea
+        response: Respuesta (lleva el ETag de la versión)
+        expand: Relaciones a embeber (category, tags)
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
@@ -119,20 +438,63 @@ async def get_task(
     Raises:
         HTTPException: Si la tarea no existe o no pertenece al usuario
     """
+    expansions = parse_expand(expand)
+    
     task = db.query(Task).filter(
         Task.id == task_id,
         Task.user_id == current_user.id
     ).first()
     
+    # Si no está en la tabla activa, puede estar archivada
+    if not task:
+        task = db.query(ArchivedTask).filter(
+            ArchivedTask.id == task_id,
+            ArchivedTask.user_id == current_user.id
+        ).first()
+    
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tarea no encontrada"
         )
     
+    set_etag(response, task)
+    if "category" in expansions:
+        task = embed_categories(db, [task], current_user.id)[0]
+    if "tags" in expansions:
+        task = embed_tags(db, [task], current_user.id)[0]
     return task
 
 
+# ==================================== 
+# ENDPOINT: PROGRESO DE UN SUBÁRBOL 
+# ====================================
+@router.get("/{task_id}/progress", response_model=SubtreeProgress)
+async def get_task_progress(
+    task_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Obtener el progreso de una tarea y todas sus subtareas
+    
+    Una consulta agregada por rango del índice (user_id, path), sea cual
+    sea la profundidad del árbol.
+    
+    Args:
+        task_id: ID de la tarea raíz
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        SubtreeProgress: Totales del subárbol
+        
+    Raises:
+        HTTPException: Si la tarea no existe o no pertenece al usuario
+    """
+    return subtasks.progress(db, find_task_row(db, task_id, current_user.id))
+
+
 # ============================ 
 # ENDPOINT: ACTUALIZAR TAREA 
 # ============================
@@ -140,15 +502,22 @@ async def get_task(
 async def update_task(
     task_id: int,
     task_update: TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Actualizar una tarea
     
+    Con If-Match solo se aplica si la tarea sigue en la versión leída. Una
+    tarea archivada se restaura a la tabla activa antes de actualizarla.
+    
     Args:
         task_id: ID de la tarea
         task_update: Datos a actualizar
+        response: Respuesta (lleva el ETag de la nueva versión)
+        if_match: ETag leído (cabecera If-Match)
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
@@ -156,13 +525,38 @@ async def update_task(
         TaskResponse: Tarea actualizada
         
     Raises:
-        HTTPException: Si la tarea no existe o no pertenece al usuario
+        HTTPException: Si la tarea no existe o no pertenece al usuario, si
+            queda recurrente sin fecha límite, si If-Match no coincide con la
+            versión actual (412), si otra escritura se cruzó (409) o si el
+            nuevo padre no es válido
     """
-    # Buscar tarea
+    update_data = task_update.model_dump(exclude_unset=True)
+    versions = parse_if_match(if_match)
+    
+    # Cambio de padre: se mueve el subárbol entero y el resto de campos
+    # se aplica después (la versión ya se comprobó al mover)
+    if "parent_id" in update_data:
+        move_to_parent(db, task_id, current_user.id, update_data.pop("parent_id"), versions)
+        versions = None
+        if not update_data:
+            db.commit()
+            row = select_owned(db, Task, task_id, current_user.id)
+            set_etag(response, row)
+            return row
+    
+    # Cambios de campos sin cambio de estado: un solo UPDATE acotado por propietario
+    if update_data and "is_completed" not in update_data:
+        row = update_task_fields(db, task_id, current_user.id, update_data, versions)
+        set_etag(response, row)
+        return row
+    
+    # Buscar tarea (si está archivada, se restaura)
     task = db.query(Task).filter(
         Task.id == task_id,
         Task.user_id == current_user.id
     ).first()
+    if not task and archive.restore_task(db, task_id, current_user.id):
+        task = db.get(Task, task_id)
     
     if not task:
         raise HTTPException(
@@ -170,53 +564,265 @@ async def update_task(
             detail="Tarea no encontrada"
         )
     
+    if versions is not None and task.version not in versions:
+        db.rollback()
+        raise precondition_failed(task.version)
+    
     # Actualizar campos proporcionados
-    update_data = task_update.model_dump(exclude_unset=True)
+    completing = update_data.pop("is_completed", None) is True and not task.is_completed
     
     for field, value in update_data.items():
         setattr(task, field, value)
     
-    # Si se marca como completada, registrar la fecha
-    if task_update.is_completed is not None:
-        if task_update.is_completed and not task.is_completed:
+    if task.recurrence and task.due_date is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Una tarea recurrente necesita fecha límite"
+        )
+    
+    # Completar una recurrente avanza a la siguiente ocurrencia
+    if completing and task.recurrence:
+        complete_occurrence(db, task)
+    elif task_update.is_completed is not None:
+        task.is_completed = task_update.is_completed
+        # Si se marca como completada, registrar la fecha
+        if task.is_completed and task.completed_at is None:
             task.completed_at = datetime.utcnow()
-        elif not task_update.is_completed and task.is_completed:
+        elif not task.is_completed:
             task.completed_at = None
     
-    db.commit()
+    commit_versioned(db, versions)
     db.refresh(task)
     
+    set_etag(response, task)
     return task
 
 
+def commit_versioned(db: Session, versions: Optional[set]) -> None:
+    """
+    Confirma una escritura del ORM sobre filas versionadas
+    
+    El ORM añade WHERE version = <leída> a sus UPDATE (version_id_col); si
+    otra petición cambió la fila entre la lectura y el commit, no se pisa.
+    
+    Args:
+        db: Sesión de base de datos
+        versions: Versiones aceptadas por If-Match (None si no se envió)
+        
+    Raises:
+        HTTPException: 412 si se envió If-Match; 409 si no
+    """
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        if versions is not None:
+            raise precondition_failed()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La tarea cambió mientras se actualizaba; vuelve a intentarlo"
+        )
+
+
+def update_task_fields(db: Session, task_id: int, user_id: int, values: dict, versions: Optional[set] = None):
+    """
+    Actualiza campos de una tarea (sin completarla) en una sola sentencia
+    
+    La regla "recurrente necesita fecha límite" y la versión de If-Match se
+    comprueban en el propio UPDATE; solo si no se actualiza ninguna fila se
+    relee la tarea para distinguir 404, 412 y 400.
+    
+    Args:
+        db: Sesión de base de datos
+        task_id: ID de la tarea
+        user_id: ID del propietario
+        values: Campos a actualizar
+        versions: Versiones aceptadas por If-Match (None si no se envió)
+        
+    Returns:
+        Row: Tarea actualizada
+        
+    Raises:
+        HTTPException: Si la tarea no existe, If-Match no coincide o queda
+            recurrente sin fecha límite
+    """
+    missing_due_date = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Una tarea recurrente necesita fecha límite"
+    )
+    conditions = []
+    if values.get("recurrence") and "due_date" not in values:
+        conditions.append(Task.due_date.isnot(None))
+    elif "due_date" in values and values["due_date"] is None:
+        if values.get("recurrence"):
+            raise missing_due_date
+        if "recurrence" not in values:
+            conditions.append(Task.recurrence.is_(None))
+    if versions is not None:
+        conditions.append(Task.version.in_(versions))
+    
+    values = {**values, "updated_at": datetime.utcnow()}
+    row = update_owned(db, Task, task_id, user_id, values, *conditions)
+    if row is None:
+        db.rollback()
+        # Si está archivada se restaura y se vuelve a intentar
+        if archive.restore_task(db, task_id, user_id):
+            row = update_owned(db, Task, task_id, user_id, values, *conditions)
+            if row is None:
+                db.rollback()
+    if row is None:
+        current = (
+            select_owned(db, Task, task_id, user_id) or select_owned(db, ArchivedTask, task_id, user_id)
+        ) if conditions else None
+        if current is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Tarea no encontrada"
+            )
+        if versions is not None and current.version not in versions:
+            raise precondition_failed(current.version)
+        raise missing_due_date
+    
+    db.commit()
+    return row
+
+
+def move_to_parent(db: Session, task_id: int, user_id: int, parent_id: Optional[int], versions: Optional[set] = None) -> None:
+    """
+    Cuelga una tarea (con sus subtareas) de otro padre, sin confirmar
+    
+    La tarea y el nuevo padre se leen bloqueados (FOR UPDATE) para que
+    ningún otro movimiento cambie sus rutas antes del UPDATE del subárbol.
+    
+    Args:
+        db: Sesión de base de datos
+        task_id: ID de la tarea
+        user_id: ID del propietario
+        parent_id: Nuevo padre (None = primer nivel)
+        versions: Versiones aceptadas por If-Match (None si no se envió)
+        
+    Raises:
+        HTTPException: Si la tarea no existe (404), If-Match no coincide
+            (412), o el padre no existe, está dentro del subárbol o deja
+            alguna subtarea por debajo del nivel máximo (400)
+    """
+    ids = [task_id] if parent_id is None else [task_id, parent_id]
+    rows = {
+        row.id: row for row in db.execute(
+            select(Task.id, Task.user_id, Task.parent_id, Task.path, Task.depth, Task.version)
+            .where(Task.user_id == user_id, Task.id.in_(ids))
+            .with_for_update()
+        )
+    }
+    task = rows.get(task_id)
+    if task is None and archive.restore_task(db, task_id, user_id):
+        return move_to_parent(db, task_id, user_id, parent_id, versions)
+    if task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tarea no encontrada"
+        )
+    if versions is not None and task.version not in versions:
+        raise precondition_failed(task.version)
+    
+    parent = rows.get(parent_id) if parent_id is not None else None
+    if parent_id is not None and parent is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tarea padre no encontrada"
+        )
+    if parent is not None and (parent.id == task.id or parent.path.startswith(subtasks.children_path(task))):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Una tarea no puede colgar de sí misma ni de una de sus subtareas"
+        )
+    if task.parent_id == parent_id:
+        return
+    
+    depth = parent.depth + 1 if parent is not None else 0
+    if depth > task.depth and depth + subtasks.subtree_height(db, task) > subtasks.TASK_MAX_DEPTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Las subtareas admiten como mucho {subtasks.TASK_MAX_DEPTH} niveles"
+        )
+    subtasks.move_subtree(db, task, parent)
+
+
+def find_task_row(db: Session, task_id: int, user_id: int):
+    """
+    Lee una tarea del usuario (activa o archivada) sin cargarla en el ORM
+    
+    Raises:
+        HTTPException: Si no existe o no pertenece al usuario
+    """
+    row = select_owned(db, Task, task_id, user_id) or select_owned(db, ArchivedTask, task_id, user_id)
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tarea no encontrada"
+        )
+    return row
+
+
 # ======================================== 
 # ENDPOINT: MARCAR TAREA COMO COMPLETADA 
 # ========================================
 @router.patch("/{task_id}/complete", response_model=TaskResponse)
 async def complete_task(
     task_id: int,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Marcar una tarea como completada
     
+    En una tarea recurrente se completa la ocurrencia actual: se devuelve
+    su copia completada y la tarea pasa a la siguiente fecha. El ETag es
+    el de la serie (el recurso de la URL), con su nueva versión.
+    
+    El caso habitual (tarea pendiente no recurrente) es un solo UPDATE
+    acotado por propietario; el resto se resuelve releyendo la tarea.
+    
     Args:
         task_id: ID de la tarea
+        response: Respuesta (lleva el ETag de la nueva versión)
+        if_match: ETag leído (cabecera If-Match)
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
     Returns:
-        TaskResponse: Tarea actualizada
+        TaskResponse: Tarea (u ocurrencia) completada
         
     Raises:
-        HTTPException: Si la tarea no existe o no pertenece al usuario
+        HTTPException: Si la tarea no existe o no pertenece al usuario, o si
+            If-Match no coincide con la versión actual (412)
     """
-    # Buscar tarea
+    versions = parse_if_match(if_match)
+    conditions = [Task.version.in_(versions)] if versions is not None else []
+    
+    now = datetime.utcnow()
+    row = update_owned(
+        db, Task, task_id, current_user.id,
+        {"is_completed": True, "completed_at": now, "updated_at": now},
+        Task.is_completed == False,
+        Task.recurrence.is_(None),
+        *conditions
+    )
+    if row is not None:
+        rollups.record_completion(db, row)
+        db.commit()
+        set_etag(response, row)
+        return row
+    
+    # Ya completada, recurrente, inexistente o con otra versión; una
+    # archivada ya está completada y se devuelve tal cual
     task = db.query(Task).filter(
         Task.id == task_id,
         Task.user_id == current_user.id
-    ).first()
+    ).first() or select_owned(db, ArchivedTask, task_id, current_user.id)
     
     if not task:
         raise HTTPException(
@@ -224,13 +830,17 @@ async def complete_task(
             detail="Tarea no encontrada"
         )
     
-    # Marcar como completada
-    task.is_completed = True
-    task.completed_at = datetime.utcnow()
+    if versions is not None and task.version not in versions:
+        raise precondition_failed(task.version)
     
-    db.commit()
-    db.refresh(task)
+    if task.recurrence and not task.is_completed:
+        completed = complete_occurrence(db, task)
+        commit_versioned(db, versions)
+        db.refresh(completed)
+        set_etag(response, task)
+        return completed
     
+    set_etag(response, task)
     return task
 
 
@@ -240,14 +850,20 @@ async def complete_task(
 @router.patch("/{task_id}/incomplete", response_model=TaskResponse)
 async def incomplete_task(
     task_id: int,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Marcar una tarea como pendiente (no completada)
     
+    Una tarea archivada vuelve a la tabla activa como pendiente.
+    
     Args:
         task_id: ID de la tarea
+        response: Respuesta (lleva el ETag de la nueva versión)
+        if_match: ETag leído (cabecera If-Match)
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
@@ -255,30 +871,183 @@ async def incomplete_task(
         TaskResponse: Tarea actualizada
         
     Raises:
-        HTTPException: Si la tarea no existe o no pertenece al usuario
+        HTTPException: Si la tarea no existe o no pertenece al usuario, o si
+            If-Match no coincide con la versión actual (412)
     """
-    # Buscar tarea
-    task = db.query(Task).filter(
-        Task.id == task_id,
-        Task.user_id == current_user.id
-    ).first()
+    versions = parse_if_match(if_match)
     
-    if not task:
+    # La fila anterior hace falta para revertir la finalización en los agregados
+    task = select_owned(db, Task, task_id, current_user.id)
+    if task is None and archive.restore_task(db, task_id, current_user.id):
+        task = select_owned(db, Task, task_id, current_user.id)
+    
+    if task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tarea no encontrada"
         )
     
-    # Marcar como pendiente
-    task.is_completed = False
-    task.completed_at = None
+    if versions is not None and task.version not in versions:
+        db.rollback()
+        raise precondition_failed(task.version)
     
-    db.commit()
-    db.refresh(task)
+    if task.is_completed:
+        # Marcar como pendiente solo si la fila sigue siendo la leída
+        values = {"is_completed": False, "completed_at": None, "updated_at": datetime.utcnow()}
+        if update_owned(db, Task, task_id, current_user.id, values, Task.version == task.version, returning=False):
+            rollups.record_completion(db, task, sign=-1)
+            db.commit()
+            task = {**task._mapping, **values, "version": task.version + 1}
+        else:
+            # Otra escritura se cruzó: con If-Match es un 412; sin él, se devuelve el estado actual
+            db.rollback()
+            task = select_owned(db, Task, task_id, current_user.id)
+            if task is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Tarea no encontrada"
+                )
+            if versions is not None:
+                raise precondition_failed(task.version)
     
+    set_etag(response, task)
     return task
 
 
+# ========================== 
+# ENDPOINT: MOVER TAREA 
+# ==========================
+@router.patch("/{task_id}/move", response_model=TaskResponse)
+async def move_task(
+    task_id: int,
+    move: TaskMove,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Mover una tarea en el orden manual (sort=position)
+    
+    La tarea recibe una clave entre las de sus nuevas vecinas, así que
+    solo se escribe su fila. Si la clave resultante es demasiado larga se
+    encola un reequilibrado de las claves del usuario. Una tarea archivada
+    se restaura a la tabla activa en la nueva posición.
+    
+    Args:
+        task_id: ID de la tarea
+        move: Vecinas de la nueva posición
+        response: Respuesta (lleva el ETag de la nueva versión)
+        if_match: ETag leído (cabecera If-Match)
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        TaskResponse: Tarea movida
+        
+    Raises:
+        HTTPException: Si la tarea o una vecina no existe (404), si las
+            vecinas no son válidas o no están en ese orden (400), si
+            If-Match no coincide con la versión actual (412) o si las
+            vecinas siguen sin clave tras reequilibrar (409)
+    """
+    if task_id in (move.after_id, move.before_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Una tarea no puede ser su propia vecina"
+        )
+    
+    position = target_position(db, current_user.id, task_id, move)
+    if position is None:
+        # Vecinas empatadas o sin clave (inserciones concurrentes): se
+        # reequilibra el usuario una vez y se vuelve a calcular
+        positions.rebalance_user(db, current_user.id)
+        position = target_position(db, current_user.id, task_id, move)
+    if position is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El orden cambió mientras se movía la tarea; vuelve a intentarlo"
+        )
+    
+    versions = parse_if_match(if_match)
+    conditions = [Task.version.in_(versions)] if versions is not None else []
+    values = {"position": position, "updated_at": datetime.utcnow()}
+    row = update_owned(db, Task, task_id, current_user.id, values, *conditions)
+    if row is None:
+        db.rollback()
+        if archive.restore_task(db, task_id, current_user.id):
+            row = update_owned(db, Task, task_id, current_user.id, values, *conditions)
+            if row is None:
+                db.rollback()
+    if row is None:
+        current = (
+            select_owned(db, Task, task_id, current_user.id)
+            or select_owned(db, ArchivedTask, task_id, current_user.id)
+        ) if conditions else None
+        if current is not None:
+            raise precondition_failed(current.version)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tarea no encontrada"
+        )
+    db.commit()
+    
+    if positions.needs_rebalance(position):
+        positions.request_rebalance(current_user.id)
+    
+    set_etag(response, row)
+    return row
+
+
+def target_position(db: Session, user_id: int, task_id: int, move: TaskMove) -> Optional[str]:
+    """
+    Clave de posición para colocar una tarea entre las vecinas indicadas
+    
+    Args:
+        db: Sesión de base de datos
+        user_id: ID del propietario
+        task_id: ID de la tarea que se mueve
+        move: Vecinas de la nueva posición
+        
+    Returns:
+        str: Nueva clave, o None si las vecinas están empatadas o sin clave
+        
+    Raises:
+        HTTPException: Si una vecina no existe o no están en ese orden
+    """
+    # Claves de las vecinas indicadas (una sola lectura por clave primaria)
+    neighbour_ids = [row_id for row_id in (move.after_id, move.before_id) if row_id is not None]
+    found = dict(db.query(Task.id, Task.position).filter(
+        Task.id.in_(neighbour_ids),
+        Task.user_id == user_id
+    ).all())
+    if len(found) < len(neighbour_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tarea vecina no encontrada"
+        )
+    if None in found.values():
+        return None
+    
+    # La vecina que falta es la adyacente en el orden actual
+    after = found.get(move.after_id)
+    before = found.get(move.before_id)
+    if move.before_id is None:
+        before = positions.neighbour_position(db, user_id, after, task_id, following=True)
+    elif move.after_id is None:
+        after = positions.neighbour_position(db, user_id, before, task_id, following=False)
+    
+    if after is not None and after == before:
+        return None
+    try:
+        return positions.key_between(after, before)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_id debe ir antes que before_id en el orden actual"
+        )
+
+
 # ========================== 
 # ENDPOINT: ELIMINAR TAREA 
 # ==========================
@@ -286,10 +1055,10 @@ async def incomplete_task(
 async def delete_task(
     task_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
-    Eliminar una tarea
+    Eliminar una tarea (activa o archivada) junto con todas sus subtareas
     
     Args:
         task_id: ID de la tarea
@@ -302,19 +1071,28 @@ async def delete_task(
     Raises:
         HTTPException: Si la tarea no existe o no pertenece al usuario
     """
-    # Buscar tarea
-    task = db.query(Task).filter(
-        Task.id == task_id,
-        Task.user_id == current_user.id
-    ).first()
-    
-    if not task:
+    model = Task
+    task = select_owned(db, Task, task_id, current_user.id)
+    if task is None:
+        model = ArchivedTask
+        task = select_owned(db, ArchivedTask, task_id, current_user.id)
+    if task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tarea no encontrada"
         )
     
-    db.delete(task)
+    # Sus etiquetas (y las de sus descendientes, activos o archivados) dejan
+    # de contarlas y sus recordatorios se borran con ellas. Una hoja sin
+    # fecha límite no tiene recordatorios pendientes (los de una fecha ya
+    # quitada los borra prune_reminders) y solo se borra su fila
+    subtree_ids = db.execute(subtasks.descendant_ids(task)).scalars().all()
+    task_ids = [task.id, *subtree_ids]
+    task_tags.forget_tasks(db, TaskTag.task_id.in_(task_ids))
+    if subtree_ids or task.due_date is not None:
+        reminders.forget_tasks(db, TaskReminder.task_id.in_(task_ids))
+    subtasks.delete_subtree(db, task, model, descendants=bool(subtree_ids))
+    
     db.commit()
     
     return None
@@ -325,54 +1103,65 @@ async def delete_task(
 # ================================
 @router.get("/stats/summary", response_model=dict)
 async def get_task_stats(
+    subtree_of: Optional[int] = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_shard_db)
 ):
     """
     Obtener estadísticas de las tareas del usuario
     
     Args:
+        subtree_of: Limitar a las subtareas (a cualquier nivel) de esta tarea
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
     Returns:
         dict: Estadísticas de tareas (total, completadas, pendientes, por prioridad)
+        
+    Raises:
+        HTTPException: Si la tarea de subtree_of no existe
     """
+    root = find_task_row(db, subtree_of, current_user.id) if subtree_of is not None else None
+    
+    def scoped(model):
+        """Query de las tareas del usuario (o de las subtareas pedidas)"""
+        if root is not None:
+            return db.query(model).filter(subtasks.descendants_filter(model, root))
+        return db.query(model).filter(model.user_id == current_user.id)
+    
+    # Tareas archivadas (todas completadas)
+    archived_tasks = scoped(ArchivedTask).count()
+    
     # Total de tareas
-    total_tasks = db.query(Task).filter(Task.user_id == current_user.id).count()
+    total_tasks = scoped(Task).count() + archived_tasks
     
     # Tareas completadas
-    completed_tasks = db.query(Task).filter(
-        Task.user_id == current_user.id,
+    completed_tasks = scoped(Task).filter(
         Task.is_completed == True
-    ).count()
+    ).count() + archived_tasks
     
     # Tareas pendientes
     pending_tasks = total_tasks - completed_tasks
     
     # Tareas por prioridad
-    high_priority = db.query(Task).filter(
-        Task.user_id == current_user.id,
+    high_priority = scoped(Task).filter(
         Task.priority == "high",
         Task.is_completed == False
     ).count()
     
-    medium_priority = db.query(Task).filter(
-        Task.user_id == current_user.id,
+    medium_priority = scoped(Task).filter(
         Task.priority == "medium",
         Task.is_completed == False
     ).count()
     
-    low_priority = db.query(Task).filter(
-        Task.user_id == current_user.id,
+    low_priority = scoped(Task).filter(
         Task.priority == "low",
         Task.is_completed == False
     ).count()
     
     # Tareas vencidas (fecha límite pasada y no completadas)
     today = date.today()
-    overdue_tasks = db.query(Task).filter(
-        Task.user_id == current_user.id,
+    overdue_tasks = scoped(Task).filter(
         Task.is_completed == False,
         Task.due_date < today
     ).count()
@@ -387,4 +1176,55 @@ async def get_task_stats(
             "medium": medium_priority,
             "low": low_priority
         }
-    }
\ No newline at end of file
+    }
+
+
+# ============================================ 
+# ENDPOINT: SERIE TEMPORAL DE PRODUCTIVIDAD 
+# ============================================
+@router.get("/stats/timeseries", response_model=TimeseriesResponse)
+async def get_task_timeseries(
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category_id: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Obtener la serie temporal de tareas creadas y completadas
+    
+    Se lee de los agregados diarios (ver rollups.py), no de la tabla de
+    tareas, así que el coste depende de los días del rango.
+    
+    Args:
+        granularity: Agrupación de los periodos (day, week o month)
+        start: Primer día (por defecto según la granularidad: 30 días, 12 semanas o un año)
+        end: Último día (por defecto hoy)
+        category_id: Limitar a una categoría (0 = sin categoría)
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+        
+    Returns:
+        TimeseriesResponse: Periodos con tareas creadas, completadas, tiempo medio
+            hasta completarse y desglose por categoría
+        
+    Raises:
+        HTTPException: Si el rango está invertido o supera TIMESERIES_MAX_DAYS días
+    """
+    end = end or date.today()
+    if start is None:
+        start = rollups.period_start(end - timedelta(days=rollups.GRANULARITIES[granularity] - 1), granularity)
+    
+    if end < start or (end - start).days >= rollups.TIMESERIES_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango debe ir de start a end y abarcar como mucho {rollups.TIMESERIES_MAX_DAYS} días"
+        )
+    
+    return {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "points": rollups.timeseries(db, current_user.id, start, end, granularity, category_id),
+    }
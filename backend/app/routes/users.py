@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
+import secrets
 
 from database import get_db
 from models.user import User
+from models.account_deletion import AccountDeletion
 from schemas.user import UserResponse, UserUpdate
+from schemas.account_deletion import AccountDeletionResponse
+from jobs import job_runner
 from auth import get_current_active_user, get_password_hash
 
 # Crear router para las rutas de usuarios
@@ -95,7 +99,7 @@ async def update_current_user(
 # ================================== 
 # ENDPOINT: ELIMINAR USUARIO ACTUAL 
 # ==================================
-@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/me", response_model=AccountDeletionResponse, status_code=status.HTTP_202_ACCEPTED)
 async def delete_current_user(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -103,14 +107,64 @@ async def delete_current_user(
     """
     Eliminar la cuenta del usuario actual
     
+    La cuenta se desactiva al instante y sus datos se purgan en segundo
+    plano; el token devuelto permite consultar el progreso
+    
     Args:
         current_user: Usuario autenticado
         db: Sesión de base de datos
         
     Returns:
-        None
+        AccountDeletionResponse: Borrado registrado
     """
-    db.delete(current_user)
+    current_user.is_active = False
+    deletion = AccountDeletion(
+        user_id=current_user.id,
+        token=secrets.token_urlsafe(32),
+        status="pending"
+    )
+    
+    db.add(deletion)
+    db.flush()
+    
+    # El trabajo se encola en la misma transacción que la desactivación
+    job_runner.enqueue("purge_account", {"deletion_id": deletion.id}, db=db)
     db.commit()
+    db.refresh(deletion)
+    
+    return deletion
+
+
+# ======================================= 
+# ENDPOINT: PROGRESO DEL BORRADO 
+# =======================================
+@router.get("/deletions/{token}", response_model=AccountDeletionResponse)
+async def get_account_deletion(
+    token: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Consultar el progreso del borrado de una cuenta
+    
+    No requiere autenticación (la cuenta ya está desactivada): el token
+    aleatorio devuelto por DELETE /users/me es la credencial
+    
+    Args:
+        token: Token del borrado
+        db: Sesión de base de datos
+        
+    Returns:
+        AccountDeletionResponse: Progreso del borrado
+        
+    Raises:
+        HTTPException: Si el token no existe
+    """
+    deletion = db.query(AccountDeletion).filter(AccountDeletion.token == token).first()
+    
+    if not deletion:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Borrado no encontrado"
+        )
     
-    return None
\ No newline at end of file
+    return deletion
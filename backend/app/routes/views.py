@@ -0,0 +1,271 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+import json
+
+from sharding import get_shard_db
+from models.user import User
+from models.saved_view import SavedView
+from schemas.view import ViewCreate, ViewUpdate, ViewResponse
+from schemas.task import TaskResponse
+from auth import get_current_active_user
+from mutations import select_owned, update_owned, delete_owned
+from etags import set_etag, parse_if_match, precondition_failed
+from views import run_view, view_result_cache
+
+# Crear router para las rutas de vistas guardadas
+router = APIRouter(
+    prefix="/views",
+    tags=["Vistas"]
+)
+
+
+def view_not_found() -> HTTPException:
+    """Error 404 de una vista que no existe o no es del usuario"""
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Vista no encontrada"
+    )
+
+
+def duplicate_name() -> HTTPException:
+    """Error 400 de un nombre de vista ya usado"""
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Ya existe una vista con ese nombre"
+    )
+
+
+# ==================================== 
+# ENDPOINT: OBTENER TODAS LAS VISTAS 
+# ====================================
+@router.get("/", response_model=List[ViewResponse])
+async def get_views(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Obtener las vistas guardadas del usuario
+
+    Args:
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+
+    Returns:
+        List[ViewResponse]: Vistas ordenadas por nombre
+    """
+    return db.query(SavedView).filter(SavedView.user_id == current_user.id).order_by(SavedView.name).all()
+
+
+# ======================= 
+# ENDPOINT: CREAR VISTA 
+# =======================
+@router.post("/", response_model=ViewResponse, status_code=status.HTTP_201_CREATED)
+async def create_view(
+    view: ViewCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Guardar un filtro de tareas como vista
+
+    Args:
+        view: Nombre y filtro de la vista
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+
+    Returns:
+        ViewResponse: Vista creada
+
+    Raises:
+        HTTPException: Si ya existe una vista con ese nombre
+    """
+    db_view = SavedView(
+        name=view.name,
+        filters=json.dumps(view.filters.model_dump(mode="json"), sort_keys=True),
+        user_id=current_user.id
+    )
+    db.add(db_view)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise duplicate_name()
+    db.refresh(db_view)
+
+    return db_view
+
+
+# ================================ 
+# ENDPOINT: OBTENER VISTA POR ID 
+# ================================
+@router.get("/{view_id}", response_model=ViewResponse)
+async def get_view(
+    view_id: int,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Obtener una vista guardada por ID
+
+    Args:
+        view_id: ID de la vista
+        response: Respuesta (lleva el ETag de la versión)
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+
+    Returns:
+        ViewResponse: Vista encontrada
+
+    Raises:
+        HTTPException: Si la vista no existe o no pertenece al usuario
+    """
+    view = select_owned(db, SavedView, view_id, current_user.id)
+    if view is None:
+        raise view_not_found()
+
+    set_etag(response, view)
+    return view
+
+
+# ============================ 
+# ENDPOINT: ACTUALIZAR VISTA 
+# ============================
+@router.put("/{view_id}", response_model=ViewResponse)
+async def update_view(
+    view_id: int,
+    view_update: ViewUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Renombrar una vista o cambiar su filtro
+
+    Con If-Match solo se aplica si la vista sigue en la versión leída.
+
+    Args:
+        view_id: ID de la vista
+        view_update: Datos a actualizar
+        response: Respuesta (lleva el ETag de la nueva versión)
+        if_match: ETag leído (cabecera If-Match)
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+
+    Returns:
+        ViewResponse: Vista actualizada
+
+    Raises:
+        HTTPException: Si la vista no existe, el nombre ya está en uso o
+            If-Match no coincide con la versión actual (412)
+    """
+    versions = parse_if_match(if_match)
+    conditions = [SavedView.version.in_(versions)] if versions is not None else []
+    values = {"updated_at": datetime.utcnow()}
+    if view_update.name is not None:
+        values["name"] = view_update.name
+    if view_update.filters is not None:
+        values["filters"] = json.dumps(view_update.filters.model_dump(mode="json"), sort_keys=True)
+
+    try:
+        view = update_owned(db, SavedView, view_id, current_user.id, values, *conditions)
+    except IntegrityError:
+        db.rollback()
+        raise duplicate_name()
+
+    if view is None:
+        db.rollback()
+        # Si existe, el UPDATE no aplicó porque la versión ya no es la leída
+        if conditions:
+            current = select_owned(db, SavedView, view_id, current_user.id)
+            if current is not None:
+                raise precondition_failed(current.version)
+        raise view_not_found()
+
+    db.commit()
+
+    set_etag(response, view)
+    return view
+
+
+# ========================== 
+# ENDPOINT: ELIMINAR VISTA 
+# ==========================
+@router.delete("/{view_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_view(
+    view_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Eliminar una vista guardada (sus tareas no se tocan)
+
+    Args:
+        view_id: ID de la vista
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+
+    Returns:
+        None
+
+    Raises:
+        HTTPException: Si la vista no existe o no pertenece al usuario
+    """
+    if not delete_owned(db, SavedView, view_id, current_user.id):
+        raise view_not_found()
+
+    db.commit()
+
+    return None
+
+
+# =============================== 
+# ENDPOINT: TAREAS DE UNA VISTA 
+# ===============================
+@router.get("/{view_id}/tasks", response_model=List[TaskResponse])
+async def get_view_tasks(
+    view_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    fresh: bool = False,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_shard_db)
+):
+    """
+    Ejecutar una vista guardada
+
+    La consulta es la sentencia ya compilada de la vista (ver views.py);
+    con VIEW_RESULT_CACHE_SECONDS > 0 el resultado se reutiliza durante
+    ese tiempo.
+
+    Args:
+        view_id: ID de la vista
+        skip: Número de registros a saltar (paginación)
+        limit: Número máximo de registros a retornar
+        fresh: Ignorar la caché de resultados y volver a consultar
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+
+    Returns:
+        List[TaskResponse]: Tareas que cumplen el filtro de la vista
+
+    Raises:
+        HTTPException: Si la vista no existe o no pertenece al usuario
+    """
+    view = select_owned(db, SavedView, view_id, current_user.id)
+    if view is None:
+        raise view_not_found()
+
+    key = (current_user.id, view.id, view.version, skip, limit)
+    if view_result_cache.enabled and not fresh:
+        cached = view_result_cache.get(key)
+        if cached is not None:
+            return cached
+
+    tasks = [TaskResponse.model_validate(task) for task in run_view(db, view, current_user.id, skip, limit)]
+    view_result_cache.put(key, tasks)
+    return tasks
@@ -3,9 +3,13 @@ Módulo de schemas de Pydantic
 Importa todos los schemas para facilitar su uso
 """
 from .user import UserBase, UserCreate, UserUpdate, UserResponse
-from .category import CategoryBase, CategoryCreate, CategoryUpdate, CategoryResponse
-from .task import TaskBase, TaskCreate, TaskUpdate, TaskResponse
+from .category import CategoryBase, CategoryCreate, CategoryUpdate, CategoryTaskCounts, CategoryResponse, CategoryWithCountsResponse
+from .task import TaskBase, TaskCreate, TaskUpdate, TaskMove, CategorySummary, TaskResponse, SubtreeProgress, TaskSummary, CalendarDay, CalendarResponse
 from .auth import Token, TokenData, LoginRequest
+from .account_deletion import AccountDeletionResponse
+from .stats import CategoryThroughput, TimeseriesPoint, TimeseriesResponse
+from .tag import TagCreate, TagUpdate, TagResponse, TagAssignment, TagAssignmentResult
+from .view import ViewFilters, ViewCreate, ViewUpdate, ViewResponse
 
 # Exportar todos los schemas
 __all__ = [
@@ -18,14 +22,39 @@ __all__ = [
     "CategoryBase",
     "CategoryCreate",
     "CategoryUpdate",
+    "CategoryTaskCounts",
     "CategoryResponse",
+    "CategoryWithCountsResponse",
     # Task schemas
     "TaskBase",
     "TaskCreate",
     "TaskUpdate",
+    "TaskMove",
+    "CategorySummary",
     "TaskResponse",
+    "SubtreeProgress",
+    "TaskSummary",
+    "CalendarDay",
+    "CalendarResponse",
     # Auth schemas
     "Token",
     "TokenData",
     "LoginRequest",
+    # Account deletion schemas
+    "AccountDeletionResponse",
+    # Stats schemas
+    "CategoryThroughput",
+    "TimeseriesPoint",
+    "TimeseriesResponse",
+    # Tag schemas
+    "TagCreate",
+    "TagUpdate",
+    "TagResponse",
+    "TagAssignment",
+    "TagAssignmentResult",
+    # Saved view schemas
+    "ViewFilters",
+    "ViewCreate",
+    "ViewUpdate",
+    "ViewResponse",
 ]
\ No newline at end of file
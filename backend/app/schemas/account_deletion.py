@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class AccountDeletionResponse(BaseModel):
+    """
+    Schema para el progreso del borrado de una cuenta
+    """
+    token: str
+    status: str
+    tasks_deleted: int
+    categories_deleted: int
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        """Configuración para que Pydantic trabaje con modelos de SQLAlchemy"""
+        from_attributes = True
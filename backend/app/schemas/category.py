@@ -27,6 +27,15 @@ class CategoryUpdate(BaseModel):
     color: Optional[str] = Field(None, pattern="^#[0-9A-Fa-f]{6}$")
 
 
+class CategoryTaskCounts(BaseModel):
+    """
+    Contadores de tareas de una categoría
+    """
+    total: int
+    pending: int
+    overdue: int
+
+
 class CategoryResponse(CategoryBase):
     """
     Schema para la respuesta de categoría
@@ -34,7 +43,19 @@ class CategoryResponse(CategoryBase):
     id: int
     user_id: int
     created_at: datetime
+    version: int = Field(
+        1,
+        description="Versión de la fila; se envía como ETag y se compara con If-Match"
+    )
 
     class Config:
         """Configuración para que Pydantic trabaje con modelos de SQLAlchemy"""
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class CategoryWithCountsResponse(CategoryResponse):
+    """
+    Schema para la respuesta de categoría con sus contadores de tareas
+    (GET /categories con include_counts=true)
+    """
+    task_counts: CategoryTaskCounts
\ No newline at end of file
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Optional
+
+
+class CategoryThroughput(BaseModel):
+    """
+    Tareas creadas y completadas de una categoría en un periodo
+    """
+    category_id: Optional[int] = None
+    created: int
+    completed: int
+
+
+class TimeseriesPoint(BaseModel):
+    """
+    Totales de un periodo de la serie
+    """
+    period: date
+    created: int
+    completed: int
+    avg_completion_hours: Optional[float] = None
+    by_category: List[CategoryThroughput]
+
+
+class TimeseriesResponse(BaseModel):
+    """
+    Schema para la respuesta de la serie temporal (solo periodos con datos)
+    """
+    granularity: str
+    start: date
+    end: date
+    points: List[TimeseriesPoint]
@@ -0,0 +1,82 @@
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime
+from typing import List, Optional
+from tags import normalize, TAGS_MAX_PER_REQUEST
+
+
+def check_tag_name(value: str) -> str:
+    """Normaliza un nombre de etiqueta y rechaza los que no sirven en un filtro"""
+    value = normalize(value)
+    if not value:
+        raise ValueError("El nombre de la etiqueta no puede estar vacío")
+    if "," in value:
+        raise ValueError("El nombre de la etiqueta no puede contener comas")
+    return value
+
+
+def check_tag_names(values: List[str]) -> List[str]:
+    """Normaliza una lista de nombres de etiqueta y quita repetidos"""
+    names = []
+    for name in values:
+        name = check_tag_name(name)
+        if len(name) > 50:
+            raise ValueError("El nombre de la etiqueta admite como mucho 50 caracteres")
+        if name not in names:
+            names.append(name)
+    return names
+
+
+class TagCreate(BaseModel):
+    """
+    Schema para crear una etiqueta
+    """
+    name: str = Field(..., min_length=1, max_length=50, description="Nombre (se guarda en minúsculas)")
+
+    @field_validator("name")
+    @classmethod
+    def check_name(cls, value):
+        """Normaliza el nombre"""
+        return check_tag_name(value)
+
+
+class TagUpdate(TagCreate):
+    """
+    Schema para renombrar una etiqueta
+    """
+    pass
+
+
+class TagResponse(BaseModel):
+    """
+    Schema para la respuesta de etiqueta
+    """
+    id: int
+    name: str
+    task_count: int = Field(..., description="Tareas con esta etiqueta")
+    created_at: Optional[datetime] = None
+
+    class Config:
+        """Configuración para que Pydantic trabaje con modelos de SQLAlchemy"""
+        from_attributes = True
+
+
+class TagAssignment(BaseModel):
+    """
+    Schema para etiquetar o desetiquetar tareas en bloque
+    """
+    task_ids: List[int] = Field(..., min_length=1, max_length=1000, description="IDs de las tareas")
+    tags: List[str] = Field(..., min_length=1, max_length=TAGS_MAX_PER_REQUEST, description="Nombres de las etiquetas")
+
+    @field_validator("tags")
+    @classmethod
+    def check_tags(cls, value):
+        """Normaliza los nombres y quita repetidos"""
+        return check_tag_names(value)
+
+
+class TagAssignmentResult(BaseModel):
+    """
+    Resultado de una operación en bloque
+    """
+    changed: int = Field(..., description="Pares etiqueta-tarea añadidos o quitados")
+    tags: List[TagResponse]
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
+from sqlalchemy import inspect
 from datetime import datetime, date
-from typing import Optional
+from typing import List, Optional
 from models.task import PriorityEnum
+from recurrence import validate_rule
 
 
 class TaskBase(BaseModel):
@@ -13,6 +15,18 @@ class TaskBase(BaseModel):
     priority: PriorityEnum = Field(default=PriorityEnum.medium, description="Nivel de prioridad")
     due_date: Optional[date] = Field(None, description="Fecha límite")
     category_id: Optional[int] = Field(None, description="ID de la categoría")
+    parent_id: Optional[int] = Field(None, description="ID de la tarea padre (subtarea)")
+    recurrence: Optional[str] = Field(
+        None,
+        max_length=200,
+        description="Regla de recurrencia (ej: FREQ=WEEKLY;BYDAY=MO,WE o daily); requiere due_date"
+    )
+
+    @field_validator("recurrence")
+    @classmethod
+    def check_recurrence(cls, value):
+        """Valida y normaliza la regla de recurrencia"""
+        return validate_rule(value)
 
 
 class TaskCreate(TaskBase):
@@ -33,6 +47,45 @@ class TaskUpdate(BaseModel):
     due_date: Optional[date] = None
     category_id: Optional[int] = None
     is_completed: Optional[bool] = None
+    parent_id: Optional[int] = Field(None, description="Nuevo padre (null = primer nivel); mueve todo el subárbol")
+    recurrence: Optional[str] = Field(None, max_length=200)
+
+    @field_validator("recurrence")
+    @classmethod
+    def check_recurrence(cls, value):
+        """Valida y normaliza la regla de recurrencia"""
+        return validate_rule(value)
+
+
+class TaskMove(BaseModel):
+    """
+    Schema para mover una tarea en el orden manual
+
+    Basta con una de las dos vecinas; la otra se deduce del orden actual
+    (para llevarla al principio se indica before_id con la primera tarea).
+    """
+    after_id: Optional[int] = Field(None, description="Tarea que quedará justo antes")
+    before_id: Optional[int] = Field(None, description="Tarea que quedará justo después")
+
+    @model_validator(mode="after")
+    def check_neighbours(self):
+        """Exige al menos una vecina"""
+        if self.after_id is None and self.before_id is None:
+            raise ValueError("Indica after_id, before_id o ambos")
+        return self
+
+
+class CategorySummary(BaseModel):
+    """
+    Categoría embebida en las tareas (expand=category)
+    """
+    id: int
+    name: str
+    color: str
+
+    class Config:
+        """Configuración para que Pydantic trabaje con modelos de SQLAlchemy"""
+        from_attributes = True
 
 
 class TaskResponse(TaskBase):
@@ -45,7 +98,80 @@ class TaskResponse(TaskBase):
     created_at: datetime
     updated_at: datetime
     completed_at: Optional[datetime] = None
+    version: int = Field(
+        1,
+        description="Versión de la fila; se envía como ETag y se compara con If-Match"
+    )
+    position: Optional[str] = Field(None, description="Clave de orden manual (sort=position)")
+    depth: int = Field(0, description="Nivel en el árbol de subtareas (0 = primer nivel)")
+    is_occurrence: bool = Field(
+        default=False,
+        description="Ocurrencia futura generada al vuelo (comparte id con la tarea recurrente)"
+    )
+    category: Optional[CategorySummary] = Field(
+        None,
+        description="Categoría completa (solo con expand=category)"
+    )
+    tags: Optional[List[str]] = Field(
+        None,
+        description="Nombres de sus etiquetas (solo con expand=tags)"
+    )
+
+    @model_validator(mode="before")
+    @classmethod
+    def columns_only(cls, data):
+        """
+        Lee solo las columnas de los modelos de SQLAlchemy, de modo que
+        validar una tarea nunca dispara la carga perezosa de su categoría
+        """
+        state = inspect(data, raiseerr=False)
+        if state is None or not hasattr(state, "mapper"):
+            return data
+        return {attr.key: getattr(data, attr.key) for attr in state.mapper.column_attrs}
 
     class Config:
         """Configuración para que Pydantic trabaje con modelos de SQLAlchemy"""
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class SubtreeProgress(BaseModel):
+    """
+    Progreso de una tarea y todas sus subtareas
+    """
+    task_id: int
+    total: int
+    completed: int
+    pending: int
+    overdue: int
+    progress: float = Field(..., description="Porcentaje completado del subárbol")
+
+
+class TaskSummary(BaseModel):
+    """
+    Resumen de tarea para las vistas de calendario
+    """
+    id: int
+    title: str
+    priority: PriorityEnum
+    is_completed: bool
+    category_id: Optional[int] = None
+    is_occurrence: bool = False
+
+
+class CalendarDay(BaseModel):
+    """
+    Tareas que vencen un día concreto
+    """
+    date: date
+    count: int
+    completed: int
+    tasks: List[TaskSummary]
+
+
+class CalendarResponse(BaseModel):
+    """
+    Schema para la respuesta del calendario (solo días con tareas)
+    """
+    start: date
+    end: date
+    total: int
+    days: List[CalendarDay]
@@ -0,0 +1,80 @@
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime
+from typing import List, Optional
+import json
+from models.task import PriorityEnum
+from schemas.tag import check_tag_names
+from tags import TAGS_MAX_PER_REQUEST
+
+
+class ViewFilters(BaseModel):
+    """
+    Definición del filtro de una vista guardada
+
+    Los filtros que se dejan en null no se aplican.
+    """
+    is_completed: Optional[bool] = Field(None, description="Estado de las tareas")
+    priorities: Optional[List[PriorityEnum]] = Field(None, min_length=1, description="Alguna de estas prioridades")
+    category_ids: Optional[List[int]] = Field(None, min_length=1, max_length=100, description="Alguna de estas categorías")
+    due_within_days: Optional[int] = Field(
+        None,
+        ge=0,
+        le=366,
+        description="Vencen en los próximos N días (incluidas las ya vencidas)"
+    )
+    tags: Optional[List[str]] = Field(None, min_length=1, max_length=TAGS_MAX_PER_REQUEST, description="Etiquetas")
+    match: str = Field("any", pattern="^(all|any)$", description="Con tags, exigir todas (all) o alguna (any)")
+    sort: str = Field(
+        "created_at",
+        pattern="^(created_at|position|due_date)$",
+        description="Orden: created_at (más recientes primero), position (orden manual) o due_date"
+    )
+
+    @field_validator("tags")
+    @classmethod
+    def check_tags(cls, value):
+        """Normaliza los nombres y quita repetidos"""
+        return check_tag_names(value) if value is not None else None
+
+
+class ViewCreate(BaseModel):
+    """
+    Schema para crear una vista guardada
+    """
+    name: str = Field(..., min_length=1, max_length=100, description="Nombre de la vista")
+    filters: ViewFilters
+
+
+class ViewUpdate(BaseModel):
+    """
+    Schema para actualizar una vista guardada
+    Todos los campos son opcionales
+    """
+    name: Optional[str] = Field(None, min_length=1, max_length=100)
+    filters: Optional[ViewFilters] = None
+
+
+class ViewResponse(BaseModel):
+    """
+    Schema para la respuesta de vista guardada
+    """
+    id: int
+    name: str
+    filters: ViewFilters
+    user_id: int
+    created_at: datetime
+    updated_at: datetime
+    version: int = Field(
+        1,
+        description="Versión de la fila; se envía como ETag y se compara con If-Match"
+    )
+
+    @field_validator("filters", mode="before")
+    @classmethod
+    def parse_filters(cls, value):
+        """La columna guarda el filtro en JSON"""
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        """Configuración para que Pydantic trabaje con modelos de SQLAlchemy"""
+        from_attributes = True
@@ -0,0 +1,249 @@
+"""
+Enrutado de datos por usuario entre varios shards
+
+Las tablas de tareas y categorías están siempre filtradas por user_id,
+así que cada usuario vive entero en un único shard. El shard se elige
+con hash consistente sobre user_id; los usuarios movidos con reshard.py
+tienen una ubicación explícita en la tabla user_shards (base principal).
+
+La tabla de usuarios sigue en la base principal. En cada shard se
+mantiene una copia de la fila del usuario para respetar las claves
+foráneas de tasks y categories.
+
+Para que un usuario se pueda mover sin reasignar IDs, cada shard MySQL
+debe tener auto_increment_increment = N y un auto_increment_offset
+distinto, de modo que los IDs no colisionen entre shards.
+"""
+from bisect import bisect
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session, sessionmaker
+import hashlib
+import logging
+import os
+import threading
+
+from database import engine, create_db_engine, get_db, READ_METHODS
+from models.user import User
+from models.user_shard import UserShard
+from auth import get_current_active_user
+
+logger = logging.getLogger(__name__)
+
+# Shards en formato "nombre=url,nombre=url"; si no se define, solo existe el primario
+SHARD_DATABASE_URLS = os.getenv("SHARD_DATABASE_URLS", "")
+
+# Nodos virtuales por shard en el anillo de hash consistente
+SHARD_VIRTUAL_NODES = int(os.getenv("SHARD_VIRTUAL_NODES", 64))
+
+
+def _hash(key: str) -> int:
+    """Hash estable entre procesos (hash() de Python se aleatoriza)"""
+    return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+
+
+class ConsistentHashRing:
+    """
+    Anillo de hash consistente: al añadir o quitar un shard solo se
+    reasigna la fracción de usuarios que le corresponde
+    """
+
+    def __init__(self, nodes: list, virtual_nodes: int = SHARD_VIRTUAL_NODES):
+        self._ring = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in nodes
+            for replica in range(virtual_nodes)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    def get_node(self, key) -> str:
+        """
+        Obtiene el nodo responsable de una clave
+
+        Args:
+            key: Clave a ubicar (ej: user_id)
+
+        Returns:
+            str: Nombre del nodo
+        """
+        index = bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._ring[index][1]
+
+
+def parse_shard_urls(value: str) -> dict:
+    """
+    Interpreta SHARD_DATABASE_URLS
+
+    Args:
+        value: Cadena "nombre=url,nombre=url"
+
+    Returns:
+        dict: Nombre del shard -> URL
+    """
+    shards = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, url = item.partition("=")
+        if not url:
+            raise ValueError(f"Shard mal definido en SHARD_DATABASE_URLS: {item}")
+        shards[name.strip()] = url.strip()
+    return shards
+
+
+class ShardRouter:
+    """
+    Asigna cada user_id a un engine
+
+    Con un único shard (configuración por defecto) todo se enruta al
+    engine principal y el router queda desactivado.
+    """
+
+    def __init__(self, shard_urls: dict):
+        if shard_urls:
+            self.engines = {name: create_db_engine(url) for name, url in shard_urls.items()}
+        else:
+            self.engines = {"primary": engine}
+        self.sessions = {
+            name: sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+            for name, shard_engine in self.engines.items()
+        }
+        self.ring = ConsistentHashRing(list(self.engines))
+        self._mirrored = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Indica si hay más de un shard configurado"""
+        return len(self.engines) > 1
+
+    def hashed_shard(self, user_id: int) -> str:
+        """Shard que asigna el anillo, sin tener en cuenta movimientos"""
+        return self.ring.get_node(user_id)
+
+    def placement(self, directory_db: Session, user_id: int):
+        """
+        Consulta la ubicación explícita de un usuario
+
+        Args:
+            directory_db: Sesión de la base principal
+            user_id: ID del usuario
+
+        Returns:
+            UserShard: Ubicación explícita o None si sigue en su shard de hash
+        """
+        return directory_db.get(UserShard, user_id)
+
+    def shard_for(self, directory_db: Session, user_id: int) -> str:
+        """
+        Shard donde viven los datos del usuario
+
+        Args:
+            directory_db: Sesión de la base principal
+            user_id: ID del usuario
+
+        Returns:
+            str: Nombre del shard
+        """
+        if not self.enabled:
+            return "primary"
+        placement = self.placement(directory_db, user_id)
+        return placement.shard if placement else self.hashed_shard(user_id)
+
+    def migrating_users(self, directory_db: Session) -> set:
+        """
+        Usuarios que se están moviendo de shard (estado "migrating")
+
+        Los trabajos en segundo plano no deben escribir sus filas en el
+        origen mientras reshard.py copia el delta: se perderían al cambiar
+        la ubicación.
+
+        Args:
+            directory_db: Sesión de la base principal
+
+        Returns:
+            set: IDs de los usuarios en migración
+        """
+        if not self.enabled:
+            return set()
+        return set(directory_db.execute(
+            select(UserShard.user_id).where(UserShard.state == "migrating")
+        ).scalars())
+
+    def session_for(self, shard: str) -> Session:
+        """Abre una sesión contra un shard"""
+        return self.sessions[shard]()
+
+    def mirror_user(self, shard: str, user: User) -> None:
+        """
+        Copia la fila del usuario al shard para satisfacer las claves foráneas
+
+        Se hace una vez por proceso y usuario.
+
+        Args:
+            shard: Nombre del shard
+            user: Usuario de la base principal
+        """
+        key = (shard, user.id)
+        if not self.enabled or key in self._mirrored:
+            return
+
+        columns = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        shard_db = self.session_for(shard)
+        try:
+            shard_db.merge(User(**columns))
+            shard_db.commit()
+        finally:
+            shard_db.close()
+
+        with self._lock:
+            self._mirrored.add(key)
+
+    def forget_user(self, shard: str, user_id: int) -> None:
+        """Olvida que el usuario está copiado en un shard"""
+        with self._lock:
+            self._mirrored.discard((shard, user_id))
+
+    def clear(self) -> None:
+        """Vacía la caché de usuarios copiados en los shards"""
+        with self._lock:
+            self._mirrored.clear()
+
+
+# Router global de la aplicación
+shard_router = ShardRouter(parse_shard_urls(SHARD_DATABASE_URLS))
+
+
+# Dependencia para obtener la sesión del shard del usuario
+def get_shard_db(
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generador que proporciona la sesión del shard del usuario actual
+
+    Sin sharding se reutiliza la misma sesión de get_db (con su
+    enrutado a réplica), así que no se abre ninguna conexión extra.
+
+    Raises:
+        HTTPException: Si el usuario se está moviendo de shard y la petición escribe
+    """
+    if not shard_router.enabled:
+        yield db
+        return
+
+    placement = shard_router.placement(db, current_user.id)
+    if placement is not None and placement.state == "migrating" and request.method not in READ_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tus datos se están migrando, inténtalo de nuevo en unos segundos",
+            headers={"Retry-After": "5"},
+        )
+
+    shard = placement.shard if placement else shard_router.hashed_shard(current_user.id)
+    shard_router.mirror_user(shard, current_user)
+
+    shard_db = shard_router.session_for(shard)
+    try:
+        yield shard_db
+    finally:
+        shard_db.close()
@@ -0,0 +1,199 @@
+"""
+Subtareas (proyectos -> tareas -> subtareas) con ruta materializada
+
+Cada tarea guarda la ruta de sus antecesores y su nivel:
+
+    proyecto 1        path "/"       depth 0
+      tarea 5         path "/1/"     depth 1
+        subtarea 12   path "/1/5/"   depth 2
+
+Los descendientes de una tarea son las filas cuya ruta empieza por la
+de sus hijas ("/1/5/" para la tarea 5). Como las rutas solo tienen
+cifras y "/", y "/" va justo antes que "0", ese prefijo es el rango
+"/1/5/" <= path < "/1/50", que cualquier motor resuelve con el índice
+(la columna se compara byte a byte). Así "todos los descendientes",
+"el progreso del subárbol" y "mover el subárbol" son una sola consulta
+por rango del índice (user_id, path), sin recorrer el árbol nivel a
+nivel; en las lecturas la raíz, cuando hace falta, se trata aparte por
+clave primaria (un OR entre ambas condiciones impediría usar el rango).
+El borrado sí las junta para que cada tabla sea una sola sentencia.
+"""
+from sqlalchemy import and_, case, delete, func, literal, or_, select, union_all, update
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+import os
+
+from models.task import Task
+from models.archived_task import ArchivedTask
+
+# Nivel máximo de una subtarea (0 = primer nivel)
+TASK_MAX_DEPTH = int(os.getenv("TASK_MAX_DEPTH", 10))
+
+
+def children_path(task) -> str:
+    """Ruta de las hijas de una tarea (y prefijo de todos sus descendientes)"""
+    return f"{task.path}{task.id}/"
+
+
+def descendants_filter(model, task):
+    """
+    Condición de los descendientes (a cualquier nivel) de una tarea
+
+    Args:
+        model: Task, ArchivedTask o las columnas de su tabla
+        task: Raíz del subárbol (con id, user_id y path)
+
+    Returns:
+        Condición para where/filter
+    """
+    prefix = children_path(task)
+    return and_(model.user_id == task.user_id, model.path >= prefix, model.path < prefix[:-1] + "0")
+
+
+def descendant_ids(task):
+    """
+    IDs de los descendientes de una tarea, activos y archivados
+
+    Returns:
+        Subconsulta para in_()
+    """
+    return union_all(
+        select(Task.id).where(descendants_filter(Task, task)),
+        select(ArchivedTask.id).where(descendants_filter(ArchivedTask, task)),
+    )
+
+
+def subtree_height(db: Session, task) -> int:
+    """Niveles que hay por debajo de una tarea (0 si no tiene hijas)"""
+    deepest = db.execute(
+        select(func.max(Task.depth)).where(descendants_filter(Task, task))
+    ).scalar()
+    return deepest - task.depth if deepest is not None else 0
+
+
+def progress(db: Session, task) -> dict:
+    """
+    Progreso del subárbol de una tarea (incluida ella)
+
+    Una consulta agregada de los descendientes por tabla (la activa y el
+    archivo, donde todas están completadas); la raíz ya está leída.
+
+    Args:
+        db: Sesión del shard
+        task: Raíz del subárbol (fila activa o archivada)
+
+    Returns:
+        dict: total, completadas, pendientes, vencidas y porcentaje completado
+    """
+    today = date.today()
+    total, completed, overdue = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(case((Task.is_completed == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case(
+                (and_(Task.is_completed == False, Task.due_date < today), 1), else_=0
+            )), 0),
+        ).where(descendants_filter(Task, task))
+    ).one()
+    archived = db.execute(
+        select(func.count()).where(descendants_filter(ArchivedTask, task))
+    ).scalar()
+    total += archived + 1
+    completed += archived + (1 if task.is_completed else 0)
+    if not task.is_completed and task.due_date is not None and task.due_date < today:
+        overdue += 1
+    return {
+        "task_id": task.id,
+        "total": total,
+        "completed": completed,
+        "pending": total - completed,
+        "overdue": overdue,
+        "progress": round(completed / total * 100, 1) if total else 0.0,
+    }
+
+
+def move_subtree(db: Session, task, parent) -> int:
+    """
+    Cuelga una tarea, con todo su subárbol, de otro padre
+
+    Un UPDATE por rango en cada tabla (activa y archivo) reescribe el
+    prefijo de la ruta y el nivel de todos los descendientes; otro, por
+    clave primaria, cambia el padre de la raíz. Quien llame debe haber
+    comprobado que el nuevo padre no está dentro del subárbol y que no se
+    supera TASK_MAX_DEPTH.
+
+    Args:
+        db: Sesión del shard
+        task: Raíz del subárbol (con id, user_id, path y depth)
+        parent: Nuevo padre, o None para llevarla al primer nivel
+
+    Returns:
+        int: Filas actualizadas
+    """
+    new_path = children_path(parent) if parent is not None else "/"
+    old_prefix = children_path(task)
+    new_prefix = f"{new_path}{task.id}/"
+    shift = new_path.count("/") - 1 - task.depth
+    table = Task.__table__
+    now = datetime.utcnow()
+    moved = db.execute(
+        update(table)
+        .where(descendants_filter(table.c, task))
+        .values(
+            path=literal(new_prefix) + func.substr(table.c.path, len(old_prefix) + 1),
+            depth=table.c.depth + shift,
+            updated_at=now,
+            version=table.c.version + 1,
+        )
+    ).rowcount
+    archive = ArchivedTask.__table__
+    moved += db.execute(
+        update(archive)
+        .where(descendants_filter(archive.c, task))
+        .values(
+            path=literal(new_prefix) + func.substr(archive.c.path, len(old_prefix) + 1),
+            depth=archive.c.depth + shift,
+        )
+    ).rowcount
+    moved += db.execute(
+        update(table)
+        .where(table.c.id == task.id, table.c.user_id == task.user_id)
+        .values(
+            parent_id=parent.id if parent is not None else None,
+            path=new_path,
+            depth=table.c.depth + shift,
+            updated_at=now,
+            version=table.c.version + 1,
+        )
+    ).rowcount
+    return moved
+
+
+def delete_subtree(db: Session, task, model=Task, descendants: bool = True) -> int:
+    """
+    Borra una tarea y todos sus descendientes, también los archivados
+
+    Una sentencia por tabla: WHERE user_id = ? AND (id = ? OR rango de la
+    ruta). Si se sabe que no tiene descendientes, solo se borra la raíz.
+
+    Args:
+        db: Sesión del shard
+        task: Raíz del subárbol
+        model: Tabla de la raíz (Task o ArchivedTask)
+        descendants: False si la tarea no tiene descendientes
+
+    Returns:
+        int: Filas borradas
+    """
+    if not descendants:
+        root = model.__table__
+        return db.execute(delete(root).where(root.c.id == task.id, root.c.user_id == task.user_id)).rowcount
+
+    prefix = children_path(task)
+    deleted = 0
+    for table in (Task.__table__, ArchivedTask.__table__):
+        deleted += db.execute(delete(table).where(
+            table.c.user_id == task.user_id,
+            or_(table.c.id == task.id, and_(table.c.path >= prefix, table.c.path < prefix[:-1] + "0")),
+        )).rowcount
+    return deleted
@@ -0,0 +1,253 @@
+"""
+Etiquetas de tareas con índice invertido
+
+task_tags guarda, por clave primaria (tag_id, task_id), la lista de
+tareas de cada etiqueta. Los filtros de GET /tasks se resuelven sobre
+esas listas sin subconsultas por etiqueta:
+
+    - match=any: unión de las listas (un IN sobre tag_id)
+    - match=all: intersección con joins por clave primaria, empezando por
+      la etiqueta con menos tareas (tags.task_count), de modo que el coste
+      depende de la lista más corta y no de la más larga
+
+tags.task_count se mantiene con incrementos atómicos al etiquetar,
+desetiquetar y borrar tareas; cada operación en bloque cuesta unas pocas
+sentencias por etiqueta, sea cual sea el número de tareas. El trabajo
+periódico de reconcile.py lo recalcula desde task_tags por si alguna
+escritura se saltó los incrementos.
+"""
+from sqlalchemy import and_, delete, exists, false, func, literal, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session, aliased
+import os
+
+from models.task import Task
+from models.tag import Tag
+from models.task_tag import TaskTag
+
+# Máximo de etiquetas en un filtro o en una operación en bloque
+TAGS_MAX_PER_REQUEST = int(os.getenv("TAGS_MAX_PER_REQUEST", 20))
+
+
+def normalize(name: str) -> str:
+    """Forma canónica de un nombre de etiqueta (sin espacios y en minúsculas)"""
+    return name.strip().lower()
+
+
+def parse_tags(value: str) -> list:
+    """Nombres de una lista separada por comas, normalizados y sin repetir"""
+    names = []
+    for name in (value or "").split(","):
+        name = normalize(name)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def resolve(db: Session, user_id: int, names: list) -> list:
+    """
+    Etiquetas del usuario con esos nombres (una consulta por la clave única)
+
+    Returns:
+        list: Filas (id, name, task_count, created_at) de las que existen
+    """
+    if not names:
+        return []
+    return db.execute(
+        select(Tag.id, Tag.name, Tag.task_count, Tag.created_at).where(Tag.user_id == user_id, Tag.name.in_(names))
+    ).all()
+
+
+def ensure_tags(db: Session, user_id: int, names: list) -> list:
+    """
+    Crea las etiquetas que falten y devuelve todas
+
+    Returns:
+        list: Filas (id, name, task_count, created_at) en cualquier orden
+    """
+    existing = resolve(db, user_id, names)
+    missing = set(names) - {row.name for row in existing}
+    if not missing:
+        return existing
+    _insert_ignoring_duplicates(db, Tag.__table__, [{"user_id": user_id, "name": name} for name in missing])
+    return resolve(db, user_id, names)
+
+
+def _insert_ignoring_duplicates(db: Session, table, rows=None, from_select=None):
+    """
+    INSERT que descarta las filas cuya clave ya existe (otra petición
+    concurrente pudo insertarlas)
+
+    Returns:
+        int: Filas insertadas
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(table).prefix_with("IGNORE")
+    else:
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(table).on_conflict_do_nothing()
+    if from_select is not None:
+        return db.execute(statement.from_select(*from_select)).rowcount
+    return db.execute(statement, rows).rowcount
+
+
+def task_filter(db: Session, model, user_id: int, names: list, match: str = "any"):
+    """
+    Condición sobre model.id para filtrar por etiquetas
+
+    Args:
+        db: Sesión del shard
+        model: Task o ArchivedTask
+        user_id: ID del usuario
+        names: Nombres normalizados
+        match: "all" (todas las etiquetas) o "any" (alguna)
+
+    Returns:
+        Condición para filter (falsa si ninguna tarea puede cumplirla)
+    """
+    tags = resolve(db, user_id, names)
+    if not tags or (match == "all" and len(tags) < len(names)):
+        return false()
+
+    if match == "any":
+        return model.id.in_(
+            select(TaskTag.task_id).where(TaskTag.tag_id.in_([tag.id for tag in tags]))
+        )
+
+    # Intersección: se recorre la lista más corta y se comprueba cada
+    # tarea en las demás por clave primaria
+    tags = sorted(tags, key=lambda tag: tag.task_count)
+    first = aliased(TaskTag)
+    query = select(first.task_id).where(first.tag_id == tags[0].id)
+    for tag in tags[1:]:
+        other = aliased(TaskTag)
+        query = query.join(other, and_(other.tag_id == tag.id, other.task_id == first.task_id))
+    return model.id.in_(query)
+
+
+def tag_tasks(db: Session, user_id: int, tag_ids: list, task_ids: list) -> int:
+    """
+    Añade etiquetas a tareas del usuario (las que ya las tenían se saltan)
+
+    Un INSERT ... SELECT por etiqueta: las tareas se validan en la misma
+    sentencia (solo entran las del usuario) y su rowcount es lo que se
+    suma al contador.
+
+    Returns:
+        int: Pares (etiqueta, tarea) nuevos
+    """
+    added = 0
+    for tag_id in tag_ids:
+        already = exists().where(TaskTag.tag_id == tag_id, TaskTag.task_id == Task.id)
+        inserted = _insert_ignoring_duplicates(db, TaskTag.__table__, from_select=(
+            ["tag_id", "task_id", "user_id"],
+            select(literal(tag_id), Task.id, Task.user_id)
+            .where(Task.user_id == user_id, Task.id.in_(task_ids), ~already),
+        ))
+        if inserted:
+            _add_to_count(db, tag_id, inserted)
+        added += inserted
+    return added
+
+
+def untag_tasks(db: Session, user_id: int, tag_ids: list, task_ids: list) -> int:
+    """
+    Quita etiquetas de tareas del usuario
+
+    Returns:
+        int: Pares (etiqueta, tarea) borrados
+    """
+    removed = 0
+    for tag_id in tag_ids:
+        deleted = db.execute(
+            delete(TaskTag.__table__).where(
+                TaskTag.tag_id == tag_id,
+                TaskTag.task_id.in_(task_ids),
+                TaskTag.user_id == user_id,
+            )
+        ).rowcount
+        if deleted:
+            _add_to_count(db, tag_id, -deleted)
+        removed += deleted
+    return removed
+
+
+def forget_tasks(db: Session, task_condition) -> None:
+    """
+    Quita todas las etiquetas de las tareas que se van a borrar
+
+    Args:
+        db: Sesión del shard
+        task_condition: Condición sobre TaskTag.task_id (ej: TaskTag.task_id.in_(...))
+    """
+    counts = db.execute(
+        select(TaskTag.tag_id, func.count()).where(task_condition).group_by(TaskTag.tag_id)
+    ).all()
+    if not counts:
+        return
+    for tag_id, count in counts:
+        _add_to_count(db, tag_id, -count)
+    db.execute(delete(TaskTag.__table__).where(task_condition))
+
+
+def _add_to_count(db: Session, tag_id: int, amount: int) -> None:
+    """Suma al contador de tareas de una etiqueta"""
+    db.execute(
+        update(Tag.__table__).where(Tag.id == tag_id).values(task_count=Tag.task_count + amount)
+    )
+
+
+def reconcile_counts(db: Session, batch_size: int = 1000, skip_users: set = frozenset()) -> int:
+    """
+    Recalcula tags.task_count desde task_tags y corrige los que no cuadren
+
+    Recorre las etiquetas en lotes por ID, cada uno en su transacción.
+
+    Args:
+        db: Sesión del shard
+        batch_size: Etiquetas por lote
+        skip_users: Usuarios que no se tocan (en migración de shard)
+
+    Returns:
+        int: Etiquetas corregidas
+    """
+    table = Tag.__table__
+    actual = select(func.count()).where(TaskTag.tag_id == table.c.id).scalar_subquery()
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = db.execute(
+            select(table.c.id).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return fixed
+        fixed += db.execute(
+            update(table)
+            .where(table.c.id.in_(ids), table.c.task_count != actual, table.c.user_id.notin_(skip_users))
+            .values(task_count=actual)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        last_id = ids[-1]
+
+
+def names_by_task(db: Session, task_ids: list, user_id: int) -> dict:
+    """
+    Nombres de las etiquetas de varias tareas en una sola consulta
+
+    Returns:
+        dict: {task_id: [nombres ordenados]}
+    """
+    names = {}
+    if not task_ids:
+        return names
+    rows = db.execute(
+        select(TaskTag.task_id, Tag.name)
+        .join(Tag, Tag.id == TaskTag.tag_id)
+        .where(TaskTag.task_id.in_(task_ids), TaskTag.user_id == user_id)
+        .order_by(Tag.name)
+    )
+    for task_id, name in rows:
+        names.setdefault(task_id, []).append(name)
+    return names
@@ -0,0 +1,216 @@
+"""
+Vistas guardadas compiladas en sentencias cacheadas
+
+Una vista guarda un filtro de tareas en JSON. En lugar de construir la
+consulta en cada petición (como GET /tasks), la definición se compila
+una vez en una sentencia lambda_stmt de SQLAlchemy cuyos valores son
+parámetros ligados:
+
+    SELECT ... FROM tasks
+    WHERE user_id = :user_id AND priority IN (__[POSTCOMPILE_priorities])
+      AND due_date <= :due_before
+    ORDER BY ... LIMIT :limit OFFSET :skip
+
+La forma de la sentencia solo depende de qué filtros lleva la vista (no
+de sus valores), así que todas las vistas con la misma forma comparten
+sentencia, y SQLAlchemy reutiliza su SQL compilado sin volver a generar
+la clave de caché del árbol de la consulta. Por petición solo se calculan
+los parámetros: la fecha límite, los IDs de las etiquetas (una consulta
+por la clave única) y la paginación.
+
+Opcionalmente, los resultados se guardan unos segundos en un LRU del
+proceso (VIEW_RESULT_CACHE_SECONDS). Las escrituras de tareas no lo
+invalidan: una vista cacheada puede ir hasta ese tiempo por detrás.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from sqlalchemy import bindparam, func, lambda_stmt, select
+from sqlalchemy.orm import Session
+from datetime import date, timedelta
+import json
+import os
+import threading
+import time
+
+from models.task import Task, PriorityEnum
+from models.task_tag import TaskTag
+import tags
+
+# Definiciones distintas que se recuerdan ya compiladas
+VIEW_PLAN_CACHE_SIZE = int(os.getenv("VIEW_PLAN_CACHE_SIZE", 1024))
+# Segundos que se reutiliza el resultado de una vista (0 = desactivado)
+VIEW_RESULT_CACHE_SECONDS = float(os.getenv("VIEW_RESULT_CACHE_SECONDS", 0))
+# Máximo de resultados guardados por proceso
+VIEW_RESULT_CACHE_SIZE = int(os.getenv("VIEW_RESULT_CACHE_SIZE", 1024))
+
+
+# ====================
+# COMPILACIÓN
+# ====================
+
+@lru_cache(maxsize=64)
+def statement_for(shape: tuple):
+    """
+    Sentencia de una forma de vista
+
+    Las lambdas no capturan valores (todos son bindparam con nombre), de
+    modo que cada una se analiza una sola vez y su clave de caché es su
+    posición en el código.
+
+    Args:
+        shape: (is_completed, priorities, category_ids, due_within_days,
+            modo de etiquetas o None, orden)
+
+    Returns:
+        StatementLambdaElement: Sentencia lista para ejecutar con parámetros
+    """
+    has_completed, has_priorities, has_categories, has_due, tag_match, sort = shape
+
+    statement = lambda_stmt(lambda: select(Task).where(Task.user_id == bindparam("user_id")))
+    if has_completed:
+        statement += lambda s: s.where(Task.is_completed == bindparam("is_completed"))
+    if has_priorities:
+        statement += lambda s: s.where(Task.priority.in_(bindparam("priorities", expanding=True)))
+    if has_categories:
+        statement += lambda s: s.where(Task.category_id.in_(bindparam("category_ids", expanding=True)))
+    if has_due:
+        statement += lambda s: s.where(Task.due_date <= bindparam("due_before"))
+
+    # Etiquetas: la intersección se expresa con GROUP BY/HAVING para que la
+    # forma no dependa del número de etiquetas
+    if tag_match == "any":
+        statement += lambda s: s.where(Task.id.in_(
+            select(TaskTag.task_id).where(TaskTag.tag_id.in_(bindparam("tag_ids", expanding=True)))
+        ))
+    elif tag_match == "all":
+        statement += lambda s: s.where(Task.id.in_(
+            select(TaskTag.task_id)
+            .where(TaskTag.tag_id.in_(bindparam("tag_ids", expanding=True)))
+            .group_by(TaskTag.task_id)
+            .having(func.count() == bindparam("tag_count"))
+        ))
+
+    if sort == "position":
+        statement += lambda s: s.order_by(Task.position, Task.id)
+    elif sort == "due_date":
+        statement += lambda s: s.order_by(Task.due_date.is_(None), Task.due_date, Task.id)
+    else:
+        statement += lambda s: s.order_by(Task.created_at.desc())
+
+    statement += lambda s: s.offset(bindparam("skip")).limit(bindparam("limit"))
+    return statement
+
+
+@lru_cache(maxsize=VIEW_PLAN_CACHE_SIZE)
+def compile_view(filters: str) -> tuple:
+    """
+    Compila la definición de una vista (el JSON de la columna filters)
+
+    Returns:
+        tuple: (sentencia, parámetros fijos, definición)
+    """
+    definition = json.loads(filters)
+    tag_match = definition.get("match", "any") if definition.get("tags") else None
+    shape = (
+        definition.get("is_completed") is not None,
+        bool(definition.get("priorities")),
+        bool(definition.get("category_ids")),
+        definition.get("due_within_days") is not None,
+        tag_match,
+        definition.get("sort", "created_at"),
+    )
+    params = {}
+    if shape[0]:
+        params["is_completed"] = definition["is_completed"]
+    if shape[1]:
+        params["priorities"] = [PriorityEnum(priority) for priority in definition["priorities"]]
+    if shape[2]:
+        params["category_ids"] = list(definition["category_ids"])
+    return statement_for(shape), params, definition
+
+
+def run_view(db: Session, view, user_id: int, skip: int = 0, limit: int = 100) -> list:
+    """
+    Ejecuta una vista guardada con su sentencia compilada
+
+    Args:
+        db: Sesión del shard
+        view: Vista (con filters)
+        user_id: ID del usuario
+        skip: Número de registros a saltar
+        limit: Número máximo de registros
+
+    Returns:
+        list: Tareas de la vista
+    """
+    statement, fixed, definition = compile_view(view.filters)
+    params = {**fixed, "user_id": user_id, "skip": skip, "limit": limit}
+
+    if definition.get("due_within_days") is not None:
+        params["due_before"] = date.today() + timedelta(days=definition["due_within_days"])
+
+    names = definition.get("tags")
+    if names:
+        tag_ids = [row.id for row in tags.resolve(db, user_id, names)]
+        # Ninguna tarea puede cumplirla: no hace falta ir a la base de datos
+        if not tag_ids or (definition.get("match") == "all" and len(tag_ids) < len(names)):
+            return []
+        params["tag_ids"] = tag_ids
+        params["tag_count"] = len(tag_ids)
+
+    return db.execute(statement, params).scalars().all()
+
+
+# ====================
+# CACHÉ DE RESULTADOS
+# ====================
+
+class ViewResultCache:
+    """
+    Resultados recientes de las vistas en un LRU acotado del proceso
+
+    La clave incluye la versión de la vista, así que editarla deja de
+    servir los resultados anteriores.
+    """
+
+    def __init__(self, ttl: float = VIEW_RESULT_CACHE_SECONDS, max_entries: int = VIEW_RESULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Indica si la caché guarda algo"""
+        return self.ttl > 0
+
+    def get(self, key: tuple):
+        """Resultado vigente de una clave o None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, value) -> None:
+        """Guarda un resultado durante ttl segundos"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vacía la caché"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Caché del proceso
+view_result_cache = ViewResultCache()
@@ -0,0 +1,49 @@
+"""
+Configuración común de los tests
+
+Cada sesión de tests usa una base SQLite temporal con todas las
+migraciones aplicadas, sin trabajos en segundo plano ni límites de
+peticiones.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+_db_dir = tempfile.mkdtemp(prefix="taskmanager-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ["JOB_RUNNER_ENABLED"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["ADMISSION_ENABLED"] = "false"
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from database import engine  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+import main  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Cliente de la API sobre la base de tests"""
+    run_migrations(engine)
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Cabeceras de un usuario nuevo ya autenticado"""
+    username = f"user_{uuid.uuid4().hex[:8]}"
+    client.post("/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": "secret123",
+    })
+    response = client.post("/auth/login-json", json={"username": username, "password": "secret123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
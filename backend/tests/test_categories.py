@@ -0,0 +1,69 @@
+"""
+Tests de GET /categories
+"""
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from database import engine
+
+
+@contextmanager
+def count_statements(table: str):
+    """Cuenta las sentencias que leen de una tabla mientras dura el bloque"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if f"FROM {table}" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def create_categories(client, headers, count: int = 3) -> list:
+    """Crea categorías con una tarea pendiente, una vencida y una completada cada una"""
+    ids = []
+    yesterday = str(date.today() - timedelta(days=1))
+    for i in range(count):
+        category_id = client.post("/categories/", json={"name": f"Categoría {i}"}, headers=headers).json()["id"]
+        client.post("/tasks/", json={"title": "pendiente", "category_id": category_id}, headers=headers)
+        client.post("/tasks/", json={"title": "vencida", "category_id": category_id, "due_date": yesterday}, headers=headers)
+        done = client.post("/tasks/", json={"title": "hecha", "category_id": category_id}, headers=headers).json()
+        client.patch(f"/tasks/{done['id']}/complete", headers=headers)
+        ids.append(category_id)
+    return ids
+
+
+def test_include_counts_uses_one_statement(client, auth_headers):
+    create_categories(client, auth_headers, count=5)
+
+    with count_statements("categories") as statements:
+        response = client.get("/categories/?include_counts=true", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    assert len(statements) == 1
+
+
+def test_include_counts_values(client, auth_headers):
+    create_categories(client, auth_headers, count=2)
+
+    categories = client.get("/categories/?include_counts=true", headers=auth_headers).json()
+
+    for category in categories:
+        assert category["task_counts"] == {"total": 3, "pending": 2, "overdue": 1}
+
+
+def test_counts_omitted_by_default(client, auth_headers):
+    create_categories(client, auth_headers, count=1)
+
+    categories = client.get("/categories/", headers=auth_headers).json()
+
+    assert len(categories) == 1
+    assert "task_counts" not in categories[0]
+    assert set(categories[0]) == {"id", "user_id", "name", "color", "created_at", "version"}
@@ -0,0 +1,146 @@
+"""
+Tests de la compresión de respuestas (compression.py)
+"""
+import asyncio
+import json
+import zlib
+
+import pytest
+
+from compression import CompressionMiddleware, bounded_level, negotiate
+
+
+def run(app, accept_encoding: str = "gzip", min_size: int = 100) -> list:
+    """Pasa una petición GET por el middleware y devuelve los mensajes enviados"""
+    messages = []
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else [],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(CompressionMiddleware(app, min_size=min_size, encodings=["gzip"])(scope, receive, send))
+    return messages
+
+
+def respond(chunks: list, content_type: bytes = b"application/json", status: int = 200, headers: list = ()):
+    """Aplicación ASGI que envía el cuerpo en esos trozos"""
+    async def app(scope, receive, send):
+        start_headers = [(b"content-type", content_type), *headers]
+        if len(chunks) == 1:
+            start_headers.append((b"content-length", str(len(chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": start_headers})
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return app
+
+
+def response_headers(messages: list) -> dict:
+    """Cabeceras del inicio de la respuesta"""
+    return {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+
+
+def body(messages: list) -> bytes:
+    """Cuerpo completo de la respuesta"""
+    return b"".join(message.get("body", b"") for message in messages[1:])
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip;q=0.1", "gzip"),
+    ("*", "zstd"),
+    ("*;q=0.5, gzip", "gzip"),
+    ("identity", None),
+    ("gzip;q=0", None),
+    ("gzip;q=x", None),
+    ("", None),
+    (None, None),
+])
+def test_negotiate(accept_encoding, expected):
+    assert negotiate(accept_encoding, ["zstd", "br", "gzip"]) == expected
+
+
+def test_negotiate_falls_back_to_available_encodings():
+    # Sin brotli ni zstandard instalados solo queda gzip
+    assert negotiate("br, zstd, gzip;q=0.1", ["gzip"]) == "gzip"
+    assert negotiate("br, zstd", ["gzip"]) is None
+
+
+def test_bounded_level():
+    assert bounded_level("gzip", 9) == 6
+    assert bounded_level("gzip", 0) == 1
+    assert bounded_level("zstd", 3) == 3
+
+
+def test_small_response_is_not_compressed():
+    payload = json.dumps({"ok": True}).encode()
+
+    messages = run(respond([payload]))
+
+    headers = response_headers(messages)
+    assert "content-encoding" not in headers
+    assert headers["content-length"] == str(len(payload))
+    assert headers["vary"] == "Accept-Encoding"
+    assert body(messages) == payload
+
+
+def test_large_response_is_compressed_with_length():
+    payload = json.dumps([{"title": f"Tarea {i}"} for i in range(100)]).encode()
+
+    messages = run(respond([payload]))
+
+    headers = response_headers(messages)
+    assert headers["content-encoding"] == "gzip"
+    assert headers["content-length"] == str(len(body(messages)))
+    assert zlib.decompress(body(messages), 16 + zlib.MAX_WBITS) == payload
+
+
+@pytest.mark.parametrize("content_type, status, headers, accept_encoding", [
+    (b"image/png", 200, [], "gzip"),
+    (b"application/json", 200, [(b"cache-control", b"no-transform")], "gzip"),
+    (b"application/json", 200, [(b"content-encoding", b"br")], "gzip"),
+    (b"application/json", 304, [], "gzip"),
+    (b"application/json", 200, [], "identity"),
+])
+def test_responses_left_untouched(content_type, status, headers, accept_encoding):
+    payload = b"x" * 1000
+
+    messages = run(respond([payload], content_type, status, headers), accept_encoding)
+
+    assert response_headers(messages).get("content-encoding") != "gzip"
+    assert body(messages) == payload
+
+
+def test_small_stream_is_sent_as_is():
+    chunks = [b'{"a": 1}\n', b'{"b": 2}\n', b""]
+
+    messages = run(respond(chunks, b"application/x-ndjson"))
+
+    assert "content-encoding" not in response_headers(messages)
+    assert body(messages) == b"".join(chunks)
+
+
+def test_stream_is_compressed_chunk_by_chunk():
+    chunks = [b"x" * 60, b"y" * 60, b"z" * 200, b"w" * 200]
+
+    messages = run(respond(chunks, b"application/x-ndjson"))
+
+    headers = response_headers(messages)
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    # Los dos primeros trozos se retienen hasta pasar el umbral; después
+    # cada trozo sale comprimido y decodificable sin esperar al final
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    received = [decompressor.decompress(message["body"]) for message in messages[1:]]
+    assert received[0] == chunks[0] + chunks[1]
+    assert received[1:] == chunks[2:]
+    assert messages[-1]["more_body"] is False
@@ -0,0 +1,81 @@
+"""
+Tests del orden manual (positions.py y PATCH /tasks/{id}/move)
+"""
+import random
+
+import pytest
+from sqlalchemy import select, update
+
+from database import engine
+from models.task import Task
+from positions import integer_key, key_between, sequential_keys
+
+
+def test_key_between_stays_between_neighbours():
+    rng = random.Random(42)
+    keys = [key_between(None, None)]
+    for _ in range(500):
+        index = rng.randrange(len(keys) + 1)
+        before = keys[index - 1] if index > 0 else None
+        after = keys[index] if index < len(keys) else None
+        key = key_between(before, after)
+        assert before is None or before < key
+        assert after is None or key < after
+        keys.insert(index, key)
+
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+
+def test_key_between_repeated_gap_and_ends():
+    low, high = "a0", "a1"
+    for _ in range(50):
+        middle = key_between(low, high)
+        assert low < middle < high
+        high = middle
+
+    first = "a0"
+    for _ in range(100):
+        previous = key_between(None, first)
+        assert previous < first
+        first = previous
+
+
+def test_key_between_rejects_out_of_order():
+    with pytest.raises(ValueError):
+        key_between("a2", "a1")
+    with pytest.raises(ValueError):
+        key_between("a1", "a1")
+
+
+def test_sequential_keys_are_increasing():
+    keys = sequential_keys(5000)
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+
+def test_integer_key_keeps_numeric_order():
+    numbers = [0, 1, 9, 10, 61, 62, 63, 3843, 3844, 10 ** 6, 10 ** 9, 10 ** 12]
+    keys = [integer_key(number) for number in numbers]
+    assert keys == sorted(keys)
+    # Sirven como vecinas al mover
+    assert keys[0] < key_between(keys[0], keys[1]) < keys[1]
+
+
+def test_move_next_to_task_without_position(client, auth_headers):
+    ids = [
+        client.post("/tasks/", json={"title": f"t{i}"}, headers=auth_headers).json()["id"]
+        for i in range(3)
+    ]
+    # Fila sin clave, como las insertadas fuera del ORM
+    with engine.begin() as connection:
+        connection.execute(update(Task.__table__).where(Task.id == ids[1]).values(position=None))
+
+    response = client.patch(f"/tasks/{ids[0]}/move", json={"after_id": ids[1]}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["position"] is not None
+    with engine.connect() as connection:
+        rows = dict(connection.execute(select(Task.id, Task.position).where(Task.id.in_(ids))).all())
+    assert None not in rows.values()
+    assert rows[ids[1]] < rows[ids[0]]
@@ -0,0 +1,108 @@
+"""
+Tests del límite de peticiones (ratelimit.py)
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import ratelimit
+from auth import create_access_token
+from ratelimit import MemoryRateLimitStore, RateLimitMiddleware, parse_limit, parse_routes
+
+
+class FakeClock:
+    """Reloj monotónico que solo avanza cuando se le pide"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Sustituye time.monotonic en ratelimit por un reloj manual"""
+    fake = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", fake)
+    return fake
+
+
+def test_parse_limits():
+    assert parse_limit("10/60") == (6.0, 10)
+    assert parse_routes("post /auth/login/=5/60, GET /tasks=300/60") == {
+        ("POST", "/auth/login"): (12.0, 5),
+        ("GET", "/tasks"): (0.2, 300),
+    }
+    for value in ("0/60", "10/0", "10", "x/60"):
+        with pytest.raises(ValueError):
+            parse_limit(value)
+
+
+def test_take_allows_burst_then_waits_one_interval(clock):
+    store = MemoryRateLimitStore()
+
+    assert [store.take("k", 2.0, 3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take("k", 2.0, 3) == pytest.approx(2.0)
+
+    # Las peticiones rechazadas no gastan ficha
+    clock.now += 1.5
+    assert store.take("k", 2.0, 3) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert store.take("k", 2.0, 3) == 0.0
+    assert store.take("k", 2.0, 3) == pytest.approx(2.0)
+
+
+def test_take_refills_up_to_the_burst(clock):
+    store = MemoryRateLimitStore()
+    for _ in range(3):
+        store.take("k", 2.0, 3)
+
+    # Mucho tiempo parado: el cubo vuelve a estar lleno, no más
+    clock.now += 3600
+    assert [store.take("k", 2.0, 3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take("k", 2.0, 3) > 0
+    # Cada cubo es independiente
+    assert store.take("otro", 2.0, 3) == 0.0
+
+
+def test_take_evicts_least_recently_used(clock):
+    store = MemoryRateLimitStore(max_keys=2)
+    store.take("a", 10.0, 1)
+    store.take("b", 10.0, 1)
+    # "a" se vuelve a usar (rechazada) y pasa a ser la más reciente
+    assert store.take("a", 10.0, 1) > 0
+    store.take("c", 10.0, 1)
+
+    assert store.take("a", 10.0, 1) > 0
+    # "b" se descartó: vuelve a empezar con el cubo lleno
+    assert store.take("b", 10.0, 1) == 0.0
+
+
+def test_middleware_buckets_and_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        return {"ok": True}
+
+    @app.post("/auth/login")
+    async def login():
+        return {"ok": True}
+
+    store = MemoryRateLimitStore()
+    middleware_app = RateLimitMiddleware(
+        app, store=store, ip_limit="100/60", user_limit="2/60", routes="POST /auth/login=1/60"
+    )
+    client = TestClient(middleware_app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'alice'})}"}
+
+    assert [client.get("/items", headers=headers).status_code for _ in range(3)] == [200, 200, 429]
+    # Sin token solo se aplica el cubo de la IP
+    assert client.get("/items").status_code == 200
+
+    assert client.post("/auth/login").status_code == 200
+    response = client.post("/auth/login/")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "60"
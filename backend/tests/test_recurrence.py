@@ -0,0 +1,98 @@
+"""
+Tests de las reglas de recurrencia (recurrence.py)
+"""
+from datetime import date
+
+import pytest
+
+from recurrence import MAX_OCCURRENCES, RecurrenceRule, validate_rule
+
+
+def test_parse_shortcuts_and_format():
+    assert RecurrenceRule.parse("daily").format() == "FREQ=DAILY"
+    assert RecurrenceRule.parse("Weekly").freq == "WEEKLY"
+    rule = RecurrenceRule.parse("RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=FR,MO;COUNT=3;UNTIL=2025-06-30")
+    assert rule.format() == "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR;COUNT=3;UNTIL=20250630"
+    assert validate_rule("") is None
+
+
+@pytest.mark.parametrize("value", [
+    "FREQ=HOURLY",
+    "INTERVAL=2",
+    "FREQ=DAILY;COUNT=0",
+    "FREQ=DAILY;INTERVAL=x",
+    "FREQ=DAILY;BYDAY=MO",
+    "FREQ=WEEKLY;BYDAY=XX",
+    "FREQ=MONTHLY;BYMONTHDAY=32",
+    "FREQ=DAILY;BYSETPOS=1",
+    "FREQ=DAILY;COUNT",
+])
+def test_parse_rejects_invalid_rules(value):
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse(value)
+
+
+def test_monthly_on_the_31st_uses_the_last_day_of_shorter_months():
+    rule = RecurrenceRule.parse("FREQ=MONTHLY")
+    occurrences = list(rule.occurrences(date(2024, 1, 31), limit=5))
+    assert occurrences == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30), date(2024, 5, 31),
+    ]
+
+
+def test_advance_keeps_the_day_of_month_after_february():
+    rule = RecurrenceRule.parse("FREQ=MONTHLY")
+    due = date(2025, 1, 31)
+    dates = []
+    for _ in range(3):
+        due, rule = rule.advance(due)
+        dates.append(due)
+    assert dates == [date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)]
+
+
+def test_weekly_by_day():
+    rule = RecurrenceRule.parse("FREQ=WEEKLY;BYDAY=MO,FR")
+    # 2025-01-01 es miércoles: la serie empieza en él y sigue en lunes y viernes
+    assert list(rule.occurrences(date(2025, 1, 1), limit=4)) == [
+        date(2025, 1, 1), date(2025, 1, 3), date(2025, 1, 6), date(2025, 1, 10),
+    ]
+
+
+def test_count_limits_occurrences_and_advance():
+    rule = RecurrenceRule.parse("FREQ=DAILY;COUNT=3")
+    assert list(rule.occurrences(date(2025, 1, 1))) == [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)]
+
+    due, rule = rule.advance(date(2025, 1, 1))
+    assert (due, rule.count) == (date(2025, 1, 2), 2)
+    due, rule = rule.advance(due)
+    assert (due, rule.count) == (date(2025, 1, 3), 1)
+    assert rule.advance(due) == (None, None)
+
+
+def test_until_stops_the_series():
+    rule = RecurrenceRule.parse("FREQ=WEEKLY;UNTIL=20250115")
+    assert list(rule.occurrences(date(2025, 1, 1))) == [date(2025, 1, 1), date(2025, 1, 8), date(2025, 1, 15)]
+    assert rule.advance(date(2025, 1, 15)) == (None, None)
+    assert list(rule.occurrences(date(2025, 2, 1))) == []
+
+
+def test_occurrences_between_old_series_without_count():
+    # Más de MAX_OCCURRENCES días desde el ancla: el rango se alcanza igualmente
+    rule = RecurrenceRule.parse("FREQ=DAILY;INTERVAL=2")
+    anchor = date(2020, 1, 1)
+    found = list(rule.occurrences_between(anchor, date(2025, 3, 1), date(2025, 3, 6)))
+    assert (date(2025, 3, 1) - anchor).days > MAX_OCCURRENCES
+    # 1886 días desde el ancla: el 1 de marzo cae en la serie
+    assert found == [date(2025, 3, 1), date(2025, 3, 3), date(2025, 3, 5)]
+
+
+def test_occurrences_between_month_end_after_skipping():
+    rule = RecurrenceRule.parse("FREQ=MONTHLY")
+    found = list(rule.occurrences_between(date(2010, 1, 31), date(2025, 2, 1), date(2025, 4, 30)))
+    assert found == [date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)]
+
+
+def test_occurrences_between_counts_from_the_anchor():
+    rule = RecurrenceRule.parse("FREQ=DAILY;COUNT=5")
+    found = list(rule.occurrences_between(date(2025, 1, 1), date(2025, 1, 4), date(2025, 1, 31)))
+    assert found == [date(2025, 1, 4), date(2025, 1, 5)]
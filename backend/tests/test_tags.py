@@ -0,0 +1,92 @@
+"""
+Tests de las etiquetas (tags.py y GET /tasks?tags=)
+"""
+import uuid
+
+from sqlalchemy import update
+
+from database import engine
+from models.tag import Tag
+
+
+def register_user(client) -> dict:
+    """Registra otro usuario y devuelve sus cabeceras"""
+    username = f"user_{uuid.uuid4().hex[:8]}"
+    client.post("/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": "secret123",
+    })
+    response = client.post("/auth/login-json", json={"username": username, "password": "secret123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def create_tagged_tasks(client, headers) -> dict:
+    """Crea cuatro tareas etiquetadas y devuelve {título: id}"""
+    tagged = {"a": ["rojo"], "b": ["rojo", "azul"], "c": ["azul", "verde"], "d": []}
+    ids = {}
+    for title, names in tagged.items():
+        ids[title] = client.post("/tasks/", json={"title": title}, headers=headers).json()["id"]
+        if names:
+            client.post("/tags/assign", json={"task_ids": [ids[title]], "tags": names}, headers=headers)
+    return ids
+
+
+def filtered_titles(client, headers, tags: str, match: str) -> set:
+    """Títulos de las tareas que devuelve el filtro por etiquetas"""
+    response = client.get("/tasks/", params={"tags": tags, "match": match}, headers=headers)
+    assert response.status_code == 200
+    return {task["title"] for task in response.json()}
+
+
+def test_filter_any_and_all(client, auth_headers):
+    create_tagged_tasks(client, auth_headers)
+
+    assert filtered_titles(client, auth_headers, "rojo,azul", "any") == {"a", "b", "c"}
+    assert filtered_titles(client, auth_headers, "rojo,azul", "all") == {"b"}
+    assert filtered_titles(client, auth_headers, " Azul ,VERDE", "all") == {"c"}
+
+
+def test_filter_with_unknown_tag(client, auth_headers):
+    create_tagged_tasks(client, auth_headers)
+
+    # Con all, una etiqueta inexistente deja el resultado vacío; con any se ignora
+    assert filtered_titles(client, auth_headers, "rojo,nada", "all") == set()
+    assert filtered_titles(client, auth_headers, "rojo,nada", "any") == {"a", "b"}
+    assert filtered_titles(client, auth_headers, "nada", "any") == set()
+
+
+def test_filter_all_does_not_depend_on_task_count(client, auth_headers):
+    create_tagged_tasks(client, auth_headers)
+    # Contadores desfasados: solo cambian el orden de la intersección
+    with engine.begin() as connection:
+        connection.execute(update(Tag.__table__).where(Tag.name == "rojo").values(task_count=1000))
+
+    assert filtered_titles(client, auth_headers, "rojo,azul", "all") == {"b"}
+
+
+def test_filter_ignores_tags_of_other_users(client, auth_headers):
+    create_tagged_tasks(client, auth_headers)
+    other_headers = register_user(client)
+    create_tagged_tasks(client, other_headers)
+
+    assert filtered_titles(client, auth_headers, "rojo", "any") == {"a", "b"}
+    response = client.get("/tasks/", params={"tags": "rojo"}, headers=auth_headers)
+    assert len(response.json()) == 2
+
+
+def test_counts_follow_assign_unassign_and_delete(client, auth_headers):
+    ids = create_tagged_tasks(client, auth_headers)
+
+    result = client.post(
+        "/tags/assign", json={"task_ids": [ids["a"], ids["b"], ids["d"]], "tags": ["rojo"]}, headers=auth_headers
+    ).json()
+    assert result["changed"] == 1
+    assert result["tags"][0]["task_count"] == 3
+
+    result = client.post("/tags/unassign", json={"task_ids": [ids["a"]], "tags": ["rojo"]}, headers=auth_headers).json()
+    assert (result["changed"], result["tags"][0]["task_count"]) == (1, 2)
+
+    client.delete(f"/tasks/{ids['b']}", headers=auth_headers)
+    counts = {tag["name"]: tag["task_count"] for tag in client.get("/tags/", headers=auth_headers).json()}
+    assert counts == {"rojo": 1, "azul": 1, "verde": 1}
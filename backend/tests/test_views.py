@@ -0,0 +1,74 @@
+"""
+Tests de las vistas guardadas (views.py y GET /views/{id}/tasks)
+"""
+import json
+
+from sqlalchemy import event
+
+from database import engine
+from views import compile_view, statement_for
+
+
+def create_view(client, headers, name: str, filters: dict) -> int:
+    """Crea una vista y devuelve su ID"""
+    response = client.post("/views/", json={"name": name, "filters": filters}, headers=headers)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def view_titles(client, headers, view_id: int, **params) -> list:
+    """Títulos de las tareas de una vista, en su orden"""
+    response = client.get(f"/views/{view_id}/tasks", params=params, headers=headers)
+    assert response.status_code == 200
+    return [task["title"] for task in response.json()]
+
+
+def test_same_shape_shares_statement():
+    shape = (False, True, False, False, None, "created_at")
+    assert statement_for(shape) is statement_for(shape)
+
+    high, _, _ = compile_view(json.dumps({"priorities": ["high"]}))
+    low, params, _ = compile_view(json.dumps({"priorities": ["low"], "sort": "created_at"}))
+    assert high is low
+    assert [priority.value for priority in params["priorities"]] == ["low"]
+
+
+def test_values_are_bind_parameters(client, auth_headers):
+    for title, priority in (("alta", "high"), ("baja", "low")):
+        client.post("/tasks/", json={"title": title, "priority": priority}, headers=auth_headers)
+    high = create_view(client, auth_headers, "high", {"priorities": ["high"], "sort": "position"})
+    low = create_view(client, auth_headers, "low", {"priorities": ["low"], "sort": "position"})
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM tasks" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        assert view_titles(client, auth_headers, high) == ["alta"]
+        assert view_titles(client, auth_headers, low) == ["baja"]
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    # Misma sentencia para las dos vistas: los valores van como parámetros
+    assert len(statements) == 2
+    assert statements[0] == statements[1]
+    assert "HIGH" not in statements[0].upper()
+
+
+def test_view_tags_and_pagination(client, auth_headers):
+    ids = {}
+    for title, names in (("a", ["rojo"]), ("b", ["rojo", "azul"]), ("c", ["azul"])):
+        ids[title] = client.post("/tasks/", json={"title": title}, headers=auth_headers).json()["id"]
+        client.post("/tags/assign", json={"task_ids": [ids[title]], "tags": names}, headers=auth_headers)
+
+    any_view = create_view(client, auth_headers, "any_view", {"tags": ["rojo", "azul"], "match": "any", "sort": "position"})
+    all_view = create_view(client, auth_headers, "all_view", {"tags": ["rojo", "azul"], "match": "all"})
+    missing = create_view(client, auth_headers, "missing", {"tags": ["rojo", "nada"], "match": "all"})
+
+    assert view_titles(client, auth_headers, any_view) == ["a", "b", "c"]
+    assert view_titles(client, auth_headers, any_view, skip=1, limit=1) == ["b"]
+    assert view_titles(client, auth_headers, all_view) == ["b"]
+    assert view_titles(client, auth_headers, missing) == []
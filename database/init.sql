@@ -1,3 +1,8 @@
+-- El esquema de referencia lo mantienen las migraciones versionadas
+-- (backend/app/migrations, "python manage.py migrate"). Este script solo
+-- prepara la base de datos del contenedor con datos de ejemplo; las
+-- migraciones adoptan estas tablas y añaden lo que les falte.
+
 -- Crear base de datos si no existe
 CREATE DATABASE IF NOT EXISTS taskmanager;
 USE taskmanager;